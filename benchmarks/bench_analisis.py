@@ -0,0 +1,119 @@
+# bench_analisis.py
+# Genera una base sintética, sube el margen de lista de algunos productos
+# (para que aparezcan con margen bajo) y compara el análisis en columnas de
+# lib_analisis con el mismo cálculo hecho fila por fila en Python sobre
+# fetch_all_products() y las líneas de detalle: tiempos de la foto del día,
+# del análisis completo y del cálculo de referencia, y que los resultados
+# coincidan.
+# Uso: python -m benchmarks.bench_analisis [chico|mediano|grande]
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generador import generar, CDB_BASE
+from lib_db import fetch_all_products, get_connection, transaction, close_connections
+from lib_analisis import analizar, actualizar_foto, VENTANA_DIAS, SIN_MOVIMIENTO_DIAS, ABC_CORTES, MARGEN_TOLERANCIA
+
+# objetivo de la vista: el análisis completo (con la foto del día hecha) en menos de esto
+OBJETIVO_S = 1.0
+# uno de cada tantos productos pasa a tener un margen de lista más alto que el real
+CADA = 50
+
+def referencia(path, hoy):
+    """Las mismas métricas, producto por producto y línea por línea."""
+    desde = (hoy - datetime.timedelta(days=VENTANA_DIAS - 1)).isoformat()
+    reciente = (hoy - datetime.timedelta(days=SIN_MOVIMIENTO_DIAS - 1)).isoformat()
+    conn = get_connection(path)
+    ventas, recientes, compras = {}, {}, {}
+    for cdb, cantidad, precio, fecha in conn.execute(
+            "SELECT cdb, cantidad, precio_venta, fecha FROM venta_detalle WHERE fecha >= ?", (desde,)):
+        u, i = ventas.get(cdb, (0, 0.0))
+        ventas[cdb] = (u + cantidad, i + cantidad * (precio or 0))
+        if fecha >= reciente:
+            recientes[cdb] = recientes.get(cdb, 0) + cantidad
+    for cdb, cantidad, precio in conn.execute(
+            "SELECT cdb, cantidad, precio_compra FROM compra_detalle WHERE fecha >= ?", (desde,)):
+        u, i = compras.get(cdb, (0, 0.0))
+        compras[cdb] = (u + cantidad, i + cantidad * (precio or 0))
+    costo = venta = 0.0
+    facturado = {}
+    margen_bajo = quietos = 0
+    for cdb, _, precio, cantidad, margen, _, _ in fetch_all_products(path):
+        precio, margen, stock = precio or 0, margen or 0, max(cantidad or 0, 0)
+        costo += stock * precio
+        venta += stock * precio * (1 + margen)
+        unidades, importe = ventas.get(cdb, (0, 0.0))
+        facturado[cdb] = importe
+        cu, ci = compras.get(cdb, (0, 0.0))
+        costo_real = ci / cu if cu else precio
+        if unidades and costo_real > 0 and importe / unidades / costo_real - 1 < margen - MARGEN_TOLERANCIA:
+            margen_bajo += 1
+        if stock and not recientes.get(cdb):
+            quietos += 1
+    total = sum(facturado.values())
+    clases = [0, 0, 0]
+    acumulado = 0.0
+    for importe in sorted(facturado.values(), reverse=True):
+        parte = acumulado / total if total and importe > 0 else 1.0
+        clases[0 if parte < ABC_CORTES[0] else 1 if parte < ABC_CORTES[1] else 2] += 1
+        acumulado += importe
+    return {"costo": costo, "venta": venta, "facturado": total, "abc": clases, "margen_bajo": margen_bajo,
+            "inmovilizado": quietos}
+
+def comparar(a, ref):
+    errores = []
+    cerca = lambda x, y: abs(x - y) <= 1e-6 * max(1.0, abs(y))
+    for nombre, valor in (("costo", a.valuacion["costo"]), ("venta", a.valuacion["venta"]),
+                          ("facturado", a.margen["facturado"])):
+        if not cerca(valor, ref[nombre]):
+            errores.append(f"{nombre}: {valor:.2f} en vez de {ref[nombre]:.2f}")
+    # la suma acumulada en otro orden puede mover de clase al producto del borde
+    abc = [n for _, n, _, _, _ in a.abc]
+    if any(abs(x - y) > 1 for x, y in zip(abc, ref["abc"])):
+        errores.append(f"ABC: {abc} en vez de {ref['abc']}")
+    if a.margen_bajo_total != ref["margen_bajo"]:
+        errores.append(f"margen bajo: {a.margen_bajo_total} en vez de {ref['margen_bajo']}")
+    if a.inmovilizado_total["productos"] != ref["inmovilizado"]:
+        errores.append(f"inmovilizado: {a.inmovilizado_total['productos']} en vez de {ref['inmovilizado']}")
+    return errores
+
+def main(escala="chico"):
+    errores = []
+    hoy = datetime.date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        generar(path, escala, hoy=hoy)
+        print(f"base {escala} generada en {time.perf_counter() - t0:.1f} s")
+        with transaction(path) as cur:
+            cur.execute("UPDATE producto SET margen = margen + 0.2 WHERE (cdb - ?) % ? = 0", (CDB_BASE, CADA))
+
+        t0 = time.perf_counter()
+        actualizar_foto(path, hoy)
+        print(f"foto del día: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        tiempos = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            a = analizar(path, hoy)
+            tiempos.append(time.perf_counter() - t0)
+        mediana = sorted(tiempos)[len(tiempos) // 2]
+        print(f"análisis completo: {mediana * 1000:.0f} ms (carga {a.tiempos['carga'] * 1000:.0f} ms, "
+              f"cálculo {a.tiempos['calculo'] * 1000:.0f} ms)")
+        print("\n".join("  " + l for l in a.lineas()))
+        if mediana > OBJETIVO_S:
+            errores.append(f"el análisis tardó {mediana:.2f} s (objetivo {OBJETIVO_S:.1f} s)")
+
+        t0 = time.perf_counter()
+        ref = referencia(path, hoy)
+        print(f"referencia fila por fila: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        errores += comparar(a, ref)
+        close_connections()
+    for e in errores:
+        print("ERROR:", e)
+    print("OK" if not errores else "")
+    sys.exit(1 if errores else 0)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
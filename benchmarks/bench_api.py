@@ -0,0 +1,116 @@
+# bench_api.py
+# Prueba de carga del servidor HTTP/JSON: levanta lib_servidor en otro
+# proceso y N clientes con conexiones keep-alive piden productos por lote y
+# registran ventas de a una y por lote. Informa pedidos por segundo y
+# latencias, y verifica el stock al final.
+# Uso: python -m benchmarks.bench_api [n_clientes] [pedidos_por_cliente] [n_productos]
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections, get_connection
+from lib_servidor import servir
+
+STOCK_INICIAL = 1000000
+
+def poblar(path, n):
+    init_db(path)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, 5, ?, 0)",
+                        ((i, f"Producto {i}", STOCK_INICIAL) for i in range(1, n + 1)))
+    close_connections()
+
+async def pedir(reader, writer, metodo, ruta, cuerpo=None):
+    datos = b"" if cuerpo is None else json.dumps(cuerpo).encode()
+    writer.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(datos)}\r\n\r\n".encode() + datos)
+    await writer.drain()
+    estado = int((await reader.readline()).split()[1])
+    largo = 0
+    while (h := await reader.readline()) not in (b"\r\n", b""):
+        if h.lower().startswith(b"content-length:"):
+            largo = int(h.split(b":")[1])
+    return estado, json.loads(await reader.readexactly(largo))
+
+async def cliente(puerto, indice, n, n_productos, tiempos):
+    rnd = random.Random(indice)
+    reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+    vendidas = 0
+    for _ in range(n):
+        op = rnd.random()
+        t0 = time.perf_counter()
+        if op < 0.4:
+            tipo = "productos/lote"
+            estado, res = await pedir(reader, writer, "POST", "/productos/lote",
+                                      {"cdbs": [rnd.randint(1, n_productos) for _ in range(50)]})
+        elif op < 0.8:
+            tipo = "ventas"
+            items = [{"cdb": rnd.randint(1, n_productos), "nombre": "x", "cantidad": 1, "precio": 10}
+                     for _ in range(rnd.randint(1, 5))]
+            estado, res = await pedir(reader, writer, "POST", "/ventas", {"items": items})
+            vendidas += sum(it["cantidad"] for it in items) if estado == 200 else 0
+        else:
+            tipo = "ventas/lote"
+            ventas = [[{"cdb": rnd.randint(1, n_productos), "nombre": "x", "cantidad": 1, "precio": 10}]
+                      for _ in range(20)]
+            estado, res = await pedir(reader, writer, "POST", "/ventas/lote", {"ventas": ventas})
+            vendidas += sum(1 for r in res["datos"] if "id" in r) if estado == 200 else 0
+        tiempos.setdefault(tipo, []).append(time.perf_counter() - t0)
+        if estado != 200:
+            tiempos.setdefault("errores", []).append(res.get("error"))
+    writer.close()
+    return vendidas
+
+async def carga(puerto, n_clientes, n, n_productos):
+    tiempos = {}
+    t0 = time.perf_counter()
+    vendidas = await asyncio.gather(*(cliente(puerto, i, n, n_productos, tiempos) for i in range(n_clientes)))
+    return tiempos, time.perf_counter() - t0, sum(vendidas)
+
+async def esperar_puerto(puerto, limite=10.0):
+    fin = time.monotonic() + limite
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", puerto)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > fin:
+                raise
+            await asyncio.sleep(0.05)
+
+def main(n_clientes=8, n=300, n_productos=5000, puerto=18765):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        poblar(path, n_productos)
+        proceso = ctx.Process(target=servir, args=(path, "127.0.0.1", puerto), daemon=True)
+        proceso.start()
+        try:
+            asyncio.run(esperar_puerto(puerto))
+            tiempos, duracion, vendidas = asyncio.run(carga(puerto, n_clientes, n, n_productos))
+        finally:
+            proceso.terminate()
+            proceso.join()
+        total = sum(len(t) for k, t in tiempos.items() if k != "errores")
+        print(f"{n_clientes} clientes x {n} pedidos: {total / duracion:.0f} pedidos/s en {duracion:.1f} s")
+        for tipo, t in sorted(tiempos.items()):
+            if tipo == "errores":
+                continue
+            t.sort()
+            p = lambda q: t[min(len(t) - 1, int(q * len(t)))] * 1000
+            print(f"  {tipo:15} {len(t):6}  p50 {p(0.5):7.2f} ms  p99 {p(0.99):7.2f} ms")
+        for e in tiempos.get("errores", [])[:10]:
+            print(f"  ERROR {e}")
+        stock = get_connection(path).execute("SELECT SUM(cantidad) FROM producto").fetchone()[0]
+        esperado = STOCK_INICIAL * n_productos - vendidas
+        print(f"  stock {'consistente' if stock == esperado else f'INCONSISTENTE: {stock} != {esperado}'}"
+              f" ({vendidas} unidades vendidas)")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,108 @@
+# bench_archivo.py
+# Genera una base sintética con dos años de historial, la archiva por año y
+# compara antes y después: tamaño de la base principal, latencia de páginas
+# del historial (al principio, cruzando años y por producto) y que el
+# historial completo, las vistas *_todo y los resúmenes reconstruidos den lo
+# mismo que antes de archivar.
+# Uso: python -m benchmarks.bench_archivo [chico|mediano|grande]
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generador import generar, CDB_BASE
+from lib_db import get_connection, close_connections
+from lib_archivo import archivar, compactar, periodos, adjuntar
+from lib_historial import pagina, cursor_de
+from lib_resumenes import reconstruir_resumenes
+
+def recorrer(path, tipo, **filtros):
+    # historial completo página por página
+    filas, despues = [], None
+    while True:
+        pag = pagina(path, tipo, despues=despues, **filtros)
+        filas += pag
+        if not pag:
+            return filas
+        despues = cursor_de(pag)
+
+def medir(nombre, fn, repeticiones=50):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        filas = fn()
+    dt = (time.perf_counter() - t0) / repeticiones
+    print(f"  {nombre:<36}{len(filas):>5} filas {dt * 1000:>8.3f} ms")
+
+def paginas(path, titulo):
+    print(titulo)
+    conn = get_connection(path)
+    anio = conn.execute("SELECT MIN(fecha) FROM venta_todo").fetchone()[0][:4]
+    # página que empieza al final del año más viejo: archivado, sale de su archivo
+    borde = (f"{int(anio) + 1}-01-01T00:00:00", 0)
+    medir("primera página", lambda: pagina(path, "ventas"))
+    medir("página del año más viejo", lambda: pagina(path, "ventas", despues=borde))
+    medir("producto", lambda: pagina(path, "ventas", cdb=CDB_BASE + 7))
+    medir("producto + rango de un año", lambda: pagina(path, "ventas", cdb=CDB_BASE + 7, desde=f"{anio}-01-01",
+                                                        hasta=f"{anio}-12-31"))
+
+def contar(path):
+    conn = get_connection(path)
+    return {t: conn.execute(f"SELECT COUNT(*), TOTAL(id) FROM {t}_todo").fetchone()
+            for t in ("venta", "venta_detalle", "compra", "compra_detalle")}
+
+def resumenes(path):
+    conn = get_connection(path)
+    return [conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall()
+            for t in ("resumen_venta_dia", "resumen_compra_dia", "resumen_dia")]
+
+def main(escala="chico"):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        generar(path, escala)
+        print(f"base {escala} generada en {time.perf_counter() - t0:.1f} s, {os.path.getsize(path) / 1e6:.1f} MB")
+        adjuntar(get_connection(path), path)
+        paginas(path, "sin archivar")
+        historial = {t: recorrer(path, t) for t in ("ventas", "compras")}
+        por_producto = recorrer(path, "ventas", cdb=CDB_BASE + 3)
+        cuentas, antes = contar(path), resumenes(path)
+
+        t0 = time.perf_counter()
+        movidas = archivar(path)
+        dt = time.perf_counter() - t0
+        ventas = sum(v for v, _ in movidas.values())
+        print(f"archivado en {dt:.1f} s ({ventas / dt:.0f} ventas/s)")
+        for anio, archivo, ventas, compras in periodos(path):
+            tam = os.path.getsize(os.path.join(tmp, archivo)) / 1e6
+            print(f"  {anio}: {ventas} ventas, {compras} compras, {tam:.1f} MB")
+        t0 = time.perf_counter()
+        compactar(path)
+        print(f"base principal compactada en {time.perf_counter() - t0:.1f} s: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        paginas(path, "archivado")
+        errores = []
+        if {t: recorrer(path, t) for t in ("ventas", "compras")} != historial:
+            errores.append("el historial paginado cambió")
+        if recorrer(path, "ventas", cdb=CDB_BASE + 3) != por_producto:
+            errores.append("el historial de un producto cambió")
+        if contar(path) != cuentas:
+            errores.append("las vistas *_todo no suman lo mismo")
+        if resumenes(path) != antes:
+            errores.append("los resúmenes cambiaron al archivar")
+        t0 = time.perf_counter()
+        reconstruir_resumenes(path)
+        print(f"resúmenes reconstruidos desde todos los años en {time.perf_counter() - t0:.1f} s")
+        # el importe es REAL: se compara redondeado
+        redondear = lambda tablas: [[tuple(round(v, 6) if isinstance(v, float) else v for v in f) for f in t] for t in tablas]
+        if redondear(resumenes(path)) != redondear(antes):
+            errores.append("los resúmenes reconstruidos no coinciden")
+        if archivar(path):
+            errores.append("una segunda pasada volvió a mover filas")
+        close_connections()
+    for e in errores:
+        print("ERROR:", e)
+    print("OK" if not errores else "")
+    sys.exit(1 if errores else 0)
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,40 @@
+# bench_arranque.py
+# Mide el arranque en frío de la App (proceso nuevo por corrida): tiempo hasta
+# el primer pintado y hasta que la primera pestaña terminó de cargar.
+# Uso: python -m benchmarks.bench_arranque [corridas] [ruta_db]
+# Requiere un display (la App abre una ventana real).
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+def hijo(db):
+    import main
+    app = None
+
+    def listo(tiempos):
+        print(json.dumps(tiempos))
+        app.after(0, app.destroy)
+
+    app = main.App(db, warmup=False, on_startup=listo)
+    app.mainloop()
+
+def main(corridas=5, db=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = db or os.path.join(tmp, "arranque.db")
+        resultados = []
+        for _ in range(corridas):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_arranque", "--hijo", db],
+                                 capture_output=True, text=True, check=True)
+            resultados.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        for clave in ("first_paint", "interactive"):
+            valores = [r[clave] * 1000 for r in resultados]
+            print(f"{clave:<14} mediana {statistics.median(valores):8.1f} ms  min {min(valores):8.1f} ms  max {max(valores):8.1f} ms")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--hijo":
+        hijo(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,39 @@
+# bench_busqueda.py
+# Mide la latencia de search_products sobre un catálogo grande.
+# Uso: python -m benchmarks.bench_busqueda [n_productos]
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, search_products, transaction, close_connections
+
+PALABRAS = ["leche", "arroz", "azúcar", "yerba", "fideos", "aceite", "harina", "galletitas", "café", "jabón",
+            "queso", "manteca", "agua", "gaseosa", "cerveza", "vino", "detergente", "lavandina", "papel", "atún"]
+MARCAS = ["La Serenísima", "Gallo", "Ledesma", "Taragüí", "Matarazzo", "Cocinero", "Blancaflor", "Terrabusi"]
+
+def poblar(path, n):
+    rnd = random.Random(7)
+    init_db(path)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, ?, ?)",
+                        ((7790000000000 + i, f"{rnd.choice(PALABRAS)} {rnd.choice(MARCAS)} {rnd.randint(1, 999)}g",
+                          rnd.uniform(1, 500), rnd.randint(0, 200), 5) for i in range(n)))
+
+def main(n=100000):
+    consultas = ["l", "le", "lec", "leche", "leche ser", "arroz gallo", "779", "7790000012345", "café", "jabon", "zzz"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        poblar(path, n)
+        search_products(path, "x")
+        for q in consultas:
+            t0 = time.perf_counter()
+            for _ in range(20):
+                rows = search_products(path, q)
+            dt = (time.perf_counter() - t0) / 20
+            print(f"{q!r:<18}{len(rows):>5} resultados {dt * 1000:>8.2f} ms")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,58 @@
+# bench_caja.py
+# Llena el libro de caja con movimientos repartidos en varios meses y mide el
+# saldo actual, el saldo a una fecha y el cierre de un día; además compara
+# cada resultado con la suma directa del libro.
+# Uso: python -m benchmarks.bench_caja [n_movimientos]
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections, get_connection
+from lib_caja import saldo, saldo_al, cierre, verificar_caja, formato
+
+def poblar(path, n):
+    init_db(path)
+    rnd = random.Random(1)
+    inicio = datetime.datetime(2024, 1, 1)
+    paso = datetime.timedelta(days=365) / n
+    filas = []
+    for i in range(n):
+        tipo = rnd.choice(("venta", "venta", "venta", "compra", "ingreso", "egreso"))
+        importe = rnd.randint(100, 500000) * (-1 if tipo in ("compra", "egreso") else 1)
+        filas.append(((inicio + paso * i).isoformat(), tipo, importe))
+    with transaction(path) as cur:
+        # fila por fila: el trigger de fotos corre igual que en el uso real
+        cur.executemany("INSERT INTO caja_movimiento (fecha, tipo, importe) VALUES (?, ?, ?)", filas)
+
+def medir(fn, *args, repeticiones=200):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        res = fn(*args)
+    return res, (time.perf_counter() - t0) / repeticiones * 1000
+
+def main(n=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        poblar(path, n)
+        print(f"{n} movimientos cargados en {time.perf_counter() - t0:.1f} s")
+        conn = get_connection(path)
+        suma = lambda sql, *p: conn.execute(f"SELECT IFNULL(SUM(importe), 0) FROM caja_movimiento {sql}", p).fetchone()[0]
+
+        actual, ms = medir(saldo, path)
+        print(f"saldo actual     {ms:8.3f} ms  {formato(actual)}  (suma directa {formato(suma(''))})")
+        al, ms = medir(saldo_al, path, "2024-07-01")
+        print(f"saldo al 1/7     {ms:8.3f} ms  {formato(al)}  (suma directa {formato(suma('WHERE fecha < ?', '2024-07-01'))})")
+        c, ms = medir(cierre, path, "2024-07-01", "2024-07-01")
+        ok = c.saldo_final == c.saldo_inicial + c.neto
+        print(f"cierre de un día {ms:8.3f} ms  neto {formato(c.neto)}  {'cuadra' if ok else 'NO CUADRA'}")
+        c, ms = medir(cierre, path, "2024-01-01", "2024-12-31", repeticiones=3)
+        print(f"cierre del año   {ms:8.3f} ms  neto {formato(c.neto)}")
+        print("fotos verificadas" if not verificar_caja(path) else "FOTOS CON DIFERENCIAS")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
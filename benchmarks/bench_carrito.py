@@ -0,0 +1,38 @@
+# bench_carrito.py
+# Mide el modelo del carrito con tickets largos (agregar, sumar a una línea
+# existente, quitar) y compara el total en centavos con la suma en float.
+# Uso: python -m benchmarks.bench_carrito [n_lineas] [n_operaciones]
+import random
+import sys
+import time
+
+from lib_carrito import Carrito, formato
+
+def main():
+    n_lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rnd = random.Random(1)
+    precios = [round(rnd.uniform(0.1, 99.99), 2) for _ in range(n_lineas)]
+    carrito = Carrito()
+    eventos = []
+    carrito.subscribe(lambda ev, linea: eventos.append(ev))
+    flotante = 0.0
+    t0 = time.perf_counter()
+    for _ in range(n_ops):
+        i = rnd.randrange(n_lineas)
+        cdb = 7790000000000 + i
+        if rnd.random() < 0.05 and len(carrito):
+            linea = carrito._lineas.get(cdb)
+            if linea is not None:
+                flotante -= precios[i] * linea.cantidad
+                carrito.quitar(cdb)
+                continue
+        carrito.agregar(cdb, f"producto {i}", precios[i], 1)
+        flotante += precios[i]
+    dt = time.perf_counter() - t0
+    exacto = sum(l.importe for l in carrito)
+    print(f"{n_ops} operaciones sobre {n_lineas} líneas: {dt / n_ops * 1e6:.2f} µs/op, {len(eventos)} eventos")
+    print(f"total en centavos {formato(carrito.total)} (recalculado {formato(exacto)}), en float {flotante!r}")
+
+if __name__ == "__main__":
+    main()
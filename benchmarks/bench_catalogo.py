@@ -0,0 +1,43 @@
+# bench_catalogo.py
+# Costo de fetch_all_products/get_product con el catálogo en memoria.
+# Uso: python -m benchmarks.bench_catalogo [n_productos]
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, fetch_all_products, get_product, catalog, transaction, close_connections
+
+def medir(nombre, fn, repeticiones=1):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    dt = (time.perf_counter() - t0) / repeticiones
+    print(f"{nombre:<36}{dt * 1000:>10.3f} ms")
+
+def main(n=100000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        init_db(path)
+        with transaction(path) as cur:
+            cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, ?, ?)",
+                            ((i, f"Producto {i}", 10.0, 100, 5) for i in range(1, n + 1)))
+        medir("primera carga", lambda: fetch_all_products(path))
+        medir("lectura repetida", lambda: fetch_all_products(path), 100)
+        medir("get_product (cache)", lambda: get_product(path, n // 2), 1000)
+        with transaction(path) as cur:
+            cur.executemany("UPDATE producto SET cantidad = cantidad - 1 WHERE cdb=?", ((i,) for i in range(1, 51)))
+        medir("lectura tras 50 cambios locales", lambda: fetch_all_products(path))
+        # escritura desde otro proceso/conexión
+        otra = sqlite3.connect(path)
+        otra.execute("INSERT INTO producto (cdb, nombre) VALUES (?, 'nuevo')", (n + 1,))
+        otra.commit()
+        otra.close()
+        medir("lectura tras alta externa", lambda: fetch_all_products(path))
+        assert get_product(path, n + 1) is not None
+        print(catalog(path).stats())
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,59 @@
+# bench_checkout.py
+# Ventas por segundo según el tamaño del carrito: registro línea por línea
+# (implementación anterior de VentaFrame._vender) contra registrar_venta.
+# Uso: python -m benchmarks.bench_checkout [n_ventas]
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections
+from lib_ventas import registrar_venta
+
+N_PRODUCTOS = 5000
+
+def venta_por_linea(path, cart):
+    with transaction(path) as cur:
+        cur.execute("INSERT INTO venta (fecha) VALUES (?)", (datetime.datetime.now().isoformat(),))
+        vid = cur.lastrowid
+        for it in cart:
+            cdb, cant, precio = int(it['cdb']), int(it['cantidad']), float(it['precio'])
+            cur.execute("SELECT cantidad, precio, margen FROM producto WHERE cdb=?", (cdb,))
+            res = cur.fetchone()
+            if not res or res[0] < cant:
+                raise ValueError(f"Stock insuficiente para {it['nombre']}")
+            cur.execute("UPDATE producto SET cantidad=? WHERE cdb=?", (res[0] - cant, cdb))
+            cur.execute("INSERT INTO venta_detalle (venta, cdb, cantidad, precio_venta) VALUES (?, ?, ?, ?)", (vid, cdb, cant, precio))
+            cur.execute("INSERT INTO caja_movimiento (fecha, tipo, importe, referencia) VALUES (datetime('now'), 'venta', ?, ?)",
+                        (round(cant * precio * 100), vid))
+    return vid
+
+def carritos(n_lineas, n_ventas, seed):
+    rnd = random.Random(seed)
+    return [[{'cdb': rnd.randint(1, N_PRODUCTOS), 'nombre': 'x', 'cantidad': 1, 'precio': 10.0}
+             for _ in range(n_lineas)] for _ in range(n_ventas)]
+
+def main(n_ventas=300):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        init_db(path)
+        with transaction(path) as cur:
+            cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad) VALUES (?, ?, 10, 10000000)",
+                            ((i, f"Producto {i}") for i in range(1, N_PRODUCTOS + 1)))
+        print(f"{'líneas':>8}{'por línea':>14}{'por lote':>14}   (ventas/s)")
+        for n_lineas in (1, 10, 100):
+            ventas = max(10, n_ventas // max(1, n_lineas // 10))
+            res = []
+            for fn in (venta_por_linea, registrar_venta):
+                lote = carritos(n_lineas, ventas, n_lineas)
+                t0 = time.perf_counter()
+                for cart in lote:
+                    fn(path, cart)
+                res.append(ventas / (time.perf_counter() - t0))
+            print(f"{n_lineas:>8}{res[0]:>14.0f}{res[1]:>14.0f}")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
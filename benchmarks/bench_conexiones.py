@@ -0,0 +1,49 @@
+# bench_conexiones.py
+# Compara abrir/cerrar una conexión por consulta contra el pool de lib_db.
+# Uso: python -m benchmarks.bench_conexiones [n_productos] [n_consultas]
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, get_connection, get_product, transaction, close_connections
+
+def poblar(path, n):
+    init_db(path)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, ?, ?)",
+                        ((i, f"Producto {i}", 1.0 + i % 100, 50, 5) for i in range(1, n + 1)))
+
+def por_llamada(path, cdb):
+    # el patrón anterior: abrir, consultar y cerrar en cada llamada
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
+    cur = conn.cursor()
+    cur.execute("SELECT cdb, nombre, precio, cantidad, margen, umbral, perecedero FROM producto WHERE cdb=?", (cdb,))
+    row = cur.fetchone()
+    conn.close()
+    return row
+
+def medir(nombre, fn, path, claves):
+    t0 = time.perf_counter()
+    for cdb in claves:
+        fn(path, cdb)
+    dt = time.perf_counter() - t0
+    print(f"{nombre:<22}{len(claves) / dt:>12.0f} consultas/s {dt / len(claves) * 1e6:>10.1f} us/consulta")
+    return dt
+
+def main(n_productos=10000, n_consultas=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        poblar(path, n_productos)
+        rnd = random.Random(1)
+        claves = [rnd.randint(1, n_productos) for _ in range(n_consultas)]
+        get_connection(path)  # la primera apertura no cuenta
+        t_viejo = medir("abrir/cerrar", por_llamada, path, claves)
+        t_pool = medir("pool", get_product, path, claves)
+        print(f"aceleración: x{t_viejo / t_pool:.1f}")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,77 @@
+# bench_escaneo.py
+# Reproduce lecturas de escáner en la pantalla de ventas y mide el tiempo por
+# lectura. Sin pantalla (sin DISPLAY) mide solo la resolución del código.
+# Uso: python -m benchmarks.bench_escaneo [n_productos] [n_lecturas]
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections, catalog
+from lib_ventas import resolver_escaneo
+
+def poblar(path, n):
+    init_db(path)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, 1000000, 0)",
+                        ((7790000000000 + i, f"producto {i}", 1.0 + i % 500) for i in range(n)))
+
+def lecturas(n_productos, n):
+    rnd = random.Random(1)
+    # un ticket típico: pocos productos distintos, algunos repetidos o con multiplicador
+    for _ in range(n):
+        cdb = 7790000000000 + rnd.randrange(min(n_productos, 40))
+        yield f"{rnd.randint(2, 6)}*{cdb}" if rnd.random() < 0.1 else str(cdb)
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1000
+    return f"media {sum(tiempos) / len(tiempos) * 1000:.3f} ms  p50 {p(0.5):.3f}  p99 {p(0.99):.3f}  máx {tiempos[-1] * 1000:.3f}"
+
+def medir_resolucion(path, scans):
+    tiempos = []
+    for s in scans:
+        t0 = time.perf_counter()
+        resolver_escaneo(path, s)
+        tiempos.append(time.perf_counter() - t0)
+    print(f"resolución del código       {percentiles(tiempos)}")
+
+def medir_pantalla(path, scans):
+    try:
+        import customtkinter as ctk
+        root = ctk.CTk()
+    except Exception as e:
+        print(f"pantalla de ventas: sin display ({e.__class__.__name__}), se omite")
+        return
+    from funcs.dashboard_venta import VentaFrame
+    frame = VentaFrame(root, path)
+    frame.pack(fill="both", expand=True)
+    root.update()
+    tiempos = []
+    for i, s in enumerate(scans):
+        if i % 50 == 0:
+            # un ticket nuevo cada 50 lecturas
+            frame._limpiar()
+            root.update()
+        t0 = time.perf_counter()
+        frame.scan_entry.insert(0, s)
+        frame._escanear()
+        root.update_idletasks()
+        tiempos.append(time.perf_counter() - t0)
+    print(f"lectura -> carrito (Tk)     {percentiles(tiempos)}")
+    root.destroy()
+
+def main(n_productos=100000, n_lecturas=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        poblar(path, n_productos)
+        catalog(path).all()
+        scans = list(lecturas(n_productos, n_lecturas))
+        print(f"{n_productos} productos, {n_lecturas} lecturas")
+        medir_resolucion(path, scans)
+        medir_pantalla(path, scans)
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
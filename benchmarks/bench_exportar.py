@@ -0,0 +1,86 @@
+# bench_exportar.py
+# Exporta el detalle de ventas a CSV y PDF con distintos tamaños de historial
+# y mide filas por segundo y el pico de memoria de Python (tracemalloc), que
+# no debería crecer con la cantidad de filas. Verifica además la tabla de
+# referencias del PDF generado.
+# Uso: python -m benchmarks.bench_exportar [n_lineas ...]
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+from lib_db import init_db, transaction, close_connections
+from lib_exportar import exportar_reporte
+
+PRODUCTOS = 1000
+
+def poblar(path, n):
+    init_db(path)
+    with transaction(path) as cur:
+        # sin los triggers de resúmenes y del registro de cambios: solo interesa el detalle
+        for (nombre,) in cur.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'venta_detalle'").fetchall():
+            cur.execute(f"DROP TRIGGER {nombre}")
+        cur.execute("""WITH RECURSIVE x(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM x WHERE i < ?)
+                       INSERT INTO producto (cdb, nombre, precio, cantidad) SELECT i, 'producto ' || i, i % 97 + 0.5, 0 FROM x""",
+                    (PRODUCTOS,))
+        cur.execute("""WITH RECURSIVE x(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM x WHERE i < ? - 1)
+                       INSERT INTO venta_detalle (venta, cdb, cantidad, precio_venta, fecha)
+                       SELECT i / 4 + 1, i % ? + 1, i % 3 + 1, (i % 97) * 1.5,
+                              strftime('%Y-%m-%dT%H:%M:%S', '2020-01-01', '+' || (i * 7) || ' seconds') FROM x""",
+                    (n, PRODUCTOS))
+
+def verificar_pdf(ruta):
+    """Comprueba que cada entrada de la xref apunte a su objeto y que las páginas se descompriman."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    inicio = int(re.search(rb"startxref\n(\d+)", datos).group(1))
+    n = int(re.match(rb"xref\n0 (\d+)\n", datos[inicio:]).group(1))
+    tabla = datos[inicio:].split(b"\n", 2)[2]
+    for i in range(1, n):
+        offset = int(tabla[i * 20:i * 20 + 10])
+        if not datos.startswith(b"%d 0 obj" % i, offset):
+            return f"la entrada {i} de la xref no apunta a su objeto"
+    paginas = int(re.search(rb"/Type /Pages /Count (\d+)", datos).group(1))
+    stream = re.search(rb"stream\n(.*?)\nendstream", datos, re.S).group(1)
+    if b"Detalle de ventas" not in zlib.decompress(stream):
+        return "la primera página no tiene el título"
+    return paginas
+
+def exportar(path, ruta):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    filas = exportar_reporte(path, "ventas", ruta)
+    dt = time.perf_counter() - t0
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return filas, dt, pico
+
+def main(*tamanios):
+    errores = []
+    for n in tamanios or (100000, 1000000):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            poblar(path, n)
+            print(f"{n} líneas de venta")
+            for formato in ("csv", "pdf"):
+                ruta = os.path.join(tmp, "ventas." + formato)
+                filas, dt, pico = exportar(path, ruta)
+                print(f"  {formato}: {filas} filas en {dt:.1f} s ({filas / dt:,.0f} filas/s), "
+                      f"{os.path.getsize(ruta) / 1e6:.1f} MB, pico de memoria {pico / 1e6:.2f} MB")
+                if filas != n + 1:
+                    errores.append(f"{formato}: {filas} filas en vez de {n + 1}")
+            paginas = verificar_pdf(os.path.join(tmp, "ventas.pdf"))
+            if isinstance(paginas, str):
+                errores.append(paginas)
+            else:
+                print(f"  pdf: {paginas} páginas, xref correcta")
+            close_connections()
+    for e in errores:
+        print("ERROR:", e)
+    sys.exit(1 if errores else 0)
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
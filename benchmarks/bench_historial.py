@@ -0,0 +1,58 @@
+# bench_historial.py
+# Mide la latencia de las páginas del historial (lib_historial.pagina) con
+# distintos tamaños de venta_detalle: debería mantenerse constante.
+# Uso: python -m benchmarks.bench_historial [n_lineas ...]
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections
+from lib_historial import pagina, cursor_de
+
+PRODUCTOS = 2000
+LINEAS_POR_VENTA = 4
+
+def poblar(path, n):
+    rnd = random.Random(11)
+    init_db(path)
+    inicio = datetime.datetime(2020, 1, 1)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, 0, 0)",
+                        ((i, f"producto {i}", rnd.uniform(1, 500)) for i in range(1, PRODUCTOS + 1)))
+        ventas = n // LINEAS_POR_VENTA
+        fechas = [(inicio + datetime.timedelta(seconds=i * 60)).isoformat() for i in range(ventas)]
+        cur.executemany("INSERT INTO venta (id, fecha) VALUES (?, ?)", enumerate(fechas, 1))
+        cur.executemany("INSERT INTO venta_detalle (venta, cdb, cantidad, precio_venta, fecha) VALUES (?, ?, ?, ?, ?)",
+                        ((v, rnd.randint(1, PRODUCTOS), rnd.randint(1, 5), 10.0, fechas[v - 1])
+                         for v in range(1, ventas + 1) for _ in range(LINEAS_POR_VENTA)))
+        return fechas[0][:10], fechas[-1][:10]
+
+def medir(nombre, fn, repeticiones=20):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        filas = fn()
+    dt = (time.perf_counter() - t0) / repeticiones
+    print(f"  {nombre:<34}{len(filas):>5} filas {dt * 1000:>8.2f} ms")
+
+def main(*tamanios):
+    for n in tamanios or (1000, 100000, 1000000):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            primero, ultimo = poblar(path, n)
+            print(f"{n} líneas de venta")
+            primera = pagina(path, "ventas")
+            medir("primera página", lambda: pagina(path, "ventas"))
+            medir("segunda página", lambda: pagina(path, "ventas", despues=cursor_de(primera)))
+            # página al final del historial: el costo no depende de la posición
+            medio = pagina(path, "ventas", hasta=primero, limite=1) or primera
+            medir("página al final del historial", lambda: pagina(path, "ventas", despues=cursor_de(medio)))
+            medir("producto", lambda: pagina(path, "ventas", cdb=7))
+            medir("producto + rango de fechas", lambda: pagina(path, "ventas", cdb=7, desde=primero, hasta=ultimo))
+            medir("rango de fechas", lambda: pagina(path, "ventas", desde=ultimo, hasta=ultimo))
+            close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
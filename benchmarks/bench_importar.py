@@ -0,0 +1,50 @@
+# bench_importar.py
+# Mide la importación y exportación del catálogo completo por CSV.
+# Uso: python -m benchmarks.bench_importar [n_productos]
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, close_connections
+from lib_importar import importar_catalogo, exportar_catalogo, COLUMNAS
+
+def generar(ruta, n):
+    rnd = random.Random(3)
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNAS)
+        for i in range(n):
+            w.writerow([7790000000000 + i, f"producto {i}", f"{rnd.uniform(1, 500):.2f}", rnd.randint(0, 200),
+                        0.2, 5, rnd.randint(0, 1)])
+        # algunas filas inválidas
+        w.writerow(["abc", "sin código", 1, 1, 0.2, 0, 0])
+        w.writerow([1, "", 1, 1, 0.2, 0, 0])
+
+def memoria_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def medir(nombre, fn):
+    t0 = time.perf_counter()
+    res = fn()
+    print(f"{nombre:<28}{time.perf_counter() - t0:>8.2f} s   {res}   (pico {memoria_mb():.0f} MB)")
+
+def main(n=1000000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        origen = os.path.join(tmp, "catalogo.csv")
+        destino = os.path.join(tmp, "exportado.csv")
+        init_db(path)
+        generar(origen, n)
+        print(f"{n} productos (pico inicial {memoria_mb():.0f} MB)")
+        medir("simulación", lambda: importar_catalogo(path, origen, dry_run=True))
+        medir("importación", lambda: importar_catalogo(path, origen))
+        medir("reimportación sin cambios", lambda: importar_catalogo(path, origen))
+        medir("exportación", lambda: exportar_catalogo(path, destino))
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
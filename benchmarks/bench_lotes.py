@@ -0,0 +1,56 @@
+# bench_lotes.py
+# Mide la purga de lotes vencidos y las ventas con consumo FEFO sobre muchos lotes.
+# Uso: python -m benchmarks.bench_lotes [n_lotes]
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections
+from lib_migraciones import LOTS_SQL, run_script
+from lib_lotes import purgar_vencidos, verificar_lotes
+from lib_ventas import registrar_venta
+
+LOTES_POR_PRODUCTO = 6
+
+def poblar(path, n):
+    rnd = random.Random(5)
+    init_db(path)
+    productos = n // LOTES_POR_PRODUCTO
+    hoy = datetime.date.today()
+    with transaction(path) as cur:
+        # los lotes se cargan directo y el stock se fija sin el trigger de altas,
+        # que los mandaría al lote sin fecha
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, 10, 0, 0)",
+                        ((i, f"producto {i}") for i in range(1, productos + 1)))
+        lotes = [(i, rnd.randint(1, 20), (hoy + datetime.timedelta(days=rnd.randint(-60, 120))).isoformat())
+                 for i in range(1, productos + 1) for _ in range(LOTES_POR_PRODUCTO)]
+        cur.executemany("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, ?)", lotes)
+        cur.execute("DROP TRIGGER lotes_producto_alta")
+        cur.execute("UPDATE producto SET cantidad = (SELECT SUM(cantidad) FROM vencimientos v WHERE v.cdb = producto.cdb)")
+        run_script(cur, LOTS_SQL)
+    return productos
+
+def main(n=300000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        productos = poblar(path, n)
+        print(f"{n} lotes, {productos} productos")
+        rnd = random.Random(9)
+        t0 = time.perf_counter()
+        ventas = 500
+        for _ in range(ventas):
+            registrar_venta(path, [{"cdb": rnd.randint(1, productos), "cantidad": 1, "precio": 10} for _ in range(5)])
+        print(f"venta de 5 líneas con consumo FEFO: {(time.perf_counter() - t0) / ventas * 1000:.2f} ms")
+        t0 = time.perf_counter()
+        lotes, unidades = purgar_vencidos(path)
+        print(f"purga: {lotes} lotes, {unidades} unidades en {time.perf_counter() - t0:.2f} s")
+        t0 = time.perf_counter()
+        errores = verificar_lotes(path)
+        print(f"verificación: {len(errores)} productos con diferencias ({time.perf_counter() - t0:.2f} s)")
+        close_connections()
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
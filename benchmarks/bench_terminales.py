@@ -0,0 +1,119 @@
+# bench_terminales.py
+# Prueba de carga multi-terminal: N procesos sin interfaz venden y compran a
+# la vez sobre el mismo archivo. Informa operaciones por segundo, latencias
+# (p50/p99) y errores, y al final verifica que el stock, los lotes y la caja
+# cuadren con las ventas y compras registradas.
+# Uso: python -m benchmarks.bench_terminales [n_procesos] [operaciones_por_proceso] [n_productos]
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from lib_db import init_db, transaction, close_connections, get_connection
+from lib_ventas import registrar_venta, StockInsuficiente
+from lib_compras import registrar_compra
+from lib_lotes import verificar_lotes
+from lib_caja import saldo, verificar_caja, formato
+
+STOCK_INICIAL = 50
+PRECIO_VENTA = 10.0
+PRECIO_COMPRA = 6.5
+# fracción de operaciones que son compras (el resto son ventas)
+FRACCION_COMPRAS = 0.2
+
+def poblar(path, n):
+    init_db(path)
+    with transaction(path) as cur:
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, umbral) VALUES (?, ?, ?, ?, 0)",
+                        ((i, f"Producto {i}", PRECIO_COMPRA, STOCK_INICIAL) for i in range(1, n + 1)))
+
+def terminal(path, indice, n_ops, n_productos, inicio, cola):
+    """Una caja: espera la largada y registra n_ops ventas o compras al azar."""
+    rnd = random.Random(indice)
+    res = {"venta": [], "compra": [], "sin_stock": 0, "errores": {}}
+    inicio.wait()
+    for _ in range(n_ops):
+        items = [{'cdb': rnd.randint(1, n_productos), 'nombre': 'x', 'cantidad': rnd.randint(1, 3)}
+                 for _ in range(rnd.randint(1, 5))]
+        tipo = "compra" if rnd.random() < FRACCION_COMPRAS else "venta"
+        t0 = time.perf_counter()
+        try:
+            if tipo == "compra":
+                registrar_compra(path, [dict(it, precio=PRECIO_COMPRA) for it in items])
+            else:
+                registrar_venta(path, [dict(it, precio=PRECIO_VENTA) for it in items])
+            res[tipo].append(time.perf_counter() - t0)
+        except StockInsuficiente:
+            res["sin_stock"] += 1
+        except sqlite3.Error as e:
+            res["errores"][str(e)] = res["errores"].get(str(e), 0) + 1
+    close_connections()
+    cola.put(res)
+
+def percentil(tiempos, q):
+    return tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1000 if tiempos else 0.0
+
+def verificar(path, n_productos):
+    conn = get_connection(path)
+    problemas = []
+    # stock final = inicial + comprado - vendido, producto por producto
+    descuadres = conn.execute("""
+        SELECT p.cdb, p.cantidad,
+               ? + IFNULL((SELECT SUM(cantidad) FROM compra_detalle WHERE cdb = p.cdb), 0)
+                 - IFNULL((SELECT SUM(cantidad) FROM venta_detalle WHERE cdb = p.cdb), 0) AS esperado
+        FROM producto p WHERE p.cantidad <> esperado OR p.cantidad < 0""", (STOCK_INICIAL,)).fetchall()
+    problemas += [f"stock de {cdb}: {real}, esperado {esperado}" for cdb, real, esperado in descuadres]
+    problemas += [f"lotes de {cdb}: stock {stock}, lotes {suma}" for cdb, stock, suma in verificar_lotes(path)]
+    vendido, comprado = conn.execute("""
+        SELECT (SELECT IFNULL(SUM(cantidad), 0) FROM venta_detalle), (SELECT IFNULL(SUM(cantidad), 0) FROM compra_detalle)
+    """).fetchone()
+    esperado = round(vendido * PRECIO_VENTA * 100) - round(comprado * PRECIO_COMPRA * 100)
+    if saldo(path) != esperado:
+        problemas.append(f"caja: {formato(saldo(path))}, esperado {formato(esperado)}")
+    problemas += [f"foto de caja {mov}: {formato(foto)} != {formato(real)}" for mov, foto, real in verificar_caja(path)]
+    return problemas
+
+def main(n_procesos=4, n_ops=300, n_productos=200):
+    # spawn: cada proceso abre sus propias conexiones, como una terminal aparte
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        poblar(path, n_productos)
+        inicio, cola = ctx.Event(), ctx.Queue()
+        procesos = [ctx.Process(target=terminal, args=(path, i, n_ops, n_productos, inicio, cola))
+                    for i in range(n_procesos)]
+        for p in procesos:
+            p.start()
+        time.sleep(1.0)
+        t0 = time.perf_counter()
+        inicio.set()
+        resultados = [cola.get() for _ in procesos]
+        duracion = time.perf_counter() - t0
+        for p in procesos:
+            p.join()
+
+        print(f"{n_procesos} terminales x {n_ops} operaciones, {n_productos} productos, {duracion:.1f} s")
+        errores = {}
+        for tipo in ("venta", "compra"):
+            tiempos = sorted(t for r in resultados for t in r[tipo])
+            print(f"  {tipo:7} {len(tiempos):6} ok  {len(tiempos) / duracion:8.1f}/s  "
+                  f"p50 {percentil(tiempos, 0.5):7.2f} ms  p99 {percentil(tiempos, 0.99):7.2f} ms  "
+                  f"máx {percentil(tiempos, 1):7.2f} ms")
+        for r in resultados:
+            for mensaje, n in r["errores"].items():
+                errores[mensaje] = errores.get(mensaje, 0) + n
+        print(f"  ventas rechazadas por falta de stock: {sum(r['sin_stock'] for r in resultados)}")
+        for mensaje, n in errores.items():
+            print(f"  ERROR {n} x {mensaje}")
+        problemas = verificar(path, n_productos)
+        for p in problemas[:20]:
+            print(f"  INCONSISTENCIA {p}")
+        print("  stock, lotes y caja consistentes" if not problemas else f"  {len(problemas)} inconsistencias")
+        close_connections()
+        return 1 if errores or problemas else 0
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(a) for a in sys.argv[1:4]]))
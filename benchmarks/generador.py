@@ -0,0 +1,139 @@
+# generador.py
+# Genera una base sintética de un comercio con el esquema de lib_db, siempre
+# igual para la misma semilla: productos con nombres buscables, lotes con
+# vencimiento que suman el stock, y un historial de ventas y compras. Las
+# fechas se cuentan hacia atrás (y los vencimientos hacia adelante) desde
+# `hoy`, así las consultas de alertas ven la misma proporción de datos
+# cualquiera sea el día en que se corra.
+# Uso: python -m benchmarks.generador ruta.db [chico|mediano|grande] [semilla]
+import datetime
+import os
+import random
+import sys
+import time
+from typing import Callable, Optional
+
+from lib_db import init_db, transaction, close_connections, get_connection
+from lib_migraciones import REBUILD_ROLLUPS_SQL, REBUILD_VELOCITY_SQL, run_script
+
+# escala: (productos, filas de venta_detalle, lotes con vencimiento)
+ESCALAS = {
+    "chico": (10_000, 200_000, 20_000),
+    "mediano": (50_000, 1_000_000, 100_000),
+    "grande": (100_000, 5_000_000, 200_000),
+}
+CDB_BASE = 7790000000000
+# una compra por cada tantas líneas de venta
+LINEAS_POR_COMPRA = 10
+CHUNK = 50_000
+
+CATEGORIAS = ["leche", "yogur", "queso", "manteca", "pan", "galletitas", "arroz", "fideos", "harina", "azucar",
+              "yerba", "cafe", "te", "aceite", "vinagre", "gaseosa", "agua", "jugo", "cerveza", "vino",
+              "jabon", "shampoo", "detergente", "lavandina", "papel", "atun", "arvejas", "tomate", "mermelada", "chocolate"]
+MARCAS = ["la serenisima", "sancor", "arcor", "molinos", "marolio", "ledesma", "cabrales", "taragui", "playadito",
+          "coca", "manaos", "quilmes", "dove", "ala", "magistral", "higienol", "gaucho", "bagley", "terrabusi", "knorr"]
+VARIANTES = ["entera", "descremada", "light", "clasica", "integral", "suave", "intensa", "familiar", "chica",
+             "grande", "500g", "1kg", "1l", "2l", "pack x6", "sin tacc", "natural", "frutilla", "vainilla", "limon"]
+
+# tablas que se cargan sin triggers; lo que ellos mantienen se reconstruye al final
+TABLAS_CARGA = ("producto", "vencimientos", "venta", "venta_detalle", "compra", "compra_detalle")
+
+def nombre_producto(rnd: random.Random, i: int) -> str:
+    return f"{rnd.choice(CATEGORIAS)} {rnd.choice(MARCAS)} {rnd.choice(VARIANTES)} {i}"
+
+def generar(path: str, escala: str = "chico", semilla: int = 1, hoy: Optional[datetime.date] = None,
+            dias: int = 730, on_progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """Crea la base en `path` (que no debe tener productos) y devuelve la cantidad de filas por tabla."""
+    n_productos, n_detalles, n_lotes = ESCALAS[escala]
+    hoy = hoy or datetime.date.today()
+    rnd = random.Random(semilla)
+    aviso = on_progress or (lambda etapa, n: None)
+    init_db(path)
+    if get_connection(path).execute("SELECT 1 FROM producto LIMIT 1").fetchone():
+        raise ValueError(f"{path} ya tiene productos")
+
+    with transaction(path) as cur:
+        triggers = cur.execute(f"""SELECT name, sql FROM sqlite_master WHERE type = 'trigger'
+                                   AND tbl_name IN ({','.join('?' * len(TABLAS_CARGA))})""", TABLAS_CARGA).fetchall()
+        for nombre, _ in triggers:
+            cur.execute(f"DROP TRIGGER {nombre}")
+
+        # productos: ~30% perecederos, que reciben los lotes con fecha
+        productos = []
+        for i in range(n_productos):
+            precio = round(rnd.uniform(0.5, 500), 2)
+            productos.append([CDB_BASE + i, nombre_producto(rnd, i), precio, 0, round(rnd.uniform(0.15, 0.6), 2),
+                              rnd.randint(0, 20), 1 if rnd.random() < 0.3 else 0])
+        perecederos = [p for p in productos if p[6]] or productos
+        lotes = []
+        for _ in range(n_lotes):
+            p = rnd.choice(perecederos)
+            cant = rnd.randint(1, 50)
+            # algunos ya vencidos, la mayoría en el próximo año
+            vence = hoy + datetime.timedelta(days=rnd.randint(-60, 365))
+            lotes.append((p[0], cant, vence.isoformat()))
+            p[3] += cant
+        for p in productos:
+            sin_fecha = rnd.randint(0, 100) if rnd.random() < 0.9 else 0
+            if sin_fecha:
+                lotes.append((p[0], sin_fecha, None))
+                p[3] += sin_fecha
+        cur.executemany("INSERT INTO producto (cdb, nombre, precio, cantidad, margen, umbral, perecedero) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        productos)
+        cur.executemany("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, ?)", lotes)
+        aviso("productos", n_productos)
+
+        # historial: tickets de 1 a 8 líneas en orden de fecha; los productos
+        # de cdb bajo se venden más (distribución sesgada, como en un comercio real)
+        inicio = datetime.datetime.combine(hoy - datetime.timedelta(days=dias), datetime.time(8))
+        paso = datetime.timedelta(days=dias) / max(1, n_detalles)
+        precios = [p[2] * (1 + p[4]) for p in productos]
+        filas, venta, compra, hechas = [], 0, 0, 0
+        cabeceras, compras, detalles_compra = [], [], []
+        while hechas < n_detalles:
+            venta += 1
+            fecha = (inicio + paso * hechas).isoformat(timespec="seconds")
+            cabeceras.append((venta, fecha))
+            for _ in range(min(rnd.randint(1, 8), n_detalles - hechas)):
+                i = int(n_productos * rnd.random() ** 2)
+                filas.append((venta, productos[i][0], rnd.randint(1, 3), round(precios[i], 2), fecha))
+                hechas += 1
+                if hechas % LINEAS_POR_COMPRA == 0:
+                    compra += 1
+                    j = int(n_productos * rnd.random() ** 2)
+                    compras.append((compra, fecha))
+                    detalles_compra.append((compra, productos[j][0], rnd.randint(5, 50), productos[j][2], fecha))
+            if len(filas) >= CHUNK:
+                _volcar(cur, cabeceras, filas, compras, detalles_compra)
+                aviso("venta_detalle", hechas)
+        _volcar(cur, cabeceras, filas, compras, detalles_compra)
+        aviso("venta_detalle", hechas)
+
+        # lo que mantenían los triggers: índice de búsqueda, versión del catálogo, resúmenes y velocidad de venta
+        cur.execute("INSERT INTO producto_fts (producto_fts) VALUES ('rebuild')")
+        cur.execute("INSERT OR REPLACE INTO producto_version (cdb, version) SELECT cdb, ROW_NUMBER() OVER (ORDER BY cdb) FROM producto")
+        run_script(cur, REBUILD_ROLLUPS_SQL)
+        run_script(cur, REBUILD_VELOCITY_SQL)
+        for _, sql in triggers:
+            cur.execute(sql)
+    get_connection(path).execute("ANALYZE")
+    return {"producto": n_productos, "venta": venta, "venta_detalle": hechas, "compra": compra,
+            "compra_detalle": compra, "vencimientos": len(lotes)}
+
+def _volcar(cur, cabeceras, filas, compras, detalles_compra):
+    cur.executemany("INSERT INTO venta (id, fecha) VALUES (?, ?)", cabeceras)
+    cur.executemany("INSERT INTO venta_detalle (venta, cdb, cantidad, precio_venta, fecha) VALUES (?, ?, ?, ?, ?)", filas)
+    cur.executemany("INSERT INTO compra (id, fecha) VALUES (?, ?)", compras)
+    cur.executemany("INSERT INTO compra_detalle (compra, cdb, cantidad, precio_compra, fecha) VALUES (?, ?, ?, ?, ?)",
+                    detalles_compra)
+    for lista in (cabeceras, filas, compras, detalles_compra):
+        lista.clear()
+
+if __name__ == "__main__":
+    ruta = sys.argv[1]
+    escala = sys.argv[2] if len(sys.argv) > 2 else "chico"
+    semilla = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    t0 = time.perf_counter()
+    filas = generar(ruta, escala, semilla, on_progress=lambda etapa, n: print(f"  {etapa}: {n}", flush=True))
+    close_connections()
+    print(f"{ruta}: {filas} en {time.perf_counter() - t0:.1f} s ({os.path.getsize(ruta) / 2 ** 20:.0f} MB)")
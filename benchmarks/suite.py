@@ -0,0 +1,185 @@
+# suite.py
+# Corre los benchmarks sin interfaz sobre una base generada por
+# benchmarks.generador y guarda los resultados en JSON, para comparar
+# versiones: catálogo (fetch_all_products/get_product), búsqueda del
+# selector, registro de ventas y compras, consultas de Reportes y de Alertas
+# y el análisis de inventario.
+# Uso: python -m benchmarks.suite [--escala chico] [--db ruta.db] [--salida resultados.json]
+#                                 [--comparar anterior.json] [--tolerancia 0.2]
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from lib_db import init_db, fetch_all_products, get_product, search_products, catalog, close_connections, get_connection, QUERIES
+from lib_ventas import registrar_venta
+from lib_compras import registrar_compra
+from lib_resumenes import totales, top_productos
+from lib_historial import pagina, cursor_de
+from lib_alertas import AlertEngine
+from lib_analisis import analizar, actualizar_foto
+from lib_reposicion import sugerencias
+from benchmarks.generador import generar, ESCALAS, CDB_BASE, CATEGORIAS, MARCAS
+
+FORMATO = 1
+
+def medir(fn: Callable[[int], object], repeticiones: int, preparar: Callable[[], object] = None) -> List[float]:
+    """Tiempos en segundos de `fn(i)`; `preparar` corre antes de cada repetición sin contarse."""
+    tiempos = []
+    for i in range(repeticiones):
+        if preparar:
+            preparar()
+        t0 = time.perf_counter()
+        fn(i)
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos
+
+def resumen(tiempos: List[float]) -> dict:
+    t = sorted(tiempos)
+    p = lambda q: round(t[min(len(t) - 1, int(q * len(t)))] * 1000, 4)
+    return {"n": len(t), "media_ms": round(sum(t) / len(t) * 1000, 4), "p50_ms": p(0.5), "p99_ms": p(0.99),
+            "max_ms": round(t[-1] * 1000, 4)}
+
+def benchmarks(path: str, semilla: int) -> Dict[str, Callable[[], List[float]]]:
+    """nombre -> función que devuelve los tiempos. Las escrituras van al final."""
+    rnd = random.Random(semilla)
+    conn = get_connection(path)
+    n = conn.execute("SELECT COUNT(*) FROM producto").fetchone()[0]
+    cdbs = [CDB_BASE + rnd.randrange(n) for _ in range(5000)]
+    nombres = [rnd.choice(CATEGORIAS)[:3] for _ in range(200)]
+    dos_palabras = [f"{rnd.choice(CATEGORIAS)} {rnd.choice(MARCAS).split()[0][:4]}" for _ in range(200)]
+    prefijos = [str(c)[:9] for c in cdbs[:200]]
+    hasta = conn.execute("SELECT MAX(dia) FROM resumen_dia").fetchone()[0] or datetime.date.today().isoformat()
+    desde_30 = (datetime.date.fromisoformat(hasta) - datetime.timedelta(days=29)).isoformat()
+    # las ventas usan productos con stock de sobra para que ninguna se rechace
+    vendibles = [r[0] for r in conn.execute("SELECT cdb FROM producto WHERE cantidad >= 20 ORDER BY cdb")]
+    vendibles = rnd.sample(vendibles, min(len(vendibles), 2000))
+    carrito = lambda i, precio: [{'cdb': vendibles[(i * 5 + k) % len(vendibles)], 'nombre': 'x', 'cantidad': 1,
+                                  'precio': precio} for k in range(5)]
+
+    def paginas_profundas():
+        # recorre las primeras 50 páginas siguiendo el cursor, como al hacer scroll
+        despues = None
+        tiempos = []
+        for _ in range(50):
+            t0 = time.perf_counter()
+            filas = pagina(path, "ventas", despues=despues)
+            tiempos.append(time.perf_counter() - t0)
+            despues = cursor_de(filas)
+        return tiempos
+
+    def carga_alertas(_):
+        motor = AlertEngine(path)
+        motor.start()
+
+    analisis = {}
+    # numpy es opcional: sin él el análisis no se mide
+    if importlib.util.find_spec("numpy"):
+        analisis = {
+            # la agrupación del año que se hace una vez por día
+            "analisis.foto": lambda: medir(lambda i: actualizar_foto(path), 3,
+                                           lambda: conn.execute("DELETE FROM resumen_producto_periodo")),
+            "analisis.completo": lambda: medir(lambda i: analizar(path), 10),
+        }
+
+    return {
+        "catalogo.primera_carga": lambda: medir(lambda i: fetch_all_products(path), 5, catalog(path).invalidate),
+        "catalogo.lectura": lambda: medir(lambda i: fetch_all_products(path), 200),
+        "catalogo.get_product": lambda: medir(lambda i: get_product(path, cdbs[i]), 5000),
+        "busqueda.codigo_prefijo": lambda: medir(lambda i: search_products(path, prefijos[i], 50), 200),
+        "busqueda.nombre_prefijo": lambda: medir(lambda i: search_products(path, nombres[i], 50), 200),
+        "busqueda.dos_palabras": lambda: medir(lambda i: search_products(path, dos_palabras[i], 50), 200),
+        "reportes.totales_dia": lambda: medir(lambda i: totales(path, "dia"), 50),
+        "reportes.totales_mes": lambda: medir(lambda i: totales(path, "mes"), 50),
+        "reportes.top_30_dias": lambda: medir(lambda i: top_productos(path, desde_30, hasta), 20),
+        "reportes.historial_primera_pagina": lambda: medir(lambda i: pagina(path, "ventas"), 100),
+        "reportes.historial_por_producto": lambda: medir(lambda i: pagina(path, "ventas", cdb=cdbs[i]), 100),
+        "reportes.historial_scroll": paginas_profundas,
+        "alertas.bajo_stock": lambda: medir(lambda i: conn.execute(*QUERIES["alertas_bajo_stock"]).fetchall(), 20),
+        "alertas.vencimientos": lambda: medir(lambda i: conn.execute(*QUERIES["alertas_vencimientos"]).fetchall(), 20),
+        "alertas.carga_completa": lambda: medir(carga_alertas, 5),
+        **analisis,
+        "reposicion.sugerencias": lambda: medir(lambda i: sugerencias(path, limite=None), 10),
+        "checkout.venta_5_lineas": lambda: medir(lambda i: registrar_venta(path, carrito(i, 10.0)), 200),
+        "checkout.compra_5_lineas": lambda: medir(lambda i: registrar_compra(path, carrito(i + 1000, 6.5)), 100),
+    }
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def comparar(actual: dict, anterior: dict, tolerancia: float) -> List[str]:
+    """Nombres cuyo p50 empeoró más que `tolerancia` (0.2 = 20 %) respecto de `anterior`."""
+    peores = []
+    print(f"\n{'benchmark':<36}{'antes p50':>12}{'ahora p50':>12}{'cambio':>10}")
+    for nombre, res in actual["resultados"].items():
+        previo = anterior.get("resultados", {}).get(nombre)
+        if not previo:
+            continue
+        cambio = res["p50_ms"] / previo["p50_ms"] - 1 if previo["p50_ms"] else 0.0
+        marca = "  REGRESIÓN" if cambio > tolerancia else ""
+        if marca:
+            peores.append(nombre)
+        print(f"{nombre:<36}{previo['p50_ms']:>12.3f}{res['p50_ms']:>12.3f}{cambio:>+10.0%}{marca}")
+    return peores
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks sin interfaz sobre una base sintética")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="chico")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--db", help="base a usar; si no existe se genera ahí y queda para la próxima corrida")
+    parser.add_argument("--salida", default="resultados_benchmarks.json")
+    parser.add_argument("--comparar", help="resultados anteriores para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--solo", help="prefijo de los benchmarks a correr (p. ej. busqueda.)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "bench.db")
+        if not os.path.exists(path):
+            t0 = time.perf_counter()
+            generar(path, args.escala, args.semilla)
+            print(f"base {args.escala} generada en {time.perf_counter() - t0:.1f} s")
+        else:
+            # una base generada con un esquema anterior se migra antes de medir
+            init_db(path)
+        conn = get_connection(path)
+        datos = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                 for t in ("producto", "venta_detalle", "compra_detalle", "vencimientos")}
+        print(", ".join(f"{t} {n}" for t, n in datos.items()))
+        resultados = {}
+        for nombre, fn in benchmarks(path, args.semilla).items():
+            if args.solo and not nombre.startswith(args.solo):
+                continue
+            resultados[nombre] = resumen(fn())
+            r = resultados[nombre]
+            print(f"{nombre:<36}p50 {r['p50_ms']:>10.3f} ms  p99 {r['p99_ms']:>10.3f} ms  (n={r['n']})", flush=True)
+        close_connections()
+
+    salida = {"formato": FORMATO, "fecha": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+              "escala": args.escala, "semilla": args.semilla, "python": platform.python_version(),
+              "sqlite": sqlite3.sqlite_version, "plataforma": platform.platform(), "datos": datos,
+              "resultados": resultados}
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"resultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            peores = comparar(salida, json.load(f), args.tolerancia)
+        return 1 if peores else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
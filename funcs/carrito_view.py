@@ -0,0 +1,42 @@
+# carrito_view.py
+import customtkinter as ctk
+from lib_carrito import formato
+
+class CarritoView(ctk.CTkFrame):
+    """Lista de líneas de un lib_carrito.Carrito más el total.
+
+    Escucha los eventos del carrito y toca solo la fila afectada: crea una
+    fila al agregar, cambia su texto al modificar y la destruye al quitar.
+    """
+
+    def __init__(self, parent, carrito):
+        super().__init__(parent, fg_color="transparent")
+        self.carrito = carrito
+        self._filas = {}
+        self.lista = ctk.CTkScrollableFrame(self)
+        self.lista.pack(fill="both", expand=True)
+        self.total_label = ctk.CTkLabel(self, text="Total: $0.00", font=ctk.CTkFont(size=14))
+        self.total_label.pack(pady=6)
+        carrito.subscribe(self._on_cambio)
+        for linea in carrito:
+            self._on_cambio("agregada", linea)
+
+    def _on_cambio(self, evento, linea):
+        if evento == "agregada":
+            fila = ctk.CTkFrame(self.lista, fg_color="transparent")
+            fila.pack(fill="x", padx=6, pady=2)
+            lbl = ctk.CTkLabel(fila, text=linea.texto(), anchor="w")
+            lbl.pack(side="left", fill="x", expand=True)
+            ctk.CTkButton(fila, text="Eliminar", width=80,
+                          command=lambda clave=linea.clave: self.carrito.quitar(clave)).pack(side="right")
+            self._filas[linea.clave] = (fila, lbl)
+        elif evento == "modificada":
+            self._filas[linea.clave][1].configure(text=linea.texto())
+        elif evento == "quitada":
+            fila, _ = self._filas.pop(linea.clave)
+            fila.destroy()
+        elif evento == "vaciado":
+            for fila, _ in self._filas.values():
+                fila.destroy()
+            self._filas.clear()
+        self.total_label.configure(text=f"Total: ${formato(self.carrito.total)}")
@@ -1,39 +1,77 @@
 # dashboard_alertas.py
 import customtkinter as ctk
-import tkinter.messagebox as mb
-from lib_db import get_connection
+from lib_executor import SyncExecutor
+from lib_eventos import StaleTracker
+from lib_alertas import AlertEngine
+from funcs.virtual_grid import VirtualGrid
+
+# (cdb, nombre, cantidad, umbral)
+BAJO_STOCK_COLUMNS = [
+    ("CDB", 0, 130, None),
+    ("Nombre", 1, 260, None),
+    ("Cant", 2, 70, None),
+    ("Umbral", 3, 70, None),
+]
+# (id, cdb, nombre, cantidad, fecha de vencimiento)
+VENCIMIENTO_COLUMNS = [
+    ("Vence", 4, 110, None),
+    ("CDB", 1, 130, None),
+    ("Nombre", 2, 260, None),
+    ("Cant", 3, 70, None),
+]
 
 class AlertasFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path, notify_callback=None):
+    def __init__(self, parent, db_path, bus=None, executor=None, engine=None):
         super().__init__(parent)
         self.db = db_path
-        self.notify_callback = notify_callback
+        self.executor = executor or SyncExecutor()
+        self.pendientes = StaleTracker()
+        if engine is None:
+            engine = AlertEngine(db_path, bus, self.executor)
+            engine.start()
+        self.engine = engine
+        # cambios del motor todavía no dibujados: {clave: fila o None}
+        self._parches = {}
+        engine.subscribe(self._on_alertas)
         self.build()
 
     def build(self):
         header = ctk.CTkLabel(self, text="Alertas", font=ctk.CTkFont(size=18, weight="bold"))
         header.pack(pady=6)
-        ctk.CTkButton(self, text="Refrescar", command=self.update_contents).pack(pady=6)
-        self.frame = ctk.CTkScrollableFrame(self)
-        self.frame.pack(fill="both", expand=True, padx=12, pady=6)
+        ctk.CTkButton(self, text="Refrescar", command=self._refrescar).pack(pady=6)
+        self.status = ctk.CTkLabel(self, text="")
+        self.status.pack()
+        self.lbl_bajos = ctk.CTkLabel(self, text="Productos con bajo stock")
+        self.lbl_bajos.pack(anchor="w", padx=18, pady=4)
+        self.bajos = VirtualGrid(self, BAJO_STOCK_COLUMNS)
+        self.bajos.pack(fill="both", expand=True, padx=12, pady=6)
+        self.lbl_vencen = ctk.CTkLabel(self, text="Próximos vencimientos (7 días)")
+        self.lbl_vencen.pack(anchor="w", padx=18, pady=4)
+        self.vencen = VirtualGrid(self, VENCIMIENTO_COLUMNS, key_index=0)
+        self.vencen.pack(fill="both", expand=True, padx=12, pady=6)
+        # la cola queda ordenada por fecha de vencimiento también al aplicar parches
+        self.vencen.sort_by(0)
+
+    def _on_alertas(self, cambios, nuevas):
+        self._parches.update(cambios)
+        self.pendientes.mark("alertas", set())
+
+    def _refrescar(self):
+        self.engine.start()
 
     def update_contents(self):
-        for w in self.frame.winfo_children():
-            w.destroy()
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        # bajo stock
-        cur.execute("SELECT cdb, nombre, cantidad, umbral FROM producto WHERE cantidad <= umbral")
-        bajos = cur.fetchall()
-        if bajos:
-            ctk.CTkLabel(self.frame, text="Productos con bajo stock:").pack(anchor="w", padx=6, pady=4)
-            for b in bajos:
-                ctk.CTkLabel(self.frame, text=f"{b[0]} - {b[1]} (cant {b[2]} umbral {b[3]})").pack(anchor="w", padx=8)
-        # proximos vencimientos 7 dias
-        cur.execute("SELECT v.cdb, p.nombre, v.cantidad, v.fecha_vencimiento FROM vencimientos v JOIN producto p ON v.cdb=p.cdb WHERE v.fecha_vencimiento <= date('now', '+7 days')")
-        prox = cur.fetchall()
-        if prox:
-            ctk.CTkLabel(self.frame, text="Próximos vencimientos (7 días):").pack(anchor="w", padx=6, pady=8)
-            for p in prox:
-                ctk.CTkLabel(self.frame, text=f"{p[0]} - {p[1]} (cant {p[2]}) vence {p[3]}").pack(anchor="w", padx=8)
-        conn.close()
+        todo, _ = self.pendientes.take()
+        parches, self._parches = self._parches, {}
+        if not self.engine.cargado:
+            self.status.configure(text="Cargando…")
+            self.pendientes.invalidate()
+            return
+        self.status.configure(text="")
+        if todo:
+            self.bajos.set_rows(self.engine.bajo_stock.values())
+            self.vencen.set_rows(self.engine.vencimientos.values())
+        else:
+            self.bajos.patch_rows({k: fila for (tipo, k), fila in parches.items() if tipo == "stock"})
+            self.vencen.patch_rows({k: fila for (tipo, k), fila in parches.items() if tipo == "vence"})
+        self.lbl_bajos.configure(text=f"Productos con bajo stock ({len(self.engine.bajo_stock)})")
+        self.lbl_vencen.configure(text=f"Próximos vencimientos (7 días) ({len(self.engine.vencimientos)})")
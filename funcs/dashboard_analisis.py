@@ -0,0 +1,122 @@
+# dashboard_analisis.py
+import customtkinter as ctk
+from lib_executor import SyncExecutor
+from lib_eventos import StaleTracker
+from lib_analisis import analizar, SIN_MOVIMIENTO_DIAS
+from funcs.virtual_grid import VirtualGrid
+
+_dinero = lambda v: f"{v:,.2f}" if v is not None else ""
+_porcentaje = lambda v: f"{v:.1%}" if v is not None else ""
+
+# (clase, productos, facturado, participación, valor del stock)
+ABC_COLUMNS = [
+    ("Clase", 0, 70, None),
+    ("Productos", 1, 90, None),
+    ("Facturado", 2, 140, _dinero),
+    ("Part.", 3, 80, _porcentaje),
+    ("Stock al costo", 4, 140, _dinero),
+]
+# (cdb, nombre, margen de lista, margen real, unidades, diferencia)
+MARGEN_COLUMNS = [
+    ("CDB", 0, 130, None),
+    ("Nombre", 1, 260, None),
+    ("Lista", 2, 70, _porcentaje),
+    ("Real", 3, 70, _porcentaje),
+    ("Unid.", 4, 70, None),
+    ("Dejado de ganar", 5, 130, _dinero),
+]
+# (cdb, nombre, cantidad, valor al costo, unidades vendidas en la ventana)
+INMOVILIZADO_COLUMNS = [
+    ("CDB", 0, 130, None),
+    ("Nombre", 1, 260, None),
+    ("Cant", 2, 70, None),
+    ("Valor", 3, 120, _dinero),
+    ("Vend. año", 4, 90, None),
+]
+LISTADOS = ["Margen bajo", "Sin movimiento"]
+
+class AnalisisFrame(ctk.CTkFrame):
+    def __init__(self, parent, db_path, bus=None, executor=None):
+        super().__init__(parent)
+        self.db = db_path
+        self.executor = executor or SyncExecutor()
+        self.pendientes = StaleTracker()
+        if bus:
+            for tabla in ("producto", "venta_detalle", "compra_detalle"):
+                bus.subscribe(tabla, self.pendientes.mark)
+        self.build()
+
+    def build(self):
+        header = ctk.CTkLabel(self, text="Análisis de inventario", font=ctk.CTkFont(size=18, weight="bold"))
+        header.pack(pady=6)
+        ctk.CTkButton(self, text="Refrescar", command=self._refrescar).pack(pady=6)
+        self.status = ctk.CTkLabel(self, text="")
+        self.status.pack()
+        self.valuacion = ctk.CTkLabel(self, text="", justify="left")
+        self.valuacion.pack(anchor="w", padx=18, pady=4)
+        self.abc = VirtualGrid(self, ABC_COLUMNS, row_height=24)
+        self.abc.configure(height=110)
+        self.abc.pack(fill="x", padx=12, pady=6)
+        self.margen = ctk.CTkLabel(self, text="", justify="left")
+        self.margen.pack(anchor="w", padx=18, pady=4)
+
+        self.listado = ctk.CTkSegmentedButton(self, values=LISTADOS, command=self._cambiar_listado)
+        self.listado.set(LISTADOS[0])
+        self.listado.pack(anchor="w", padx=12, pady=4)
+        self.lbl_listado = ctk.CTkLabel(self, text="")
+        self.lbl_listado.pack(anchor="w", padx=18)
+        self.margen_bajo = VirtualGrid(self, MARGEN_COLUMNS)
+        self.inmovilizado = VirtualGrid(self, INMOVILIZADO_COLUMNS)
+        self.margen_bajo.pack(fill="both", expand=True, padx=12, pady=6)
+        self._analisis = None
+
+    def _cambiar_listado(self, listado):
+        if listado == "Sin movimiento":
+            self.margen_bajo.pack_forget()
+            self.inmovilizado.pack(fill="both", expand=True, padx=12, pady=6)
+        else:
+            self.inmovilizado.pack_forget()
+            self.margen_bajo.pack(fill="both", expand=True, padx=12, pady=6)
+        self._titulo_listado()
+
+    def _refrescar(self):
+        self.pendientes.invalidate()
+        self.update_contents()
+
+    def update_contents(self):
+        self.pendientes.take()
+        self.status.configure(text="Calculando…")
+        self.executor.cancel(self)
+        self.executor.submit(analizar, self.db, on_done=self._calculado, on_error=self._fallo,
+                             tag=self, interruptible=True)
+
+    def _calculado(self, a):
+        self._analisis = a
+        v, m = a.valuacion, a.margen
+        self.status.configure(text=f"{a.productos} productos, ventas y compras del {a.desde} al {a.hasta} "
+                                   f"({(a.tiempos['carga'] + a.tiempos['calculo']) * 1000:.0f} ms)")
+        self.valuacion.configure(text=f"Stock: {v['unidades']:,.0f} unidades en {v['con_stock']} productos   "
+                                      f"Al costo: ${v['costo']:,.2f}   A precio de venta: ${v['venta']:,.2f}")
+        self.abc.set_rows(a.abc)
+        self.margen.configure(text=f"Facturado: ${m['facturado']:,.2f}   Margen bruto: ${m['bruto']:,.2f}   "
+                                   f"Real: {m['real']:.1%}   De lista: {m['lista']:.1%}")
+        self.margen_bajo.set_rows(a.margen_bajo)
+        self.inmovilizado.set_rows(a.inmovilizado)
+        self._titulo_listado()
+
+    def _titulo_listado(self):
+        a = self._analisis
+        if a is None:
+            return
+        if self.listado.get() == "Sin movimiento":
+            s = a.inmovilizado_total
+            texto = (f"Con stock y sin ventas en {SIN_MOVIMIENTO_DIAS} días: {s['productos']} productos, "
+                     f"{s['unidades']:,.0f} unidades, ${s['valor']:,.2f} al costo")
+            mostrados = len(a.inmovilizado)
+        else:
+            texto = f"Margen real por debajo del de lista: {a.margen_bajo_total} productos"
+            mostrados = len(a.margen_bajo)
+        self.lbl_listado.configure(text=texto + (f", se muestran los {mostrados} de más valor" if mostrados else ""))
+
+    def _fallo(self, exc):
+        self.status.configure(text=f"Error: {exc}")
@@ -1,15 +1,22 @@
 # dashboard_caja.py
+import datetime
 import customtkinter as ctk
 import tkinter.messagebox as mb
-from lib_db import get_connection
+import tkinter.simpledialog as sd
+from lib_caja import formato
+from lib_servicio import estado_caja, movimiento_caja, corregir_caja, cierre_caja
+from lib_eventos import StaleTracker
 
 class CajaFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path):
+    def __init__(self, parent, db_path, bus=None):
         super().__init__(parent)
         self.db = db_path
+        self.bus = bus
+        self.pendientes = StaleTracker()
+        if bus:
+            bus.subscribe("caja_movimiento", self.pendientes.mark)
         self.total_var = ctk.StringVar(value="0.00")
         self.build()
-        self.update_contents()
 
     def build(self):
         header = ctk.CTkLabel(self, text="Caja", font=ctk.CTkFont(size=18, weight="bold"))
@@ -17,47 +24,69 @@ class CajaFrame(ctk.CTkFrame):
         frame = ctk.CTkFrame(self)
         frame.pack(padx=12, pady=12, fill="x")
         ctk.CTkLabel(frame, text="Total en caja").grid(row=0, column=0, sticky="w", pady=6)
-        self.total_entry = ctk.CTkEntry(frame, textvariable=self.total_var, width=180)
-        self.total_entry.grid(row=0, column=1, pady=6, padx=6)
-        ctk.CTkButton(frame, text="Actualizar", command=self.update_contents).grid(row=1, column=0, pady=6)
-        ctk.CTkButton(frame, text="Modificar", command=self._modificar).grid(row=1, column=1, pady=6)
-        ctk.CTkButton(frame, text="+ Agregar", command=lambda: self._cambiar_signo(+1)).grid(row=2, column=0, pady=6)
-        ctk.CTkButton(frame, text="- Quitar", command=lambda: self._cambiar_signo(-1)).grid(row=2, column=1, pady=6)
+        ctk.CTkLabel(frame, textvariable=self.total_var, width=180, font=ctk.CTkFont(size=16)).grid(row=0, column=1, pady=6, padx=6)
+        ctk.CTkButton(frame, text="Actualizar", command=self._refrescar).grid(row=1, column=0, pady=6)
+        ctk.CTkButton(frame, text="Corregir saldo", command=self._corregir).grid(row=1, column=1, pady=6)
+        ctk.CTkButton(frame, text="+ Agregar", command=lambda: self._manual("ingreso")).grid(row=2, column=0, pady=6)
+        ctk.CTkButton(frame, text="- Quitar", command=lambda: self._manual("egreso")).grid(row=2, column=1, pady=6)
 
-    def update_contents(self):
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        cur.execute("SELECT total FROM dinero WHERE id=1")
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            self.total_var.set(f"{row[0]:.2f}")
+        # cierre de caja de un rango de días, calculado desde los movimientos
+        cierre_frame = ctk.CTkFrame(self)
+        cierre_frame.pack(padx=12, pady=6, fill="both", expand=True)
+        filtros = ctk.CTkFrame(cierre_frame, fg_color="transparent")
+        filtros.pack(fill="x", padx=6, pady=6)
+        hoy = datetime.date.today().isoformat()
+        ctk.CTkLabel(filtros, text="Cierre desde").pack(side="left")
+        self.desde_entry = ctk.CTkEntry(filtros, width=110)
+        self.desde_entry.insert(0, hoy)
+        self.desde_entry.pack(side="left", padx=6)
+        ctk.CTkLabel(filtros, text="hasta").pack(side="left")
+        self.hasta_entry = ctk.CTkEntry(filtros, width=110)
+        self.hasta_entry.insert(0, hoy)
+        self.hasta_entry.pack(side="left", padx=6)
+        ctk.CTkButton(filtros, text="Cierre de caja", command=self._cierre).pack(side="left", padx=6)
+        self.cierre_label = ctk.CTkLabel(cierre_frame, text="", justify="left", anchor="nw")
+        self.cierre_label.pack(fill="both", expand=True, padx=12, pady=6)
+
+    def _refrescar(self):
+        self.pendientes.invalidate()
+        self.update_contents()
+
+    def _changed(self, res):
+        if self.bus:
+            self.bus.publish_cambios(res["cambios"])
         else:
-            self.total_var.set("0.00")
+            self.update_contents()
 
-    def _modificar(self):
+    def update_contents(self):
+        self.pendientes.take()
+        # última foto del saldo más los movimientos posteriores: no recorre el libro
+        self.total_var.set(estado_caja(self.db)["texto"])
+
+    def _corregir(self):
         try:
-            nuevo = float(self.total_var.get())
-            conn = get_connection(self.db)
-            cur = conn.cursor()
-            cur.execute("UPDATE dinero SET total=? WHERE id=1", (nuevo,))
-            conn.commit()
-            conn.close()
-            mb.showinfo("Caja", "Total actualizado")
+            nuevo = sd.askfloat("Corregir saldo", "Dinero contado en caja:")
+            if nuevo is None:
+                return
+            res = corregir_caja(self.db, nuevo, nota="corrección manual")
+            self._changed(res)
+            mb.showinfo("Caja", f"Diferencia registrada: {formato(res['diferencia'])}")
         except Exception as e:
             mb.showerror("Error", str(e))
 
-    def _cambiar_signo(self, signo):
-        import tkinter.simpledialog as sd
+    def _manual(self, tipo):
         try:
             monto = sd.askfloat("Monto", "Ingrese monto:")
             if monto is None:
                 return
-            conn = get_connection(self.db)
-            cur = conn.cursor()
-            cur.execute("UPDATE dinero SET total = total + ? WHERE id=1", (signo*monto,))
-            conn.commit()
-            conn.close()
-            self.update_contents()
+            self._changed(movimiento_caja(self.db, tipo, monto))
         except Exception as e:
             mb.showerror("Error", str(e))
+
+    def _cierre(self):
+        try:
+            resultado = cierre_caja(self.db, self.desde_entry.get().strip(), self.hasta_entry.get().strip())
+        except ValueError as e:
+            mb.showerror("Cierre de caja", str(e))
+            return
+        self.cierre_label.configure(text=resultado["texto"])
@@ -1,16 +1,21 @@
 # dashboard_compra.py
+import datetime
 import customtkinter as ctk
 import tkinter.messagebox as mb
-from lib_db import get_connection, fetch_all_products
-import datetime
+from lib_servicio import comprar, sugerir_compra
+from lib_carrito import Carrito
+from lib_executor import SyncExecutor
+from funcs.product_search import ProductSearch
+from funcs.carrito_view import CarritoView
 
 class CompraFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path, on_alert_callback=None):
+    def __init__(self, parent, db_path, bus=None, executor=None):
         super().__init__(parent)
         self.db = db_path
-        self.on_alert = on_alert_callback
-        self.cart = []
-        self.total = 0.0
+        self.bus = bus
+        self.executor = executor or SyncExecutor()
+        # cada vencimiento es un lote distinto: no se mezcla con otras líneas del mismo producto
+        self.cart = Carrito(por_vencimiento=True)
         self.build()
 
     def build(self):
@@ -19,80 +24,67 @@ class CompraFrame(ctk.CTkFrame):
         top = ctk.CTkFrame(self)
         top.pack(fill="x", padx=12, pady=6)
         ctk.CTkButton(top, text="Añadir producto", command=self._open_add).pack(side="left", padx=6)
-        ctk.CTkButton(top, text="Registrar compra", command=self._confirmar).pack(side="left", padx=6)
+        self.btn_confirmar = ctk.CTkButton(top, text="Registrar compra", command=self._confirmar)
+        self.btn_confirmar.pack(side="left", padx=6)
         ctk.CTkButton(top, text="Limpiar", command=self._limpiar).pack(side="left", padx=6)
+        self.btn_sugerir = ctk.CTkButton(top, text="Sugerir pedido", command=self._sugerir)
+        self.btn_sugerir.pack(side="left", padx=6)
 
-        self.list_frame = ctk.CTkScrollableFrame(self)
-        self.list_frame.pack(fill="both", expand=True, padx=12, pady=6)
-        self.total_label = ctk.CTkLabel(self, text="Total: $0.00", font=ctk.CTkFont(size=14))
-        self.total_label.pack(pady=6)
+        self.cart_view = CarritoView(self, self.cart)
+        self.cart_view.pack(fill="both", expand=True, padx=12, pady=6)
 
     def update_contents(self):
-        self._render_cart()
-
-    def _render_cart(self):
-        for w in self.list_frame.winfo_children():
-            w.destroy()
-        for idx, item in enumerate(self.cart):
-            txt = f"{item['cdb']} - {item['nombre']} x {item['cantidad']} @ {item['precio']:.2f}"
-            lbl = ctk.CTkLabel(self.list_frame, text=txt)
-            lbl.pack(fill="x", padx=6, pady=3)
-            ctk.CTkButton(self.list_frame, text="Eliminar", width=80, command=lambda i=idx: self._remove(i)).pack(padx=6, pady=3)
-
-        self.total_label.configure(text=f"Total: ${self.total:.2f}")
+        pass
 
     def _open_add(self):
         dlg = CompraPicker(self, self.db, self._on_added)
         dlg.open()
 
     def _on_added(self, item):
-        self.cart.append(item)
-        self.total += item['precio'] * item['cantidad']
-        self._render_cart()
-
-    def _remove(self, idx):
-        item = self.cart.pop(idx)
-        self.total -= item['precio'] * item['cantidad']
-        self._render_cart()
+        self.cart.agregar(item['cdb'], item['nombre'], item['precio'], item['cantidad'],
+                          vencimiento=item.get('vencimiento'))
+
+    def _sugerir(self):
+        self.btn_sugerir.configure(state="disabled")
+        self.executor.submit(sugerir_compra, self.db, on_done=self._sugerido, on_error=self._fallo)
+
+    def _sugerido(self, lineas):
+        """Agrega al carrito lo que sugiere lib_reposicion, salvo productos que ya están cargados."""
+        self.btn_sugerir.configure(state="normal")
+        en_carrito = {l.cdb for l in self.cart}
+        nuevas = [l for l in lineas if l['cdb'] not in en_carrito]
+        for l in nuevas:
+            self.cart.agregar(l['cdb'], l['nombre'], l['precio'], l['cantidad'])
+        if not lineas:
+            mb.showinfo("Sugerencia", "No hay productos por debajo del punto de pedido")
+        else:
+            mb.showinfo("Sugerencia", f"{len(nuevas)} productos agregados al pedido "
+                                      f"({len(lineas) - len(nuevas)} ya estaban en el carrito)")
 
     def _limpiar(self):
-        self.cart = []
-        self.total = 0.0
-        self._render_cart()
+        self.cart.vaciar()
 
     def _confirmar(self):
         if not self.cart:
             mb.showwarning("Vacío", "No hay items en la compra")
             return
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        try:
-            cur.execute("INSERT INTO compra (fecha) VALUES (?)", (datetime.datetime.now().isoformat(),))
-            cid = cur.lastrowid
-            for it in self.cart:
-                cdb = int(it['cdb'])
-                cant = int(it['cantidad'])
-                precio = float(it['precio'])
-                cur.execute("SELECT cantidad FROM producto WHERE cdb=?", (cdb,))
-                res = cur.fetchone()
-                if not res:
-                    raise ValueError(f"Producto inexistente: {it['nombre']}")
-                nueva = res[0] + cant
-                cur.execute("UPDATE producto SET cantidad=?, price=? WHERE cdb=?", (nueva, precio, cdb))
-                cur.execute("INSERT INTO compra_detalle (compra, cdb, cantidad, precio_compra) VALUES (?, ?, ?, ?)", (cid, cdb, cant, precio))
-                cur.execute("UPDATE dinero SET total = total - ? WHERE id=1", (precio * cant,))
-                if it.get('vencimiento'):
-                    cur.execute("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, ?)", (cdb, cant, it['vencimiento']))
-            conn.commit()
-            mb.showinfo("Compra", "Compra registrada")
-            self._limpiar()
-            if self.on_alert:
-                self.on_alert()
-        except Exception as e:
-            conn.rollback()
-            mb.showerror("Error", str(e))
-        finally:
-            conn.close()
+        self.btn_confirmar.configure(state="disabled")
+        # lo que se escanee o agregue mientras se registra queda en el carrito
+        self._enviado = self.cart.contenido()
+        cart = self.cart.items()
+        self.executor.submit(comprar, self.db, cart, on_done=self._confirmada, on_error=self._fallo)
+
+    def _confirmada(self, res):
+        self.btn_confirmar.configure(state="normal")
+        self.cart.descontar(self._enviado)
+        mb.showinfo("Compra", "Compra registrada")
+        if self.bus:
+            self.bus.publish_cambios(res["cambios"])
+
+    def _fallo(self, e):
+        self.btn_confirmar.configure(state="normal")
+        self.btn_sugerir.configure(state="normal")
+        mb.showerror("Error", str(e))
 
 class CompraPicker(ctk.CTkToplevel):
     def __init__(self, parent, db, on_select):
@@ -106,27 +98,16 @@ class CompraPicker(ctk.CTkToplevel):
     def build(self):
         frame = ctk.CTkFrame(self)
         frame.pack(fill="both", expand=True, padx=12, pady=12)
-        self.search = ctk.CTkEntry(frame, placeholder_text="Buscar por nombre o CDB")
-        self.search.pack(fill="x", pady=6)
-        ctk.CTkButton(frame, text="Buscar", command=self._buscar).pack(pady=6)
-        self.results = ctk.CTkScrollableFrame(frame)
-        self.results.pack(fill="both", expand=True, pady=6)
-        self._buscar()
-
-    def _buscar(self):
-        for w in self.results.winfo_children():
-            w.destroy()
-        q = self.search.get().strip().lower()
-        products = fetch_all_products(self.db)
-        for p in products:
-            cdb, nombre, precio, cantidad, margen, umbral, perecedero = p
-            if q and q not in nombre.lower() and q not in str(cdb):
-                continue
-            row = ctk.CTkFrame(self.results)
-            row.pack(fill="x", pady=4, padx=4)
-            txt = f"{cdb} - {nombre} (Stock: {cantidad}) - ${precio:.2f}"
-            ctk.CTkLabel(row, text=txt).pack(side="left", padx=6)
-            ctk.CTkButton(row, text="Agregar", width=90, command=lambda p=p: self._seleccionar(p)).pack(side="right", padx=6)
+        self.search = ProductSearch(frame, self.db, self._seleccionar, getattr(self.master, "executor", None))
+        self.search.pack(fill="both", expand=True)
+        ctk.CTkButton(frame, text="Agregar", command=self._agregar_seleccionado).pack(pady=6)
+        self.search.search()
+        self.search.entry.focus_set()
+
+    def _agregar_seleccionado(self):
+        p = self.search.selected_row()
+        if p:
+            self._seleccionar(p)
 
     def _seleccionar(self, p):
         import tkinter.simpledialog as sd
@@ -134,11 +115,23 @@ class CompraPicker(ctk.CTkToplevel):
         precio = sd.askfloat("Precio compra", f"Ingrese precio unitario para {p[1]}:", minvalue=0.0)
         venc = None
         if p[6]:  # perecedero
-            venc = sd.askstring("Vencimiento", "Fecha de vencimiento (YYYY-MM-DD) o vacío")
+            venc = self._pedir_vencimiento()
         if cantidad and precio is not None:
             item = {'cdb': p[0], 'nombre': p[1], 'precio': precio, 'cantidad': cantidad, 'vencimiento': venc}
             self.on_select(item)
             self.destroy()
 
+    def _pedir_vencimiento(self):
+        """Fecha ISO o None si se deja vacía; una fecha mal escrita desordenaría los lotes (FEFO) y las alertas."""
+        import tkinter.simpledialog as sd
+        while True:
+            texto = sd.askstring("Vencimiento", "Fecha de vencimiento (YYYY-MM-DD) o vacío")
+            if not texto or not texto.strip():
+                return None
+            try:
+                return datetime.date.fromisoformat(texto.strip()).isoformat()
+            except ValueError:
+                mb.showerror("Vencimiento", f"Fecha inválida: {texto.strip()}", parent=self)
+
     def open(self):
         self.grab_set()
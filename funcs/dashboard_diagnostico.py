@@ -0,0 +1,65 @@
+# dashboard_diagnostico.py
+import customtkinter as ctk
+import tkinter.filedialog as fd
+import tkinter.messagebox as mb
+import lib_diagnostico
+
+# sentencias más costosas que se listan (el JSON exportado las tiene todas)
+TOP_SENTENCIAS = 25
+
+class DiagnosticoFrame(ctk.CTkFrame):
+    """Vista oculta (Ctrl+Shift+D) con los tiempos medidos por lib_diagnostico.
+
+    No tiene StaleTracker: se recalcula cada vez que se muestra.
+    """
+
+    def __init__(self, parent, db_path):
+        super().__init__(parent)
+        self.db = db_path
+        self.build()
+
+    def build(self):
+        header = ctk.CTkLabel(self, text="Diagnóstico", font=ctk.CTkFont(size=18, weight="bold"))
+        header.pack(pady=6)
+        botones = ctk.CTkFrame(self, fg_color="transparent")
+        botones.pack(fill="x", padx=12)
+        ctk.CTkButton(botones, text="Actualizar", command=self.update_contents).pack(side="left", padx=6)
+        ctk.CTkButton(botones, text="Reiniciar", command=self._reiniciar).pack(side="left", padx=6)
+        ctk.CTkButton(botones, text="Exportar…", command=self._exportar).pack(side="left", padx=6)
+        estado = "activa" if lib_diagnostico.ACTIVO else "desactivada (STOCK_DIAGNOSTICO=0)"
+        ctk.CTkLabel(botones, text=f"Medición de SQL {estado}, lentas ≥ {lib_diagnostico.LENTA_MS:g} ms").pack(side="left", padx=12)
+        self.texto = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        self.texto.pack(fill="both", expand=True, padx=12, pady=12)
+
+    def update_contents(self):
+        datos = lib_diagnostico.snapshot()
+        lineas = [f"{'medición':<40} {'n':>7} {'media':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9} {'total':>10}"]
+        for nombre, h in datos["histogramas"].items():
+            if h["n"]:
+                lineas.append(f"{nombre[:40]:<40} {h['n']:>7} {h['media_ms']:>9.2f} {h['p50_ms']:>9.2f} {h['p95_ms']:>9.2f} "
+                              f"{h['p99_ms']:>9.2f} {h['max_ms']:>9.2f} {h['total_ms']:>10.1f}")
+        lineas += ["", f"Sentencias por tiempo total (ms) — {len(datos['sentencias'])} distintas"]
+        for s in datos["sentencias"][:TOP_SENTENCIAS]:
+            ej = s["ejecucion"]
+            lineas.append(f"{s['total_ms']:>10.1f} n={ej['n']:<7} p99={ej.get('p99_ms', 0):<8.2f} "
+                          f"vm={s['pasos_vm']:<10} {s['sql'][:120]}")
+        lineas += ["", f"Sentencias lentas (últimas {len(datos['lentas'])})"]
+        for l in reversed(datos["lentas"]):
+            lineas.append(f"{l['fecha']} {l['ms']:>9.1f} ms {l['etapa']:<9} {l['hilo']:<12} {l['sql'][:120]}")
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", "end")
+        self.texto.insert("1.0", "\n".join(lineas))
+        self.texto.configure(state="disabled")
+
+    def _reiniciar(self):
+        lib_diagnostico.reiniciar()
+        self.update_contents()
+
+    def _exportar(self):
+        ruta = fd.asksaveasfilename(title="Exportar diagnóstico", defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not ruta:
+            return
+        try:
+            lib_diagnostico.exportar(ruta)
+        except OSError as e:
+            mb.showerror("Error", str(e))
@@ -1,39 +1,246 @@
 # dashboard_reportes.py
 import customtkinter as ctk
-import sqlite3
-from lib_db import get_connection
+import datetime
+import threading
+import tkinter.filedialog as fd
+import tkinter.messagebox as mb
+from lib_executor import SyncExecutor
+from lib_eventos import StaleTracker
+from lib_resumenes import totales, top_productos, rango_default
+from lib_historial import pagina, cursor_de, PAGE_SIZE
+from lib_exportar import exportar_reporte, Cancelado, REPORTES
+from funcs.virtual_grid import VirtualGrid
+
+_dinero = lambda v: f"{v:.2f}" if v is not None else ""
+
+# columnas comunes a ventas y compras: (id de línea, id de venta/compra, fecha, cdb, cantidad, precio)
+REPORTE_COLUMNS = [
+    ("ID", 1, 70, None),
+    ("Fecha", 2, 200, None),
+    ("CDB", 3, 110, None),
+    ("Cant", 4, 70, None),
+    ("Precio", 5, 90, _dinero),
+]
+# (período, ventas, unidades vendidas, importe vendido, unidades compradas, importe comprado)
+TOTALES_COLUMNS = [
+    ("Período", 0, 110, None),
+    ("Ventas", 1, 70, None),
+    ("Unid. vend.", 2, 90, None),
+    ("Vendido", 3, 100, _dinero),
+    ("Unid. comp.", 4, 90, None),
+    ("Comprado", 5, 100, _dinero),
+]
+# (cdb, nombre, unidades, importe, margen)
+TOP_COLUMNS = [
+    ("CDB", 0, 110, None),
+    ("Nombre", 1, 200, None),
+    ("Unid.", 2, 70, None),
+    ("Importe", 3, 100, _dinero),
+    ("Margen est.", 4, 100, _dinero),
+]
+PERIODOS = {"Día": "dia", "Semana": "semana", "Mes": "mes"}
+TIPOS = {"Ventas": "ventas", "Compras": "compras"}
+# título en el menú de exportación: reporte de lib_exportar
+EXPORTACIONES = {titulo: nombre for nombre, (titulo, _, _) in REPORTES.items()}
 
 class ReportesFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path):
+    def __init__(self, parent, db_path, bus=None, executor=None):
         super().__init__(parent)
         self.db = db_path
+        self.executor = executor or SyncExecutor()
+        self.pendientes = StaleTracker()
+        if bus:
+            for tabla in ("venta", "venta_detalle", "compra", "compra_detalle"):
+                bus.subscribe(tabla, self.pendientes.mark)
         self.build()
 
     def build(self):
         header = ctk.CTkLabel(self, text="Reportes", font=ctk.CTkFont(size=18, weight="bold"))
         header.pack(pady=6)
-        ctk.CTkButton(self, text="Refrescar", command=self.update_contents).pack(pady=6)
-        self.frame = ctk.CTkScrollableFrame(self)
-        self.frame.pack(fill="both", expand=True, padx=12, pady=6)
+        barra = ctk.CTkFrame(self, fg_color="transparent")
+        barra.pack(pady=6)
+        self.vista = ctk.CTkSegmentedButton(barra, values=["Historial", "Resumen"], command=self._cambiar_vista)
+        self.vista.set("Historial")
+        self.vista.pack(side="left", padx=6)
+        ctk.CTkButton(barra, text="Refrescar", command=self._refrescar).pack(side="left", padx=6)
+        # exportación completa (usa el rango Desde/Hasta del historial)
+        self.exportacion = ctk.CTkOptionMenu(barra, values=list(EXPORTACIONES), width=170)
+        self.exportacion.pack(side="left", padx=(18, 6))
+        self.btn_exportar = ctk.CTkButton(barra, text="Exportar…", width=90, command=self._exportar)
+        self.btn_exportar.pack(side="left", padx=6)
+        self.btn_cancelar = ctk.CTkButton(barra, text="Cancelar", width=80, state="disabled", command=self._cancelar)
+        self.btn_cancelar.pack(side="left", padx=6)
+        self._cancelar_exportacion = None
+        self._progreso = None
+        self.status = ctk.CTkLabel(self, text="")
+        self.status.pack()
+
+        self.historial = ctk.CTkFrame(self, fg_color="transparent")
+        filtros = ctk.CTkFrame(self.historial, fg_color="transparent")
+        filtros.pack(fill="x", pady=4)
+        self.tipo = ctk.CTkSegmentedButton(filtros, values=list(TIPOS), command=lambda _: self._refrescar())
+        self.tipo.set("Ventas")
+        self.tipo.pack(side="left", padx=6)
+        self.desde = ctk.CTkEntry(filtros, placeholder_text="Desde AAAA-MM-DD", width=140)
+        self.desde.pack(side="left", padx=4)
+        self.hasta = ctk.CTkEntry(filtros, placeholder_text="Hasta AAAA-MM-DD", width=140)
+        self.hasta.pack(side="left", padx=4)
+        self.cdb = ctk.CTkEntry(filtros, placeholder_text="CDB", width=140)
+        self.cdb.pack(side="left", padx=4)
+        for e in (self.desde, self.hasta, self.cdb):
+            e.bind("<Return>", lambda _: self._refrescar())
+        ctk.CTkButton(filtros, text="Filtrar", width=80, command=self._refrescar).pack(side="left", padx=6)
+        # las páginas siguientes se piden al acercarse al final del scroll
+        self.lineas = VirtualGrid(self.historial, REPORTE_COLUMNS, on_end=self._siguiente)
+        self.lineas.pack(fill="both", expand=True, pady=6)
+        self._filtro = None
+        self._cursor = None
+        self._agotado = True
+        self._cargando = False
+
+        self.resumen = ctk.CTkFrame(self, fg_color="transparent")
+        self.periodo = ctk.CTkSegmentedButton(self.resumen, values=list(PERIODOS), command=lambda _: self._refrescar())
+        self.periodo.set("Día")
+        self.periodo.pack(anchor="w", padx=6, pady=4)
+        self.totales = VirtualGrid(self.resumen, TOTALES_COLUMNS)
+        self.totales.pack(fill="both", expand=True, pady=6)
+        self.rango = ctk.CTkLabel(self.resumen, text="Productos más vendidos")
+        self.rango.pack(anchor="w", padx=6, pady=4)
+        self.top = VirtualGrid(self.resumen, TOP_COLUMNS)
+        self.top.pack(fill="both", expand=True, pady=6)
+
+        self.historial.pack(fill="both", expand=True, padx=12)
+
+    def _cambiar_vista(self, vista):
+        if vista == "Resumen":
+            self.historial.pack_forget()
+            self.resumen.pack(fill="both", expand=True, padx=12)
+        else:
+            self.resumen.pack_forget()
+            self.historial.pack(fill="both", expand=True, padx=12)
+        self._refrescar()
+
+    def _refrescar(self):
+        self.pendientes.invalidate()
+        self.update_contents()
 
     def update_contents(self):
-        for w in self.frame.winfo_children():
-            w.destroy()
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        cur.execute("""SELECT v.id, v.fecha, vd.cdb, vd.cantidad, vd.precio_venta
-                       FROM venta v JOIN venta_detalle vd ON v.id = vd.venta
-                       ORDER BY v.fecha DESC LIMIT 200""")
-        ventas = cur.fetchall()
-        ctk.CTkLabel(self.frame, text="Ventas recientes").pack(anchor="w", padx=6, pady=4)
-        for v in ventas:
-            ctk.CTkLabel(self.frame, text=str(v)).pack(anchor="w", padx=6)
-
-        cur.execute("""SELECT c.id, c.fecha, cd.cdb, cd.cantidad, cd.precio_compra
-                       FROM compra c JOIN compra_detalle cd ON c.id = cd.compra
-                       ORDER BY c.fecha DESC LIMIT 200""")
-        compras = cur.fetchall()
-        ctk.CTkLabel(self.frame, text="Compras recientes").pack(anchor="w", padx=6, pady=8)
-        for c in compras:
-            ctk.CTkLabel(self.frame, text=str(c)).pack(anchor="w", padx=6)
-        conn.close()
+        self.pendientes.take()
+        self.status.configure(text="Cargando…")
+        self.executor.cancel(self)
+        if self.vista.get() == "Resumen":
+            periodo = PERIODOS[self.periodo.get()]
+            self.executor.submit(self._query_resumen, self.db, periodo, on_done=self._loaded_resumen,
+                                 tag=self, interruptible=True)
+        else:
+            try:
+                self._filtro = self._leer_filtros()
+            except ValueError as e:
+                self.status.configure(text=str(e))
+                return
+            self._cursor, self._agotado, self._cargando = None, False, True
+            self.executor.submit(pagina, self.db, *self._filtro, on_done=self._loaded,
+                                 on_error=self._fallo, tag=self, interruptible=True)
+
+    def _leer_filtros(self):
+        desde, hasta = self.desde.get().strip() or None, self.hasta.get().strip() or None
+        for fecha in (desde, hasta):
+            if fecha:
+                try:
+                    datetime.date.fromisoformat(fecha)
+                except ValueError:
+                    raise ValueError(f"Fecha inválida: {fecha}") from None
+        cdb = self.cdb.get().strip()
+        if cdb and not cdb.isdigit():
+            raise ValueError(f"CDB inválido: {cdb}")
+        return TIPOS[self.tipo.get()], desde, hasta, int(cdb) if cdb else None
+
+    def _siguiente(self):
+        # lo llama la grilla al acercarse al final de las filas cargadas
+        if self._cargando or self._agotado or self._filtro is None:
+            return
+        self._cargando = True
+        self.executor.submit(pagina, self.db, *self._filtro, self._cursor, on_done=self._pagina,
+                             on_error=self._fallo, tag=self, interruptible=True)
+
+    @staticmethod
+    def _query_resumen(db, periodo):
+        # corre en un hilo de trabajo; lee solo las tablas de resumen
+        desde, hasta = rango_default(periodo)
+        return desde, hasta, totales(db, periodo, desde, hasta), top_productos(db, desde, hasta)
+
+    def _loaded(self, filas):
+        self.status.configure(text="")
+        self.lineas.set_rows([])
+        self._pagina(filas)
+
+    def _pagina(self, filas):
+        self._cargando = False
+        self._agotado = len(filas) < PAGE_SIZE
+        if filas:
+            self._cursor = cursor_de(filas)
+            self.lineas.append_rows(filas)
+
+    def _fallo(self, exc):
+        self._cargando = False
+        self.status.configure(text=f"Error: {exc}")
+
+    # --- exportación ---
+    def _exportar(self):
+        nombre = EXPORTACIONES[self.exportacion.get()]
+        try:
+            _, desde, hasta, _ = self._leer_filtros()
+        except ValueError as e:
+            self.status.configure(text=str(e))
+            return
+        ruta = fd.asksaveasfilename(title="Exportar reporte", defaultextension=".csv", initialfile=nombre,
+                                    filetypes=[("CSV", "*.csv"), ("PDF", "*.pdf")])
+        if not ruta:
+            return
+        self._cancelar_exportacion = threading.Event()
+        self._progreso = "Exportando…"
+        self.btn_exportar.configure(state="disabled")
+        self.btn_cancelar.configure(state="normal")
+        self._mostrar_progreso()
+        # tag propio: sigue corriendo aunque se cambie de pestaña o se refresque la vista
+        self.executor.submit(exportar_reporte, self.db, nombre, ruta, desde, hasta, self._avance,
+                             self._cancelar_exportacion, on_done=self._exportado, on_error=self._fallo_exportar,
+                             tag=(self, "exportar"))
+
+    def _avance(self, filas):
+        # corre en el hilo de trabajo: solo deja el texto para _mostrar_progreso
+        self._progreso = f"Exportando… {filas} filas"
+
+    def _mostrar_progreso(self):
+        if self._cancelar_exportacion is None:
+            return
+        self.status.configure(text=self._progreso)
+        self.after(200, self._mostrar_progreso)
+
+    def _cancelar(self):
+        if self._cancelar_exportacion is not None:
+            self._cancelar_exportacion.set()
+            self._progreso = "Cancelando…"
+
+    def _fin_exportacion(self, texto):
+        self._cancelar_exportacion = None
+        self.btn_exportar.configure(state="normal")
+        self.btn_cancelar.configure(state="disabled")
+        self.status.configure(text=texto)
+
+    def _exportado(self, filas):
+        self._fin_exportacion(f"{filas} filas exportadas")
+
+    def _fallo_exportar(self, exc):
+        if isinstance(exc, Cancelado):
+            self._fin_exportacion("Exportación cancelada")
+            return
+        self._fin_exportacion("")
+        mb.showerror("Error", str(exc))
+
+    def _loaded_resumen(self, res):
+        desde, hasta, filas, top = res
+        self.status.configure(text="")
+        self.rango.configure(text=f"Productos más vendidos ({desde} a {hasta})")
+        self.totales.set_rows(filas)
+        self.top.set_rows(top)
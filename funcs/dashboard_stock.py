@@ -1,13 +1,33 @@
 # dashboard_stock.py
 import customtkinter as ctk
 import tkinter.messagebox as mb
-from lib_db import fetch_all_products, get_connection
+from lib_db import fetch_all_products, get_product
+from lib_executor import SyncExecutor
+from lib_eventos import StaleTracker
+from lib_importar import importar_catalogo, exportar_catalogo
+from lib_servicio import guardar_producto, borrar_producto
+from funcs.virtual_grid import VirtualGrid
 import sqlite3
+import tkinter.filedialog as fd
+
+STOCK_COLUMNS = [
+    ("CDB", 0, 110, None),
+    ("Nombre", 1, 300, None),
+    ("Precio", 2, 90, lambda v: f"{v:.2f}"),
+    ("Cant", 3, 70, None),
+    ("Umbral", 5, 70, None),
+    ("P", 6, 30, lambda v: "Y" if v else "N"),
+]
 
 class StockFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path):
+    def __init__(self, parent, db_path, bus=None, executor=None):
         super().__init__(parent)
         self.db = db_path
+        self.bus = bus
+        self.executor = executor or SyncExecutor()
+        self.pendientes = StaleTracker()
+        if bus:
+            bus.subscribe("producto", self.pendientes.mark)
         self._build_ui()
 
     def _build_ui(self):
@@ -16,51 +36,64 @@ class StockFrame(ctk.CTkFrame):
 
         btn_frame = ctk.CTkFrame(self)
         btn_frame.pack(fill="x", padx=12, pady=6)
-        ctk.CTkButton(btn_frame, text="Refrescar", command=self.update_contents).pack(side="left", padx=6)
+        ctk.CTkButton(btn_frame, text="Refrescar", command=self._refrescar).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Agregar", command=self._add_dialog).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Editar", command=self._edit_selected).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Eliminar", command=self._delete_selected).pack(side="left", padx=6)
+        self.btn_importar = ctk.CTkButton(btn_frame, text="Importar", command=self._importar)
+        self.btn_importar.pack(side="left", padx=6)
+        self.btn_exportar = ctk.CTkButton(btn_frame, text="Exportar", command=self._exportar)
+        self.btn_exportar.pack(side="left", padx=6)
+        self.status = ctk.CTkLabel(btn_frame, text="")
+        self.status.pack(side="right", padx=6)
+
+        # tabla virtual: el costo de dibujar depende del alto visible, no del catálogo
+        self.table = VirtualGrid(self, STOCK_COLUMNS, on_select=self._select, on_activate=lambda p: self._edit_selected())
+        self.table.pack(fill="both", expand=True, padx=12, pady=6)
+        self._selected = None
+        # avance de la importación/exportación en curso (lo escribe el hilo de trabajo)
+        self._progreso = None
 
-        self.table_frame = ctk.CTkScrollableFrame(self)
-        self.table_frame.pack(fill="both", expand=True, padx=12, pady=6)
+    def update_contents(self):
+        todo, claves = self.pendientes.take()
+        if todo:
+            self.status.configure(text="Cargando…")
+            self.executor.submit(fetch_all_products, self.db, on_done=self._loaded, tag=self, interruptible=True)
+        elif claves:
+            # solo se releen y redibujan los productos que cambiaron
+            self.executor.submit(self._fetch_changed, self.db, claves, on_done=self.table.patch_rows, tag=self)
+
+    @staticmethod
+    def _fetch_changed(db, claves):
+        return {cdb: get_product(db, cdb) for cdb in claves}
+
+    def _refrescar(self):
+        self.pendientes.invalidate()
+        self.update_contents()
 
-        # simple list as table
-        self.rows = []
+    def _changed(self, cdb):
+        if self.bus:
+            self.bus.publish("producto", [cdb])
+        else:
+            self.pendientes.mark("producto", {cdb})
+            self.update_contents()
 
-    def update_contents(self):
-        for w in self.table_frame.winfo_children():
-            w.destroy()
-        products = fetch_all_products(self.db)
-        hdr = ctk.CTkLabel(self.table_frame, text=f"{'CDB':<10}{'Nombre':<35}{'Precio':>8}{'Cant':>8}{'Umbral':>8}{'P':>3}")
-        hdr.pack(anchor="w", padx=6, pady=(4,2))
-        self.rows = []
-        for p in products:
-            cdb, nombre, precio, cantidad, margen, umbral, perecedero = p
-            txt = f"{str(cdb):<10}{nombre[:32]:<35}{precio:8.2f}{cantidad:8d}{umbral:8d}{'Y' if perecedero else 'N'}"
-            lbl = ctk.CTkLabel(self.table_frame, text=txt, anchor="w")
-            lbl.pack(fill="x", padx=6, pady=2)
-            lbl.bind("<Button-1>", lambda e, id=cdb: self._select(id))
-            self.rows.append((cdb, lbl))
-        self._selected = None
+    def _loaded(self, products):
+        self.status.configure(text=f"{len(products)} productos")
+        self.table.set_rows(products)
 
-    def _select(self, cdb):
-        self._selected = cdb
-        # highlight selected
-        for id_, lbl in self.rows:
-            if id_ == cdb:
-                lbl.configure(text_color="green")
-            else:
-                lbl.configure(text_color=None)
+    def _select(self, p):
+        self._selected = p[0]
 
     def _add_dialog(self):
-        dlg = ProductEditor(self, self.db, on_save=self.update_contents)
+        dlg = ProductEditor(self, self.db, on_save=self._changed)
         dlg.open()
 
     def _edit_selected(self):
         if not getattr(self, "_selected", None):
             mb.showwarning("Seleccionar", "Seleccione un producto en la lista")
             return
-        dlg = ProductEditor(self, self.db, cdb=self._selected, on_save=self.update_contents)
+        dlg = ProductEditor(self, self.db, cdb=self._selected, on_save=self._changed)
         dlg.open()
 
     def _delete_selected(self):
@@ -69,12 +102,87 @@ class StockFrame(ctk.CTkFrame):
             return
         if not mb.askyesno("Confirmar", "Eliminar producto seleccionado?"):
             return
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM producto WHERE cdb=?", (self._selected,))
-        conn.commit()
-        conn.close()
-        self.update_contents()
+        cdb = self._selected
+        borrar_producto(self.db, cdb)
+        self._selected = None
+        self._changed(cdb)
+
+    # --- importación / exportación ---
+    TIPOS_ARCHIVO = [("CSV", "*.csv"), ("Excel", "*.xlsx"), ("Todos", "*.*")]
+
+    def _ocupado(self, ocupado):
+        estado = "disabled" if ocupado else "normal"
+        self.btn_importar.configure(state=estado)
+        self.btn_exportar.configure(state=estado)
+        if ocupado:
+            self._mostrar_progreso()
+        else:
+            self._progreso = None
+
+    def _mostrar_progreso(self):
+        if self.btn_importar.cget("state") == "normal":
+            return
+        if self._progreso:
+            self.status.configure(text=self._progreso)
+        self.after(200, self._mostrar_progreso)
+
+    def _importar(self):
+        ruta = fd.askopenfilename(title="Importar catálogo", filetypes=self.TIPOS_ARCHIVO)
+        if not ruta:
+            return
+        # primero se simula: se valida el archivo y se muestra qué va a cambiar
+        self._ocupado(True)
+        self._progreso = "Validando…"
+        self.executor.submit(importar_catalogo, self.db, ruta, True, self._avance,
+                             on_done=lambda res: self._simulado(ruta, res), on_error=self._fallo)
+
+    def _avance(self, res):
+        # corre en el hilo de trabajo: solo deja el texto para _mostrar_progreso
+        self._progreso = f"{'Validando' if res.dry_run else 'Importando'}… {res.leidas} filas"
+
+    def _simulado(self, ruta, res):
+        self._ocupado(False)
+        self.status.configure(text="")
+        detalle = "\n".join(f"Línea {linea}: {msg}" for linea, msg in res.errores[:10])
+        if res.total_errores > 10:
+            detalle += f"\n… y {res.total_errores - 10} más"
+        texto = f"{res.nuevos} productos nuevos y {res.actualizados} existentes."
+        if res.total_errores:
+            texto += f"\n{res.total_errores} filas con errores se van a omitir:\n{detalle}"
+        if not mb.askyesno("Importar catálogo", texto + "\n\n¿Importar?"):
+            return
+        self._ocupado(True)
+        self.executor.submit(importar_catalogo, self.db, ruta, False, self._avance,
+                             on_done=self._importado, on_error=self._fallo)
+
+    def _importado(self, res):
+        self._ocupado(False)
+        self.status.configure(text=str(res))
+        if self.bus:
+            self.bus.publish("producto", None)
+            self.bus.publish("vencimientos", None)
+        else:
+            self._refrescar()
+
+    def _exportar(self):
+        ruta = fd.asksaveasfilename(title="Exportar catálogo", defaultextension=".csv", filetypes=self.TIPOS_ARCHIVO)
+        if not ruta:
+            return
+        self._ocupado(True)
+        self.executor.submit(exportar_catalogo, self.db, ruta, self._avance_exportar,
+                             on_done=self._exportado, on_error=self._fallo)
+
+    def _avance_exportar(self, total):
+        self._progreso = f"Exportando… {total} productos"
+
+    def _exportado(self, total):
+        self._ocupado(False)
+        self.status.configure(text=f"{total} productos exportados")
+
+    def _fallo(self, e):
+        self._ocupado(False)
+        self.status.configure(text="")
+        mb.showerror("Error", str(e))
 
 class ProductEditor(ctk.CTkToplevel):
     def __init__(self, parent, db_path, cdb=None, on_save=None):
@@ -82,6 +190,8 @@ class ProductEditor(ctk.CTkToplevel):
         self.db = db_path
         self.cdb = cdb
         self.on_save = on_save
+        # stock mostrado al abrir: al guardar se aplica solo la diferencia
+        self.cantidad_original = 0
         self.title("Producto")
         self.geometry("420x320")
         self.build()
@@ -100,13 +210,10 @@ class ProductEditor(ctk.CTkToplevel):
         ctk.CTkButton(self.frame, text="Guardar", command=self.save).grid(row=7, column=0, columnspan=2, pady=12)
 
         if self.cdb:
-            conn = get_connection(self.db)
-            cur = conn.cursor()
-            cur.execute("SELECT cdb, nombre, precio, cantidad, margen, umbral, perecedero FROM producto WHERE cdb=?", (self.cdb,))
-            row = cur.fetchone()
-            conn.close()
+            row = get_product(self.db, self.cdb)
             if row:
                 cdb, nombre, precio, cantidad, margen, umbral, perecedero = row
+                self.cantidad_original = cantidad
                 self.entries["cdb"].insert(0, str(cdb))
                 self.entries["cdb"].configure(state="disabled")
                 self.entries["nombre"].insert(0, nombre)
@@ -122,25 +229,19 @@ class ProductEditor(ctk.CTkToplevel):
     def save(self):
         try:
             cdb = int(self.entries["cdb"].get())
-            nombre = self.entries["nombre"].get().strip()
-            precio = float(self.entries["precio"].get() or 0)
-            cantidad = int(self.entries["cantidad"].get() or 0)
-            umbral = int(self.entries["umbral"].get() or 0)
-            margen = float(self.entries["margen"].get() or 0.2)
-            perec = 1 if self.perec_var.get() else 0
-
-            conn = get_connection(self.db)
-            cur = conn.cursor()
-            if self.cdb:
-                cur.execute("""UPDATE producto SET nombre=?, precio=?, cantidad=?, umbral=?, margen=?, perecedero=? WHERE cdb=?""",
-                            (nombre, precio, cantidad, umbral, margen, perec, cdb))
-            else:
-                cur.execute("""INSERT INTO producto (cdb, nombre, precio, cantidad, umbral, margen, perecedero) VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                            (cdb, nombre, precio, cantidad, umbral, margen, perec))
-            conn.commit()
-            conn.close()
+            datos = {
+                "cdb": cdb,
+                "nombre": self.entries["nombre"].get().strip(),
+                "precio": float(self.entries["precio"].get() or 0),
+                "cantidad": int(self.entries["cantidad"].get() or 0),
+                "umbral": int(self.entries["umbral"].get() or 0),
+                "margen": float(self.entries["margen"].get() or 0.2),
+                "perecedero": 1 if self.perec_var.get() else 0,
+            }
+            # al modificar, las ventas de otras terminales mientras el editor estaba abierto se conservan
+            guardar_producto(self.db, datos, self.cantidad_original if self.cdb else None)
             if self.on_save:
-                self.on_save()
+                self.on_save(cdb)
             self.destroy()
         except Exception as e:
             mb.showerror("Error", str(e))
@@ -1,13 +1,32 @@
 # dashboard_vencimientos.py
 import customtkinter as ctk
 import tkinter.messagebox as mb
-from lib_db import get_connection, fetch_all_products
-import datetime
+from lib_db import get_connection, QUERIES
+from lib_executor import SyncExecutor
+from lib_eventos import StaleTracker
+from lib_lotes import purgar_vencidos
+from lib_servicio import asignar_lote
+from funcs.virtual_grid import VirtualGrid
+
+# (id, cdb, nombre, cantidad, fecha de vencimiento)
+LOTE_COLUMNS = [
+    ("Vence", 4, 110, None),
+    ("CDB", 1, 130, None),
+    ("Nombre", 2, 260, None),
+    ("Cant", 3, 70, None),
+]
 
 class VencimientosFrame(ctk.CTkFrame):
-    def __init__(self, parent, db_path):
+    def __init__(self, parent, db_path, bus=None, executor=None):
         super().__init__(parent)
         self.db = db_path
+        self.bus = bus
+        self.executor = executor or SyncExecutor()
+        self.pendientes = StaleTracker()
+        if bus:
+            # los cambios de stock mueven las cantidades de los lotes
+            bus.subscribe("producto", self.pendientes.mark)
+            bus.subscribe("vencimientos", self.pendientes.mark)
         self.build()
 
     def build(self):
@@ -15,50 +34,66 @@ class VencimientosFrame(ctk.CTkFrame):
         header.pack(pady=6)
         top = ctk.CTkFrame(self)
         top.pack(fill="x", padx=12, pady=6)
-        ctk.CTkButton(top, text="Refrescar", command=self.update_contents).pack(side="left", padx=6)
-        ctk.CTkButton(top, text="Añadir", command=self._add).pack(side="left", padx=6)
-        ctk.CTkButton(top, text="Eliminar expirados", command=self._limpiar_expirados).pack(side="left", padx=6)
-        self.list_frame = ctk.CTkScrollableFrame(self)
-        self.list_frame.pack(fill="both", expand=True, padx=12, pady=6)
+        ctk.CTkButton(top, text="Refrescar", command=self._refrescar).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Asignar vencimiento", command=self._add).pack(side="left", padx=6)
+        self.btn_limpiar = ctk.CTkButton(top, text="Eliminar expirados", command=self._limpiar_expirados)
+        self.btn_limpiar.pack(side="left", padx=6)
+        self.status = ctk.CTkLabel(self, text="")
+        self.status.pack()
+        self.lotes = VirtualGrid(self, LOTE_COLUMNS)
+        self.lotes.pack(fill="both", expand=True, padx=12, pady=6)
+
+    def _refrescar(self):
+        self.pendientes.invalidate()
+        self.update_contents()
+
+    def _changed(self, claves=None):
+        if self.bus:
+            self.bus.publish("producto", claves)
+            self.bus.publish("vencimientos", claves)
+        else:
+            self.update_contents()
 
     def update_contents(self):
-        for w in self.list_frame.winfo_children():
-            w.destroy()
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        cur.execute("SELECT cdb, cantidad, fecha_vencimiento FROM vencimientos ORDER BY fecha_vencimiento")
-        rows = cur.fetchall()
-        conn.close()
-        for r in rows:
-            cdb, cantidad, fv = r
-            lbl = ctk.CTkLabel(self.list_frame, text=f"{cdb} - Cant: {cantidad} - Vto: {fv}")
-            lbl.pack(fill="x", padx=6, pady=4)
+        self.pendientes.take()
+        self.executor.submit(self._query, self.db, on_done=self.lotes.set_rows, tag=self, interruptible=True)
+
+    @staticmethod
+    def _query(db):
+        # corre en un hilo de trabajo; solo los lotes con fecha, por el índice
+        return get_connection(db).execute(*QUERIES["vencimientos_lista"]).fetchall()
 
     def _add(self):
+        # reparte stock existente: las unidades pasan del lote sin fecha al lote con vencimiento
         import tkinter.simpledialog as sd
         cdb = sd.askinteger("CDB", "Código de Barras:")
         if not cdb:
             return
         cantidad = sd.askinteger("Cantidad", "Cantidad:", minvalue=1)
-        fecha = sd.askstring("Vencimiento", "Fecha (YYYY-MM-DD) o vacío")
+        if not cantidad:
+            return
+        fecha = sd.askstring("Vencimiento", "Fecha (YYYY-MM-DD)")
         try:
-            fecha_iso = None
-            if fecha and fecha.strip():
-                fecha_iso = datetime.date.fromisoformat(fecha.strip()).isoformat()
-            conn = get_connection(self.db)
-            cur = conn.cursor()
-            cur.execute("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, ?)", (cdb, cantidad, fecha_iso))
-            conn.commit()
-            conn.close()
-            self.update_contents()
+            asignar_lote(self.db, cdb, cantidad, fecha or "")
+            self._changed([cdb])
         except Exception as e:
             mb.showerror("Error", str(e))
 
     def _limpiar_expirados(self):
-        conn = get_connection(self.db)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM vencimientos WHERE fecha_vencimiento < date('now')")
-        conn.commit()
-        conn.close()
-        mb.showinfo("Limpieza", "Vencimientos expirados eliminados")
-        self.update_contents()
+        if not mb.askyesno("Limpieza", "Los lotes vencidos se descuentan del stock. ¿Continuar?"):
+            return
+        self.btn_limpiar.configure(state="disabled")
+        self.status.configure(text="Eliminando expirados…")
+        self.executor.submit(purgar_vencidos, self.db, on_done=self._limpiado, on_error=self._fallo)
+
+    def _limpiado(self, res):
+        lotes, unidades = res
+        self.btn_limpiar.configure(state="normal")
+        self.status.configure(text=f"{lotes} lotes vencidos eliminados ({unidades} unidades)")
+        if lotes:
+            self._changed()
+
+    def _fallo(self, exc):
+        self.btn_limpiar.configure(state="normal")
+        self.status.configure(text="")
+        mb.showerror("Error", str(exc))
@@ -0,0 +1,68 @@
+# product_search.py
+import customtkinter as ctk
+from lib_db import search_products
+from lib_executor import SyncExecutor
+from funcs.virtual_grid import VirtualGrid
+
+SEARCH_COLUMNS = [
+    ("CDB", 0, 110, None),
+    ("Nombre", 1, 230, None),
+    ("Stock", 3, 60, None),
+    ("Precio", 2, 80, lambda v: f"{v:.2f}"),
+]
+# espera entre teclas antes de consultar (ms)
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_LIMIT = 50
+
+class ProductSearch(ctk.CTkFrame):
+    """Buscador incremental: consulta el índice mientras se escribe, con debounce."""
+
+    def __init__(self, parent, db, on_pick, executor=None):
+        super().__init__(parent, fg_color="transparent")
+        self.db = db
+        self.on_pick = on_pick
+        self.executor = executor or SyncExecutor()
+        self._pending = None
+        self.entry = ctk.CTkEntry(self, placeholder_text="Buscar por nombre o CDB")
+        self.entry.pack(fill="x", pady=6)
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", lambda e: self._pick_first())
+        self.results = VirtualGrid(self, SEARCH_COLUMNS, on_activate=self.on_pick)
+        self.results.pack(fill="both", expand=True, pady=6)
+
+    def _on_key(self, event=None):
+        # cada tecla descarta la búsqueda pendiente: solo corre la última
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(SEARCH_DEBOUNCE_MS, self.search)
+
+    def search(self):
+        self._pending = None
+        # una búsqueda nueva invalida (e interrumpe) la anterior si sigue corriendo
+        self.executor.cancel(self)
+        self.executor.submit(search_products, self.db, self.entry.get(), SEARCH_LIMIT,
+                             on_done=self.results.set_rows, tag=self, interruptible=True)
+
+    def selected_row(self):
+        sel = self.results.selected
+        for r in self.results.rows():
+            if r[0] == sel:
+                return r
+        return None
+
+    def _pick_first(self):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+        self.executor.cancel(self)
+        rows = search_products(self.db, self.entry.get(), SEARCH_LIMIT)
+        self.results.set_rows(rows)
+        if rows:
+            self.on_pick(rows[0])
+
+    def destroy(self):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+        self.executor.cancel(self)
+        super().destroy()
@@ -0,0 +1,208 @@
+# virtual_grid.py
+import customtkinter as ctk
+
+class VirtualGrid(ctk.CTkFrame):
+    """Tabla virtual: solo dibuja las filas visibles reutilizando un pool fijo de widgets.
+
+    columns: lista de (titulo, indice_en_la_fila, ancho, formato). `formato` es un
+    callable opcional que recibe el valor y devuelve el texto a mostrar.
+    Las filas son tuplas; `key_index` indica qué campo identifica a cada fila.
+    `on_end` se llama cuando el scroll llega a la última pantalla cargada, para
+    que el dueño pida la página siguiente y la agregue con append_rows.
+    """
+
+    def __init__(self, parent, columns, key_index=0, row_height=26, on_select=None, on_activate=None,
+                 on_end=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.key_index = key_index
+        self.row_height = row_height
+        self.on_select = on_select
+        self.on_activate = on_activate
+        self.on_end = on_end
+        self._rows = []
+        self._top = 0
+        self._sort_col = None
+        self._sort_desc = False
+        self._selected = None
+        self._pool = []
+        self._default_fg = None
+        self._build()
+
+    def _build(self):
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        self.header = ctk.CTkFrame(self, fg_color="transparent")
+        self.header.grid(row=0, column=0, sticky="we")
+        self._header_btns = []
+        for i, (titulo, _, ancho, _) in enumerate(self.columns):
+            btn = ctk.CTkButton(self.header, text=titulo, width=ancho, height=self.row_height, anchor="w",
+                                fg_color="transparent", text_color=("gray10", "gray90"),
+                                command=lambda i=i: self.sort_by(i))
+            btn.grid(row=0, column=i, sticky="we", padx=1)
+            self._header_btns.append(btn)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nswe")
+        self.body.grid_propagate(False)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.body.bind("<Configure>", self._on_resize)
+        for w in (self.body, self.scrollbar):
+            self._bind_wheel(w)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll(-3))
+        widget.bind("<Button-5>", lambda e: self.scroll(3))
+
+    # --- pool de filas ---
+    def _visible_count(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _ensure_pool(self, n):
+        while len(self._pool) < n:
+            r = len(self._pool)
+            row = ctk.CTkFrame(self.body, height=self.row_height, corner_radius=0, fg_color="transparent")
+            row.grid(row=r, column=0, sticky="we")
+            cells = []
+            for i, (_, _, ancho, _) in enumerate(self.columns):
+                lbl = ctk.CTkLabel(row, text="", width=ancho, height=self.row_height, anchor="w")
+                lbl.grid(row=0, column=i, sticky="we", padx=1)
+                cells.append(lbl)
+            for w in [row] + cells:
+                w.bind("<Button-1>", lambda e, r=r: self._on_click(r))
+                w.bind("<Double-Button-1>", lambda e, r=r: self._on_double(r))
+                self._bind_wheel(w)
+            if self._default_fg is None:
+                self._default_fg = row.cget("fg_color")
+            self._pool.append((row, cells, [None] * len(cells)))
+
+    def _on_resize(self, event=None):
+        self._ensure_pool(self._visible_count())
+        self.refresh()
+
+    # --- datos ---
+    def set_rows(self, rows):
+        self._rows = list(rows)
+        self._apply_sort()
+        self._top = min(self._top, max(0, len(self._rows) - self._visible_count()))
+        self.refresh()
+
+    def append_rows(self, rows):
+        """Agrega filas al final (páginas siguientes) sin mover el scroll."""
+        self._rows.extend(rows)
+        self._apply_sort()
+        self.refresh()
+
+    def rows(self):
+        return self._rows
+
+    def patch_rows(self, changed):
+        """Aplica cambios puntuales: `changed` es {clave: fila o None para borrarla}."""
+        if not changed:
+            return
+        k = self.key_index
+        pendientes = dict(changed)
+        filas = []
+        for row in self._rows:
+            key = row[k]
+            if key in pendientes:
+                nueva = pendientes.pop(key)
+                if nueva is not None:
+                    filas.append(nueva)
+            else:
+                filas.append(row)
+        filas.extend(r for r in pendientes.values() if r is not None)
+        self._rows = filas
+        self._apply_sort()
+        self._top = min(self._top, max(0, len(self._rows) - self._visible_count()))
+        self.refresh()
+
+    def _apply_sort(self):
+        if self._sort_col is None:
+            return
+        idx = self.columns[self._sort_col][1]
+        self._rows.sort(key=lambda r: (r[idx] is None, r[idx]), reverse=self._sort_desc)
+
+    def sort_by(self, col):
+        if self._sort_col == col:
+            self._sort_desc = not self._sort_desc
+        else:
+            self._sort_col, self._sort_desc = col, False
+        for i, btn in enumerate(self._header_btns):
+            titulo = self.columns[i][0]
+            if i == col:
+                titulo += " ▼" if self._sort_desc else " ▲"
+            btn.configure(text=titulo)
+        self._apply_sort()
+        self.refresh()
+
+    # --- selección ---
+    @property
+    def selected(self):
+        return self._selected
+
+    def _row_at(self, r):
+        i = self._top + r
+        return self._rows[i] if i < len(self._rows) else None
+
+    def _on_click(self, r):
+        row = self._row_at(r)
+        if row is None:
+            return
+        self._selected = row[self.key_index]
+        self.refresh()
+        if self.on_select:
+            self.on_select(row)
+
+    def _on_double(self, r):
+        row = self._row_at(r)
+        if row is not None and self.on_activate:
+            self.on_activate(row)
+
+    # --- scroll ---
+    def _set_top(self, top):
+        top = max(0, min(top, len(self._rows) - self._visible_count()))
+        if top != self._top:
+            self._top = top
+            self.refresh()
+
+    def scroll(self, delta):
+        self._set_top(self._top + delta)
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._set_top(int(float(args[1]) * len(self._rows)))
+        elif args[0] == "scroll":
+            paso = int(args[1]) * (self._visible_count() if args[2] == "pages" else 1)
+            self.scroll(paso)
+
+    def refresh(self):
+        n = self._visible_count()
+        self._ensure_pool(n)
+        for r, (row, cells, shown) in enumerate(self._pool):
+            data = self._row_at(r) if r < n else None
+            for c, (lbl, (_, idx, _, fmt)) in enumerate(zip(cells, self.columns)):
+                if data is None:
+                    txt = ""
+                else:
+                    val = data[idx]
+                    txt = fmt(val) if fmt else ("" if val is None else str(val))
+                # solo se reconfiguran las celdas cuyo texto cambió
+                if shown[c] != txt:
+                    lbl.configure(text=txt)
+                    shown[c] = txt
+            sel = data is not None and self._selected is not None and data[self.key_index] == self._selected
+            fg = ("gray75", "gray30") if sel else self._default_fg
+            if row.cget("fg_color") != fg:
+                row.configure(fg_color=fg)
+        total = len(self._rows)
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + n) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        if self.on_end and total and self._top + 2 * n >= total:
+            self.on_end()
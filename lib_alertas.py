@@ -0,0 +1,147 @@
+# lib_alertas.py
+import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from lib_db import get_connection, QUERIES
+from lib_executor import SyncExecutor
+
+# días hacia adelante que se consideran "próximos a vencer"
+HORIZONTE_DIAS = 7
+
+# Lecturas por clave: producto por su clave primaria y vencimientos por el
+# índice (cdb, fecha_vencimiento). Solo se leen los cdb que cambiaron.
+_BAJO_STOCK_CDB = "SELECT cdb, nombre, cantidad, umbral FROM producto WHERE cdb IN ({}) AND cantidad <= umbral"
+_VENCIMIENTOS_CDB = """SELECT v.id, v.cdb, p.nombre, v.cantidad, v.fecha_vencimiento
+                       FROM vencimientos v JOIN producto p ON v.cdb=p.cdb
+                       WHERE v.cdb IN ({}) AND v.fecha_vencimiento <= date('now', ?)"""
+
+# clave de una alerta: ("stock", cdb) o ("vence", id de vencimiento)
+Clave = Tuple[str, int]
+
+class AlertEngine:
+    """Mantiene en memoria las alertas de bajo stock y de vencimientos próximos.
+
+    Se alimenta del ChangeBus: ante un cambio en producto o vencimientos solo
+    se releen los cdb afectados y se notifica a los suscriptores qué alertas
+    aparecieron, cambiaron o desaparecieron. La carga completa se hace al
+    iniciar, cuando el bus avisa "todo" y cuando cambia el día (el horizonte
+    de vencimientos se mueve).
+    """
+
+    def __init__(self, db_path: str, bus=None, executor=None, horizonte: int = HORIZONTE_DIAS):
+        self.db = db_path
+        self.executor = executor or SyncExecutor()
+        self.horizonte = f"+{horizonte} days"
+        self.bajo_stock: Dict[int, tuple] = {}
+        self.vencimientos: Dict[int, tuple] = {}
+        self._venc_por_cdb: Dict[int, Set[int]] = {}
+        self._subs: List[Callable] = []
+        self._dia = None
+        self.cargado = False
+        # una sola lectura en curso; lo que llega mientras tanto se acumula
+        self._en_curso = False
+        self._todo = True
+        self._claves: Set[int] = set()
+        if bus:
+            bus.subscribe("producto", self._on_change)
+            bus.subscribe("vencimientos", self._on_change)
+
+    def subscribe(self, callback: Callable[[Dict[Clave, Optional[tuple]], Set[Clave]], None]):
+        """callback(cambios, nuevas): cambios es {clave: fila o None si dejó de
+        ser alerta}; nuevas son las claves que no estaban antes."""
+        self._subs.append(callback)
+
+    def total(self) -> int:
+        return len(self.bajo_stock) + len(self.vencimientos)
+
+    def cola_vencimientos(self) -> List[tuple]:
+        """Vencimientos dentro del horizonte, del más próximo al más lejano."""
+        return sorted(self.vencimientos.values(), key=lambda r: (r[4] or "", r[0]))
+
+    def start(self):
+        self._todo = True
+        self._pedir()
+
+    def check_dia(self):
+        """Recarga todo si cambió la fecha desde la última carga completa."""
+        if self._dia is not None and self._dia != datetime.date.today():
+            self.start()
+
+    def _on_change(self, tabla: str, claves: Optional[Set[int]]):
+        if claves is None:
+            self._todo = True
+        else:
+            self._claves |= claves
+        self._pedir()
+
+    def _pedir(self):
+        if self._en_curso or not (self._todo or self._claves):
+            return
+        todo, claves = self._todo, self._claves
+        self._todo, self._claves = False, set()
+        self._en_curso = True
+        self.executor.submit(self._leer, self.db, self.horizonte, None if todo else sorted(claves),
+                             on_done=lambda res: self._aplicar(todo, claves, res),
+                             on_error=lambda e: self._fallo(todo, claves), tag=self)
+
+    @staticmethod
+    def _leer(db: str, horizonte: str, cdbs: Optional[List[int]]):
+        # corre en un hilo de trabajo
+        cur = get_connection(db).cursor()
+        if cdbs is None:
+            bajos = cur.execute(*QUERIES["alertas_bajo_stock"]).fetchall()
+            sql, params = QUERIES["alertas_vencimientos"]
+            return bajos, cur.execute(sql, (horizonte,)).fetchall()
+        marcas = ",".join("?" * len(cdbs))
+        bajos = cur.execute(_BAJO_STOCK_CDB.format(marcas), cdbs).fetchall()
+        return bajos, cur.execute(_VENCIMIENTOS_CDB.format(marcas), cdbs + [horizonte]).fetchall()
+
+    def _fallo(self, todo: bool, claves: Set[int]):
+        # se reintenta con el próximo cambio
+        self._en_curso = False
+        self._todo |= todo
+        self._claves |= claves
+
+    def _aplicar(self, todo: bool, claves: Set[int], res):
+        self._en_curso = False
+        bajos, vencen = res
+        cambios: Dict[Clave, Optional[tuple]] = {}
+        primera = not self.cargado
+        if todo:
+            self._dia = datetime.date.today()
+            self.cargado = True
+            afectados_stock: Iterable[int] = set(self.bajo_stock) | {r[0] for r in bajos}
+            afectados_venc = set(self.vencimientos) | {r[0] for r in vencen}
+            self._venc_por_cdb = {}
+        else:
+            afectados_stock = claves
+            afectados_venc = set()
+            for cdb in claves:
+                afectados_venc |= self._venc_por_cdb.pop(cdb, set())
+            afectados_venc |= {r[0] for r in vencen}
+        nuevos_bajos = {r[0]: r for r in bajos}
+        for cdb in afectados_stock:
+            self._poner(self.bajo_stock, ("stock", cdb), cdb, nuevos_bajos.get(cdb), cambios)
+        nuevos_venc = {r[0]: r for r in vencen}
+        for vid in afectados_venc:
+            self._poner(self.vencimientos, ("vence", vid), vid, nuevos_venc.get(vid), cambios)
+        for r in vencen:
+            self._venc_por_cdb.setdefault(r[1], set()).add(r[0])
+        # tras una carga completa se avisa aunque no haya cambios: ya hay datos
+        if cambios or todo:
+            # lo que ya existía al arrancar no cuenta como alerta nueva
+            nuevas = set() if primera else {k for k, (antes, fila) in cambios.items() if antes is None and fila}
+            avisos = {k: fila for k, (antes, fila) in cambios.items()}
+            for cb in list(self._subs):
+                cb(avisos, nuevas)
+        self._pedir()
+
+    @staticmethod
+    def _poner(tabla: Dict[int, tuple], clave: Clave, k: int, fila: Optional[tuple], cambios: dict):
+        antes = tabla.get(k)
+        if antes == fila:
+            return
+        if fila is None:
+            del tabla[k]
+        else:
+            tabla[k] = fila
+        cambios[clave] = (antes, fila)
@@ -0,0 +1,262 @@
+# lib_analisis.py
+# Análisis del inventario completo: valorización, clasificación ABC por
+# facturación, margen real contra el de lista y stock sin movimiento. El
+# catálogo y los movimientos de la ventana se cargan en columnas (un arreglo
+# de NumPy por campo, todos alineados por cdb) y las cuentas se hacen sobre
+# las columnas enteras, sin recorrer productos en Python. Los movimientos de
+# los días cerrados se leen de una foto por producto (resumen_producto) que
+# se rehace una vez por día.
+import datetime
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from lib_db import get_connection, init_db, transaction
+
+# días hacia atrás de ventas y compras que entran en el análisis
+VENTANA_DIAS = 365
+# con stock y sin ventas en estos días = stock inmovilizado
+SIN_MOVIMIENTO_DIAS = 90
+# límites de las clases A y B sobre la facturación acumulada
+ABC_CORTES = (0.80, 0.95)
+# margen real por debajo del de lista por más de esto se lista como margen bajo
+MARGEN_TOLERANCIA = 0.05
+# filas de los listados de margen bajo e inmovilizado
+TOP = 100
+
+def _numpy():
+    # dependencia opcional: solo hace falta para el análisis
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Para el análisis de inventario hace falta instalar numpy") from None
+    return numpy
+
+class Columnas:
+    """Catálogo y movimientos de la ventana, un arreglo por campo.
+
+    Todas las columnas tienen un elemento por producto en el orden de `cdb`
+    (ascendente). Los productos sin movimientos tienen 0 en las columnas de
+    ventas y compras.
+    """
+
+    __slots__ = ("cdb", "precio", "cantidad", "margen", "vendidas", "facturado", "vendidas_recientes",
+                 "compradas", "comprado")
+
+    def __len__(self) -> int:
+        return len(self.cdb)
+
+def _alinear(np, cdb, filas: List[Tuple], campos: Tuple[str, ...]) -> list:
+    """Reparte filas (cdb, valor, ...), una por cdb, en columnas alineadas con `cdb`."""
+    tabla = np.array(filas, dtype=[("cdb", "i8")] + [(c, "f8") for c in campos])
+    pos = np.searchsorted(cdb, tabla["cdb"])
+    # cdb de movimientos que ya no están en el catálogo: se descartan
+    pos[pos == len(cdb)] = 0
+    ok = cdb[pos] == tabla["cdb"] if len(cdb) else np.zeros(len(tabla), bool)
+    columnas = []
+    for c in campos:
+        col = np.zeros(len(cdb))
+        col[pos[ok]] = tabla[c][ok]
+        columnas.append(col)
+    return columnas
+
+def periodo(hoy: Optional[datetime.date] = None, dias: int = VENTANA_DIAS,
+            sin_movimiento: int = SIN_MOVIMIENTO_DIAS) -> Tuple[str, str, str]:
+    """(desde, hasta, reciente) de la foto: los días cerrados de la ventana, hasta ayer."""
+    hoy = hoy or datetime.date.today()
+    return ((hoy - datetime.timedelta(days=dias - 1)).isoformat(), (hoy - datetime.timedelta(days=1)).isoformat(),
+            (hoy - datetime.timedelta(days=sin_movimiento - 1)).isoformat())
+
+def actualizar_foto(path: str, hoy: Optional[datetime.date] = None, dias: int = VENTANA_DIAS,
+                    sin_movimiento: int = SIN_MOVIMIENTO_DIAS) -> bool:
+    """Rehace resumen_producto si su período no es el de `hoy`. Devuelve si la rehizo.
+
+    Agrupar un año de resúmenes diarios lleva segundos con el historial
+    grande: se arma en una tabla temporal, que no bloquea a nadie, y se
+    reemplaza la foto en una transacción corta. Si otra terminal ya la
+    actualizó mientras tanto, no se pisa.
+    """
+    desde, hasta, reciente = periodo(hoy, dias, sin_movimiento)
+    conn = get_connection(path)
+    actual = conn.execute("SELECT desde, hasta, reciente FROM resumen_producto_periodo WHERE id = 1").fetchone()
+    if actual == (desde, hasta, reciente):
+        return False
+    conn.execute("""CREATE TEMP TABLE IF NOT EXISTS foto_producto (
+                        cdb INTEGER PRIMARY KEY, vendidas INTEGER NOT NULL DEFAULT 0, facturado REAL NOT NULL DEFAULT 0,
+                        vendidas_recientes INTEGER NOT NULL DEFAULT 0, compradas INTEGER NOT NULL DEFAULT 0,
+                        comprado REAL NOT NULL DEFAULT 0) WITHOUT ROWID""")
+    conn.execute("DELETE FROM temp.foto_producto")
+    conn.execute("""INSERT INTO temp.foto_producto (cdb, vendidas, facturado, vendidas_recientes)
+                    SELECT cdb, SUM(unidades), SUM(importe), TOTAL(CASE WHEN dia >= ? THEN unidades END)
+                    FROM resumen_venta_dia WHERE dia BETWEEN ? AND ? GROUP BY cdb""", (reciente, desde, hasta))
+    conn.execute("""INSERT INTO temp.foto_producto (cdb, compradas, comprado)
+                    SELECT cdb, SUM(unidades), SUM(importe) FROM resumen_compra_dia WHERE dia BETWEEN ? AND ? GROUP BY cdb
+                    ON CONFLICT (cdb) DO UPDATE SET compradas = excluded.compradas, comprado = excluded.comprado""",
+                 (desde, hasta))
+    with transaction(path) as cur:
+        if cur.execute("SELECT desde, hasta, reciente FROM resumen_producto_periodo WHERE id = 1").fetchone() == (
+                desde, hasta, reciente):
+            return False
+        cur.execute("DELETE FROM resumen_producto")
+        cur.execute("INSERT INTO resumen_producto SELECT * FROM temp.foto_producto")
+        cur.execute("INSERT OR REPLACE INTO resumen_producto_periodo (id, desde, hasta, reciente, actualizado) "
+                    "VALUES (1, ?, ?, ?, ?)",
+                    (desde, hasta, reciente, datetime.datetime.now().isoformat(timespec="seconds")))
+    conn.execute("DELETE FROM temp.foto_producto")
+    return True
+
+def cargar(path: str, hoy: Optional[datetime.date] = None, dias: int = VENTANA_DIAS,
+           sin_movimiento: int = SIN_MOVIMIENTO_DIAS) -> Columnas:
+    """Lee producto y las ventas y compras de los últimos `dias` días en columnas.
+
+    Los días cerrados salen de la foto resumen_producto (una fila por
+    producto, actualizada si hace falta) y el día en curso de los resúmenes
+    diarios: el costo depende de la cantidad de productos, no del historial.
+    """
+    np = _numpy()
+    hoy = hoy or datetime.date.today()
+    actualizar_foto(path, hoy, dias, sin_movimiento)
+    conn = get_connection(path)
+    tabla = np.array(conn.execute("""
+        SELECT p.cdb, IFNULL(p.precio, 0), IFNULL(p.cantidad, 0), IFNULL(p.margen, 0),
+               IFNULL(r.vendidas, 0), IFNULL(r.facturado, 0), IFNULL(r.vendidas_recientes, 0),
+               IFNULL(r.compradas, 0), IFNULL(r.comprado, 0)
+        FROM producto p LEFT JOIN resumen_producto r ON r.cdb = p.cdb ORDER BY p.cdb""").fetchall(),
+        dtype=[("cdb", "i8"), ("precio", "f8"), ("cantidad", "i8"), ("margen", "f8"), ("vendidas", "f8"),
+               ("facturado", "f8"), ("vendidas_recientes", "f8"), ("compradas", "f8"), ("comprado", "f8")])
+    c = Columnas()
+    for campo in Columnas.__slots__:
+        # copia: cada columna queda contigua en memoria
+        setattr(c, campo, np.ascontiguousarray(tabla[campo]))
+    dia = hoy.isoformat()
+    vendidas, facturado = _alinear(np, c.cdb, conn.execute(
+        "SELECT cdb, unidades, importe FROM resumen_venta_dia WHERE dia = ?", (dia,)).fetchall(), ("unidades", "importe"))
+    c.vendidas += vendidas
+    c.facturado += facturado
+    c.vendidas_recientes += vendidas
+    compradas, comprado = _alinear(np, c.cdb, conn.execute(
+        "SELECT cdb, unidades, importe FROM resumen_compra_dia WHERE dia = ?", (dia,)).fetchall(), ("unidades", "importe"))
+    c.compradas += compradas
+    c.comprado += comprado
+    return c
+
+class Analisis:
+    """Resultado de analizar(): totales por métrica y los listados para la vista."""
+
+    def __init__(self, desde: str, hasta: str, productos: int):
+        self.desde = desde
+        self.hasta = hasta
+        self.productos = productos
+        # unidades, productos con stock, valor al costo y a precio de venta
+        self.valuacion: Dict[str, float] = {}
+        # (clase, productos, facturado, participación, valor al costo del stock)
+        self.abc: List[Tuple[str, int, float, float, float]] = []
+        # facturado, costo de lo vendido y margen bruto de la ventana
+        self.margen: Dict[str, float] = {}
+        # (cdb, nombre, margen de lista, margen real, unidades, diferencia contra lista)
+        self.margen_bajo: List[Tuple] = []
+        self.margen_bajo_total = 0
+        # (cdb, nombre, cantidad, valor al costo, unidades vendidas en la ventana)
+        self.inmovilizado: List[Tuple] = []
+        self.inmovilizado_total: Dict[str, float] = {}
+        # segundos de carga y de cálculo
+        self.tiempos: Dict[str, float] = {}
+
+    def lineas(self) -> List[str]:
+        v, m, s = self.valuacion, self.margen, self.inmovilizado_total
+        lineas = [f"Análisis de inventario {self.desde} a {self.hasta} ({self.productos} productos)",
+                  f"Stock: {v['unidades']:.0f} unidades en {v['con_stock']:.0f} productos, "
+                  f"${v['costo']:,.2f} al costo, ${v['venta']:,.2f} a precio de venta"]
+        for clase, n, facturado, parte, valor in self.abc:
+            lineas.append(f"  Clase {clase}: {n} productos, {parte:.1%} de la facturación, ${valor:,.2f} en stock")
+        lineas.append(f"Margen bruto: ${m['bruto']:,.2f} sobre ${m['facturado']:,.2f} facturado "
+                      f"({m['real']:.1%} real, {m['lista']:.1%} de lista)")
+        lineas.append(f"Productos con margen bajo: {self.margen_bajo_total}")
+        lineas.append(f"Sin ventas en {SIN_MOVIMIENTO_DIAS} días: {s['productos']:.0f} productos, "
+                      f"{s['unidades']:.0f} unidades, ${s['valor']:,.2f} al costo")
+        return lineas
+
+def _primeros(np, valores, mascara, n: int):
+    """Posiciones de los n mayores `valores` donde `mascara`, de mayor a menor."""
+    idx = np.flatnonzero(mascara)
+    if len(idx) > n:
+        idx = idx[np.argpartition(-valores[idx], n - 1)[:n]]
+    return idx[np.argsort(-valores[idx], kind="stable")]
+
+def _nombres(path: str, cdbs) -> Dict[int, str]:
+    # solo los de los listados: el análisis en sí no necesita los nombres
+    cdbs = [int(c) for c in cdbs]
+    if not cdbs:
+        return {}
+    return dict(get_connection(path).execute(
+        f"SELECT cdb, nombre FROM producto WHERE cdb IN ({','.join('?' * len(cdbs))})", cdbs).fetchall())
+
+def calcular(c: Columnas, desde: str = "", hasta: str = "", top: int = TOP) -> Analisis:
+    """Calcula las métricas sobre las columnas. Los listados quedan sin nombres (None)."""
+    np = _numpy()
+    a = Analisis(desde, hasta, len(c))
+    stock = np.maximum(c.cantidad, 0)
+    costo_stock = stock * c.precio
+    venta_stock = costo_stock * (1 + c.margen)
+    a.valuacion = {"unidades": float(stock.sum()), "con_stock": int(np.count_nonzero(stock)),
+                   "costo": float(costo_stock.sum()), "venta": float(venta_stock.sum())}
+
+    # ABC: por facturación descendente; un producto entra en la clase según
+    # la participación acumulada de los que facturaron más que él
+    orden = np.argsort(-c.facturado, kind="stable")
+    total = float(c.facturado.sum())
+    previa = (np.cumsum(c.facturado[orden]) - c.facturado[orden]) / total if total else np.ones(len(c))
+    clase = np.full(len(c), 2, dtype=np.int8)
+    clase[orden] = np.searchsorted(np.array(ABC_CORTES), previa, side="right").astype(np.int8)
+    # lo que no vendió nada es C aunque la facturación total sea 0
+    clase[c.facturado <= 0] = 2
+    n_clase = np.bincount(clase, minlength=3)
+    fact_clase = np.bincount(clase, weights=c.facturado, minlength=3)
+    valor_clase = np.bincount(clase, weights=costo_stock, minlength=3)
+    a.abc = [(letra, int(n_clase[i]), float(fact_clase[i]), float(fact_clase[i]) / total if total else 0.0,
+              float(valor_clase[i])) for i, letra in enumerate("ABC")]
+
+    # margen real: precio de venta promedio sobre el costo promedio de las
+    # compras de la ventana (o el precio de lista si no hubo compras)
+    vendio = c.vendidas > 0
+    costo_real = np.where(c.compradas > 0, c.comprado / np.where(c.compradas > 0, c.compradas, 1), c.precio)
+    precio_real = c.facturado / np.where(vendio, c.vendidas, 1)
+    con_costo = vendio & (costo_real > 0)
+    margen_real = np.where(con_costo, precio_real / np.where(con_costo, costo_real, 1) - 1, 0.0)
+    costo_vendido = float((c.vendidas * costo_real).sum())
+    a.margen = {"facturado": total, "costo": costo_vendido, "bruto": total - costo_vendido,
+                "real": (total - costo_vendido) / costo_vendido if costo_vendido else 0.0,
+                # margen de lista ponderado por lo que se vendió
+                "lista": float((c.vendidas * costo_real * c.margen).sum()) / costo_vendido if costo_vendido else 0.0}
+    bajo = con_costo & (margen_real < c.margen - MARGEN_TOLERANCIA)
+    # lo que se dejó de ganar contra vender al precio de lista sobre el costo real
+    diferencia = c.vendidas * (costo_real * (1 + c.margen) - precio_real)
+    a.margen_bajo_total = int(np.count_nonzero(bajo))
+    a.margen_bajo = [(int(c.cdb[i]), None, float(c.margen[i]), float(margen_real[i]), int(c.vendidas[i]),
+                      float(diferencia[i])) for i in _primeros(np, diferencia, bajo, top)]
+
+    quieto = (stock > 0) & (c.vendidas_recientes <= 0)
+    a.inmovilizado_total = {"productos": int(np.count_nonzero(quieto)), "unidades": float(stock[quieto].sum()),
+                            "valor": float(costo_stock[quieto].sum())}
+    a.inmovilizado = [(int(c.cdb[i]), None, int(stock[i]), float(costo_stock[i]), int(c.vendidas[i]))
+                      for i in _primeros(np, costo_stock, quieto, top)]
+    return a
+
+def analizar(path: str, hoy: Optional[datetime.date] = None, dias: int = VENTANA_DIAS, top: int = TOP) -> Analisis:
+    """Carga las columnas, calcula las métricas y completa los nombres de los listados."""
+    hoy = hoy or datetime.date.today()
+    t0 = time.perf_counter()
+    c = cargar(path, hoy, dias)
+    t1 = time.perf_counter()
+    a = calcular(c, periodo(hoy, dias)[0], hoy.isoformat(), top)
+    nombres = _nombres(path, {f[0] for f in a.margen_bajo} | {f[0] for f in a.inmovilizado})
+    a.margen_bajo = [(f[0], nombres.get(f[0], "")) + f[2:] for f in a.margen_bajo]
+    a.inmovilizado = [(f[0], nombres.get(f[0], "")) + f[2:] for f in a.inmovilizado]
+    a.tiempos = {"carga": t1 - t0, "calculo": time.perf_counter() - t1}
+    return a
+
+if __name__ == "__main__":
+    # python lib_analisis.py ruta.db
+    init_db(sys.argv[1])
+    resultado = analizar(sys.argv[1])
+    print("\n".join(resultado.lineas()))
+    print(f"carga {resultado.tiempos['carga'] * 1000:.0f} ms, cálculo {resultado.tiempos['calculo'] * 1000:.0f} ms")
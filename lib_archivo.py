@@ -0,0 +1,217 @@
+# lib_archivo.py
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+from lib_db import connect, get_connection, transaction
+
+# ventas (o compras) que se mudan por transacción
+ARCHIVE_BATCH = 500
+
+# columnas de cada tabla archivada, en el orden de la base principal
+COLUMNAS = {
+    "venta": "id, fecha",
+    "venta_detalle": "id, venta, cdb, cantidad, precio_venta, fecha",
+    "compra": "id, fecha",
+    "compra_detalle": "id, compra, cdb, cantidad, precio_compra, fecha",
+}
+
+# Esquema de cada archivo anual: las mismas tablas con los ids originales
+# (sin AUTOINCREMENT ni claves foráneas, producto queda en la base principal) y
+# los índices que usan el historial y los resúmenes.
+ARCHIVO_SQL = """
+CREATE TABLE IF NOT EXISTS venta ( id INTEGER PRIMARY KEY, fecha TEXT );
+CREATE TABLE IF NOT EXISTS venta_detalle (
+    id INTEGER PRIMARY KEY, venta INTEGER, cdb INTEGER NOT NULL, cantidad INTEGER NOT NULL, precio_venta REAL, fecha TEXT
+);
+CREATE TABLE IF NOT EXISTS compra ( id INTEGER PRIMARY KEY, fecha TEXT );
+CREATE TABLE IF NOT EXISTS compra_detalle (
+    id INTEGER PRIMARY KEY, compra INTEGER, cdb INTEGER NOT NULL, cantidad INTEGER NOT NULL, precio_compra REAL, fecha TEXT
+);
+CREATE INDEX IF NOT EXISTS venta_fecha ON venta (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_venta ON venta_detalle (venta);
+CREATE INDEX IF NOT EXISTS venta_detalle_fecha ON venta_detalle (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_cdb_fecha ON venta_detalle (cdb, fecha);
+CREATE INDEX IF NOT EXISTS compra_fecha ON compra (fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_compra ON compra_detalle (compra);
+CREATE INDEX IF NOT EXISTS compra_detalle_fecha ON compra_detalle (fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_cdb_fecha ON compra_detalle (cdb, fecha);
+"""
+
+log = logging.getLogger("stock.archivo")
+
+def esquema(anio: int) -> str:
+    """Nombre con el que se adjunta el archivo de `anio`."""
+    return f"archivo_{anio}"
+
+def ruta_archivo(path: str, anio: int) -> str:
+    """data/data.db -> data/data_2024.db"""
+    base, ext = os.path.splitext(path)
+    return f"{base}_{anio}{ext or '.db'}"
+
+def periodos(path: str) -> List[Tuple[int, str, int, int]]:
+    """(año, archivo, ventas, compras) de los años archivados, del más reciente al más viejo."""
+    return get_connection(path).execute(
+        "SELECT anio, archivo, ventas, compras FROM archivo_periodo ORDER BY anio DESC").fetchall()
+
+def _crear_vistas(conn: sqlite3.Connection, anios: List[int]):
+    # venta_todo, venta_detalle_todo, ...: la base principal más cada archivo adjunto
+    for tabla, cols in COLUMNAS.items():
+        partes = [f"SELECT {cols} FROM main.{tabla}"]
+        partes += [f"SELECT {cols} FROM {esquema(a)}.{tabla}" for a in anios]
+        conn.execute(f"DROP VIEW IF EXISTS temp.{tabla}_todo")
+        conn.execute(f"CREATE TEMP VIEW {tabla}_todo AS " + " UNION ALL ".join(partes))
+
+def adjuntar(conn: sqlite3.Connection, path: str) -> List[int]:
+    """Adjunta a `conn` los archivos anuales que le falten y arma las vistas *_todo.
+
+    ATTACH vale por conexión: cada conexión del pool adjunta los archivos la
+    primera vez que los necesita y cuando aparece un año nuevo. Dentro de una
+    transacción no se puede adjuntar; en ese caso se usan los que ya estén.
+    Devuelve los años adjuntos, del más reciente al más viejo.
+    """
+    archivos = dict(conn.execute("SELECT anio, archivo FROM archivo_periodo").fetchall())
+    adjuntos = {r[1] for r in conn.execute("PRAGMA database_list")}
+    faltan = [a for a in archivos if esquema(a) not in adjuntos]
+    cambio = False
+    if faltan and not conn.in_transaction:
+        libres = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - len(adjuntos - {"main", "temp"})
+        carpeta = os.path.dirname(os.path.abspath(path))
+        for anio in sorted(faltan, reverse=True):
+            ruta = os.path.join(carpeta, archivos[anio])
+            if libres <= 0:
+                log.warning("no se pueden adjuntar más archivos: falta el año %s en el historial", anio)
+                break
+            if not os.path.exists(ruta):
+                # ATTACH crearía un archivo vacío en su lugar
+                log.warning("no se encuentra el archivo de %s: %s", anio, ruta)
+                continue
+            conn.execute(f"ATTACH DATABASE ? AS {esquema(anio)}", (ruta,))
+            adjuntos.add(esquema(anio))
+            libres -= 1
+            cambio = True
+    anios = sorted((a for a in archivos if esquema(a) in adjuntos), reverse=True)
+    if cambio or not conn.execute("SELECT 1 FROM temp.sqlite_master WHERE name = 'venta_todo'").fetchone():
+        _crear_vistas(conn, anios)
+    return anios
+
+def particiones(conn: sqlite3.Connection, path: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(esquema, desde, hasta) de cada partición, la base principal primero.
+
+    La base principal no tiene rango: mientras un año se está archivando
+    tiene filas de ese año además del actual. Cada archivo tiene solo las
+    fechas de su año, [desde, hasta).
+    """
+    return [("main", None, None)] + [(esquema(a), f"{a}-01-01", f"{a + 1}-01-01") for a in adjuntar(conn, path)]
+
+def _registrar(path: str, anio: int) -> str:
+    """Crea el archivo de `anio` (si no existe) y lo anota en archivo_periodo."""
+    ruta = ruta_archivo(path, anio)
+    conn = connect(ruta)
+    try:
+        conn.executescript(ARCHIVO_SQL)
+    finally:
+        conn.close()
+    with transaction(path) as cur:
+        cur.execute("INSERT OR IGNORE INTO archivo_periodo (anio, archivo, actualizado) VALUES (?, ?, ?)",
+                    (anio, os.path.basename(ruta), datetime.datetime.now().isoformat(timespec="seconds")))
+    return ruta
+
+def _anios_cerrados(conn: sqlite3.Connection, anio_actual: int) -> List[int]:
+    # primera fecha por el índice de cada cabecera
+    primeras = [conn.execute(f"SELECT MIN(fecha) FROM main.{t}").fetchone()[0] for t in ("venta", "compra")]
+    primeras = [int(f[:4]) for f in primeras if f and f[:4].isdigit()]
+    return list(range(min(primeras), anio_actual)) if primeras else []
+
+def _mudar_tanda(path: str, anio: int, cabecera: str, lote: int) -> int:
+    """Muda hasta `lote` filas de `cabecera` del año (con sus detalles). Devuelve cuántas.
+
+    Con la base en WAL una transacción que escribe en varias bases es atómica
+    en cada una pero no en conjunto, así que se hace en dos: primero se copia
+    al archivo (INSERT OR IGNORE por id, repetible) y después se borra de la
+    base principal solo lo que ya está en el archivo. Si algo se corta entre
+    las dos, la próxima tanda vuelve a tomar las mismas filas y termina.
+    """
+    detalle = cabecera + "_detalle"
+    destino = esquema(anio)
+    with transaction(path) as cur:
+        cur.execute("DELETE FROM temp.archivo_tanda")
+        cur.execute(f"""INSERT INTO temp.archivo_tanda (id) SELECT id FROM main.{cabecera}
+                        WHERE fecha >= ? AND fecha < ? ORDER BY fecha, id LIMIT ?""",
+                    (f"{anio}-01-01", f"{anio + 1}-01-01", lote))
+        if not cur.rowcount:
+            return 0
+        for tabla, filtro in ((cabecera, "id"), (detalle, cabecera)):
+            cols = COLUMNAS[tabla]
+            cur.execute(f"""INSERT OR IGNORE INTO {destino}.{tabla} ({cols}) SELECT {cols} FROM main.{tabla}
+                            WHERE {filtro} IN (SELECT id FROM temp.archivo_tanda)""")
+    with transaction(path) as cur:
+        seq = cur.execute("SELECT IFNULL(MAX(seq), 0) FROM cambios").fetchone()[0]
+        cur.execute(f"""DELETE FROM main.{detalle} WHERE id IN (
+                            SELECT id FROM {destino}.{detalle} WHERE {cabecera} IN (SELECT id FROM temp.archivo_tanda))""")
+        cur.execute(f"""DELETE FROM main.{cabecera} WHERE id IN (
+                            SELECT id FROM {destino}.{cabecera} WHERE id IN (SELECT id FROM temp.archivo_tanda))""")
+        movidas = cur.rowcount
+        # los datos siguen visibles (en el archivo): los borrados no se anuncian
+        # a los frames, y los resúmenes diarios no cambian
+        cur.execute("DELETE FROM cambios WHERE seq > ?", (seq,))
+        cur.execute(f"UPDATE archivo_periodo SET {cabecera}s = {cabecera}s + ?, actualizado = ? WHERE anio = ?",
+                    (movidas, datetime.datetime.now().isoformat(timespec="seconds"), anio))
+    return movidas
+
+def archivar(path: str, hoy: Optional[datetime.date] = None, lote: int = ARCHIVE_BATCH,
+             on_progress: Optional[Callable[[int, int, int], None]] = None) -> Dict[int, Tuple[int, int]]:
+    """Muda las ventas y compras de los años anteriores al de `hoy` a su archivo anual.
+
+    Trabaja de a `lote` cabeceras por transacción (con sus líneas), así otras
+    terminales pueden seguir vendiendo mientras tanto. La base principal queda
+    solo con el año en curso; el historial y las vistas *_todo siguen viendo
+    todo. Devuelve {año: (ventas, compras)} movidas; on_progress(año, ventas,
+    compras) se llama tras cada tanda.
+    """
+    hoy = hoy or datetime.date.today()
+    conn = get_connection(path)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archivo_tanda ( id INTEGER PRIMARY KEY )")
+    movidas = {}
+    for anio in _anios_cerrados(conn, hoy.year):
+        if not conn.execute("SELECT 1 FROM archivo_periodo WHERE anio = ?", (anio,)).fetchone():
+            if not any(conn.execute(f"SELECT 1 FROM main.{t} WHERE fecha >= ? AND fecha < ? LIMIT 1",
+                                    (f"{anio}-01-01", f"{anio + 1}-01-01")).fetchone() for t in ("venta", "compra")):
+                continue
+            _registrar(path, anio)
+        if anio not in adjuntar(conn, path):
+            raise RuntimeError(f"No se pudo adjuntar el archivo de {anio}")
+        cuenta = [0, 0]
+        for i, cabecera in enumerate(("venta", "compra")):
+            while True:
+                n = _mudar_tanda(path, anio, cabecera, lote)
+                cuenta[i] += n
+                if n and on_progress:
+                    on_progress(anio, *cuenta)
+                if n < lote:
+                    break
+        if any(cuenta):
+            movidas[anio] = tuple(cuenta)
+    return movidas
+
+def compactar(path: str):
+    """VACUUM de la base principal para devolver el espacio de lo archivado.
+
+    Reescribe la base entera y bloquea a las demás terminales mientras dura:
+    no se corre sola, solo desde la línea de comandos.
+    """
+    get_connection(path).execute("VACUUM")
+
+if __name__ == "__main__":
+    # python lib_archivo.py ruta.db [archivar|estado|compactar]
+    db = sys.argv[1]
+    accion = sys.argv[2] if len(sys.argv) > 2 else "estado"
+    if accion == "archivar":
+        for anio, (ventas, compras) in archivar(db).items():
+            print(f"{anio}: {ventas} ventas y {compras} compras archivadas")
+    elif accion == "compactar":
+        compactar(db)
+    for anio, archivo, ventas, compras in periodos(db):
+        print(f"{anio}  {archivo:<24} {ventas:>9} ventas {compras:>9} compras")
@@ -0,0 +1,128 @@
+# lib_caja.py
+import datetime
+import sqlite3
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional, Tuple
+from lib_db import get_connection, transaction
+
+# tipos de movimiento y el signo con que entra el monto cargado a mano
+TIPOS = ("apertura", "venta", "compra", "ingreso", "egreso", "correccion")
+SIGNO_MANUAL = {"ingreso": 1, "egreso": -1}
+
+# saldo después del último movimiento con id <= :hasta: la última foto
+# anterior más los movimientos posteriores a ella (a lo sumo CASH_SNAPSHOT_EVERY)
+_SALDO_SQL = """SELECT s.saldo + IFNULL((SELECT SUM(importe) FROM caja_movimiento
+                                         WHERE id > s.movimiento AND id <= :hasta), 0)
+                FROM caja_saldo s WHERE s.movimiento <= :hasta ORDER BY s.movimiento DESC LIMIT 1"""
+# último movimiento anterior a una fecha (los movimientos se fechan al registrarse)
+_ULTIMO_ANTES_SQL = "SELECT id FROM caja_movimiento WHERE fecha < ? ORDER BY fecha DESC, id DESC LIMIT 1"
+
+def a_centavos(monto) -> int:
+    """Monto en centavos, redondeado a la mitad hacia arriba (12.345 -> 1235)."""
+    return int((Decimal(str(monto)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def formato(centavos: int) -> str:
+    signo = "-" if centavos < 0 else ""
+    return f"{signo}{abs(centavos) // 100}.{abs(centavos) % 100:02d}"
+
+def registrar_movimiento(cur: sqlite3.Cursor, tipo: str, importe: int, referencia: Optional[int] = None,
+                         nota: Optional[str] = None) -> int:
+    """Agrega un movimiento de `importe` centavos (negativo si sale dinero) dentro de la transacción de `cur`.
+
+    La fecha es la del registro, no la del comprobante: así el libro queda
+    ordenado por fecha igual que por id.
+    """
+    cur.execute("INSERT INTO caja_movimiento (fecha, tipo, importe, referencia, nota) VALUES (?, ?, ?, ?, ?)",
+                (datetime.datetime.now().isoformat(), tipo, importe, referencia, nota))
+    return cur.lastrowid
+
+def _saldo(conn, hasta: int) -> int:
+    return conn.execute(_SALDO_SQL, {"hasta": hasta}).fetchone()[0]
+
+def _saldo_antes(conn, fecha: str) -> int:
+    row = conn.execute(_ULTIMO_ANTES_SQL, (fecha,)).fetchone()
+    return _saldo(conn, row[0] if row else 0)
+
+def saldo(path: str) -> int:
+    """Saldo actual en centavos."""
+    return _saldo(get_connection(path), sys.maxsize)
+
+def saldo_al(path: str, fecha: str) -> int:
+    """Saldo en centavos antes del primer movimiento de `fecha` (YYYY-MM-DD o fecha y hora ISO)."""
+    return _saldo_antes(get_connection(path), fecha)
+
+def movimiento_manual(path: str, tipo: str, monto, nota: Optional[str] = None) -> int:
+    """Ingreso o egreso cargado en Caja; `monto` es positivo en ambos casos."""
+    centavos = a_centavos(monto)
+    if centavos <= 0:
+        raise ValueError("El monto debe ser positivo")
+    with transaction(path) as cur:
+        return registrar_movimiento(cur, tipo, SIGNO_MANUAL[tipo] * centavos, nota=nota)
+
+def corregir_saldo(path: str, nuevo, nota: Optional[str] = None) -> int:
+    """Registra la diferencia entre el saldo contado y el del libro. Devuelve la diferencia en centavos."""
+    with transaction(path) as cur:
+        diferencia = a_centavos(nuevo) - _saldo(cur, sys.maxsize)
+        if diferencia:
+            registrar_movimiento(cur, "correccion", diferencia, nota=nota)
+    return diferencia
+
+class Cierre:
+    """Cierre de caja de un rango de días, calculado desde el libro."""
+
+    def __init__(self, desde: str, hasta: str, saldo_inicial: int, por_tipo: Dict[str, Tuple[int, int]],
+                 saldo_final: int):
+        self.desde = desde
+        self.hasta = hasta
+        self.saldo_inicial = saldo_inicial
+        # tipo -> (movimientos, importe en centavos)
+        self.por_tipo = por_tipo
+        self.saldo_final = saldo_final
+
+    @property
+    def neto(self) -> int:
+        return sum(importe for _, importe in self.por_tipo.values())
+
+    def lineas(self) -> List[str]:
+        lineas = [f"Cierre de caja {self.desde} a {self.hasta}", f"Saldo inicial: {formato(self.saldo_inicial)}"]
+        for tipo in TIPOS:
+            if tipo in self.por_tipo:
+                n, importe = self.por_tipo[tipo]
+                lineas.append(f"  {tipo}: {n} movimientos, {formato(importe)}")
+        lineas.append(f"Neto del período: {formato(self.neto)}")
+        lineas.append(f"Saldo final: {formato(self.saldo_final)}")
+        return lineas
+
+    def __str__(self):
+        return "\n".join(self.lineas())
+
+def cierre(path: str, desde: str, hasta: str) -> Cierre:
+    """Cierre de caja de los días `desde` a `hasta` inclusive (YYYY-MM-DD).
+
+    Los saldos salen de las fotos y los totales por tipo de un recorrido del
+    índice por fecha acotado al rango: no depende del tamaño del libro.
+    """
+    conn = get_connection(path)
+    fin = (datetime.date.fromisoformat(hasta) + datetime.timedelta(days=1)).isoformat()
+    por_tipo = {tipo: (n, importe) for tipo, n, importe in conn.execute(
+        """SELECT tipo, COUNT(*), SUM(importe) FROM caja_movimiento
+           WHERE fecha >= ? AND fecha < ? GROUP BY tipo""", (desde, fin))}
+    return Cierre(desde, hasta, _saldo_antes(conn, desde), por_tipo, _saldo_antes(conn, fin))
+
+def verificar_caja(path: str) -> List[Tuple[int, int, int]]:
+    """(movimiento, saldo de la foto, saldo sumando el libro) de cada foto que no coincide."""
+    return get_connection(path).execute("""
+        SELECT s.movimiento, s.saldo, (SELECT IFNULL(SUM(importe), 0) FROM caja_movimiento WHERE id <= s.movimiento)
+        FROM caja_saldo s
+        WHERE s.saldo <> (SELECT IFNULL(SUM(importe), 0) FROM caja_movimiento WHERE id <= s.movimiento)""").fetchall()
+
+if __name__ == "__main__":
+    # python lib_caja.py ruta.db [desde hasta] : saldo actual o cierre del rango; verifica las fotos
+    db = sys.argv[1]
+    if len(sys.argv) > 3:
+        print(cierre(db, sys.argv[2], sys.argv[3]))
+    else:
+        print(f"Saldo: {formato(saldo(db))}")
+    for mov, foto, real in verificar_caja(db):
+        print(f"  foto {mov}: {formato(foto)} != {formato(real)}")
@@ -0,0 +1,119 @@
+# lib_carrito.py
+from typing import Callable, Dict, Hashable, Iterator, List, Optional
+from lib_caja import a_centavos, formato
+from lib_ventas import StockInsuficiente
+
+class Linea:
+    """Una línea del carrito. El importe se guarda en centavos: el precio
+    unitario mostrado es importe / cantidad, así sumar el mismo producto con
+    otro precio no pierde exactitud."""
+
+    __slots__ = ("clave", "cdb", "nombre", "cantidad", "importe", "stock", "vencimiento")
+
+    def __init__(self, clave, cdb: int, nombre: str, stock: Optional[int], vencimiento: Optional[str]):
+        self.clave = clave
+        self.cdb = cdb
+        self.nombre = nombre
+        self.cantidad = 0
+        self.importe = 0
+        self.stock = stock
+        self.vencimiento = vencimiento
+
+    @property
+    def precio(self) -> float:
+        return self.importe / self.cantidad / 100 if self.cantidad else 0.0
+
+    def texto(self) -> str:
+        venc = f" vence {self.vencimiento}" if self.vencimiento else ""
+        return f"{self.cdb} - {self.nombre} x {self.cantidad} @ {self.precio:.2f} = {formato(self.importe)}{venc}"
+
+    def item(self) -> dict:
+        """Formato de línea que esperan registrar_venta y registrar_compra."""
+        return {'cdb': self.cdb, 'nombre': self.nombre, 'precio': self.precio, 'cantidad': self.cantidad,
+                'vencimiento': self.vencimiento}
+
+class Carrito:
+    """Carrito indexado por cdb (o por cdb y vencimiento en las compras).
+
+    Agregar un producto que ya está suma la cantidad a su línea. El total se
+    lleva en centavos enteros. Cada cambio se notifica a los suscriptores
+    como callback(evento, linea) con evento "agregada", "modificada" o
+    "quitada"; vaciar() notifica ("vaciado", None).
+    """
+
+    def __init__(self, por_vencimiento: bool = False):
+        self.por_vencimiento = por_vencimiento
+        self._lineas: Dict[Hashable, Linea] = {}
+        self.total = 0
+        self._subs: List[Callable[[str, Optional[Linea]], None]] = []
+
+    def subscribe(self, callback: Callable[[str, Optional[Linea]], None]):
+        self._subs.append(callback)
+
+    def _emitir(self, evento: str, linea: Optional[Linea]):
+        for cb in list(self._subs):
+            cb(evento, linea)
+
+    def clave(self, cdb: int, vencimiento: Optional[str] = None) -> Hashable:
+        return (cdb, vencimiento or None) if self.por_vencimiento else cdb
+
+    def agregar(self, cdb: int, nombre: str, precio, cantidad: int, stock: Optional[int] = None,
+                vencimiento: Optional[str] = None) -> Linea:
+        """Suma `cantidad` unidades a `precio` cada una. Con `stock`, no deja pasarse del disponible."""
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser positiva")
+        clave = self.clave(cdb, vencimiento)
+        linea = self._lineas.get(clave)
+        nueva = linea is None
+        if nueva:
+            linea = Linea(clave, cdb, nombre, stock, vencimiento or None)
+        elif stock is not None:
+            linea.stock = stock
+        if linea.stock is not None and linea.cantidad + cantidad > linea.stock:
+            raise StockInsuficiente([nombre])
+        importe = a_centavos(precio) * cantidad
+        linea.cantidad += cantidad
+        linea.importe += importe
+        self.total += importe
+        if nueva:
+            self._lineas[clave] = linea
+        self._emitir("agregada" if nueva else "modificada", linea)
+        return linea
+
+    def quitar(self, clave: Hashable):
+        linea = self._lineas.pop(clave, None)
+        if linea is not None:
+            self.total -= linea.importe
+            self._emitir("quitada", linea)
+
+    def contenido(self) -> Dict[Hashable, tuple]:
+        """Cantidad e importe de cada línea: lo que se manda a registrar, para descontarlo después."""
+        return {clave: (l.cantidad, l.importe) for clave, l in self._lineas.items()}
+
+    def descontar(self, contenido: Dict[Hashable, tuple]):
+        """Quita lo registrado según `contenido` y deja lo que se agregó mientras tanto."""
+        for clave, (cantidad, importe) in contenido.items():
+            linea = self._lineas.get(clave)
+            if linea is None:
+                continue
+            if linea.cantidad <= cantidad:
+                self.quitar(clave)
+                continue
+            linea.cantidad -= cantidad
+            linea.importe -= importe
+            self.total -= importe
+            self._emitir("modificada", linea)
+
+    def vaciar(self):
+        self._lineas.clear()
+        self.total = 0
+        self._emitir("vaciado", None)
+
+    def items(self) -> List[dict]:
+        return [l.item() for l in self._lineas.values()]
+
+    def __iter__(self) -> Iterator[Linea]:
+        return iter(list(self._lineas.values()))
+
+    def __len__(self) -> int:
+        return len(self._lineas)
@@ -0,0 +1,50 @@
+# lib_compras.py
+import datetime
+import math
+from typing import Iterable, Optional
+from lib_db import transaction
+from lib_lotes import asignar_vencimiento
+from lib_caja import a_centavos, registrar_movimiento
+
+def registrar_compra(path: str, items: Iterable[dict], fecha: Optional[str] = None) -> int:
+    """Registra una compra en una sola transacción y devuelve su id.
+
+    Las cantidades deben ser positivas, los precios no negativos y finitos y
+    los vencimientos fechas ISO (YYYY-MM-DD): con una cantidad negativa el
+    stock bajaría de cero y la caja registraría un ingreso. Se valida todo
+    antes de abrir la transacción.
+    """
+    lineas = []
+    for it in items:
+        cdb, cant, precio = int(it['cdb']), int(it['cantidad']), float(it['precio'])
+        if cant <= 0:
+            raise ValueError(f"Cantidad inválida para {it.get('nombre', cdb)}: {cant}")
+        # NaN no cumple ninguna comparación: se guardaría como precio NULL
+        if not 0 <= precio < math.inf:
+            raise ValueError(f"Precio inválido para {it.get('nombre', cdb)}: {precio}")
+        venc = it.get('vencimiento')
+        if venc:
+            # "31/12/2026" quedaría ordenado después de toda fecha ISO: nunca vencería
+            try:
+                venc = datetime.date.fromisoformat(str(venc).strip()).isoformat()
+            except ValueError:
+                raise ValueError(f"Vencimiento inválido para {it.get('nombre', cdb)}: {venc}") from None
+        lineas.append((it, cdb, cant, precio, venc or None))
+    fecha = fecha or datetime.datetime.now().isoformat()
+    with transaction(path) as cur:
+        cur.execute("INSERT INTO compra (fecha) VALUES (?)", (fecha,))
+        cid = cur.lastrowid
+        total = 0
+        for it, cdb, cant, precio, venc in lineas:
+            # suma sobre el valor actual: no pisa ventas hechas entretanto en otra terminal
+            cur.execute("UPDATE producto SET cantidad = cantidad + ?, precio = ? WHERE cdb = ?", (cant, precio, cdb))
+            if cur.rowcount != 1:
+                raise ValueError(f"Producto inexistente: {it.get('nombre', cdb)}")
+            cur.execute("INSERT INTO compra_detalle (compra, cdb, cantidad, precio_compra, fecha) VALUES (?, ?, ?, ?, ?)",
+                        (cid, cdb, cant, precio, fecha))
+            total += a_centavos(precio * cant)
+            if venc:
+                # el stock nuevo entra al lote sin fecha; se pasa al lote que vence
+                asignar_vencimiento(cur, cdb, cant, venc)
+        registrar_movimiento(cur, "compra", -total, cid)
+    return cid
@@ -1,57 +1,336 @@
 # lib_db.py
 import sqlite3
-import datetime
-from typing import Optional, Tuple, List
-
-DB_INIT_SQL = """
-CREATE TABLE IF NOT EXISTS producto (
-    cdb INTEGER PRIMARY KEY,
-    nombre TEXT,
-    precio REAL DEFAULT 0,
-    cantidad INTEGER DEFAULT 0,
-    umbral INTEGER DEFAULT 0,
-    margen REAL DEFAULT 0.2,
-    perecedero INTEGER DEFAULT 0
-);
-CREATE TABLE IF NOT EXISTS dinero (
-    id INTEGER PRIMARY KEY,
-    total REAL DEFAULT 0
-);
-CREATE TABLE IF NOT EXISTS compra ( id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT );
-CREATE TABLE IF NOT EXISTS compra_detalle ( compra INTEGER, cdb INTEGER, cantidad INTEGER, precio_compra REAL );
-CREATE TABLE IF NOT EXISTS venta ( id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT );
-CREATE TABLE IF NOT EXISTS venta_detalle ( venta INTEGER, cdb INTEGER, cantidad INTEGER, precio_venta REAL );
-CREATE TABLE IF NOT EXISTS vencimientos ( cdb INTEGER, cantidad INTEGER, fecha_vencimiento TEXT );
-CREATE TABLE IF NOT EXISTS configuracion ( id INTEGER PRIMARY KEY, passwd TEXT );
-"""
+import math
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple, List, Iterator
+
+import lib_diagnostico
+# TRACKED_TABLES se reexporta para lib_eventos
+from lib_migraciones import TRACKED_TABLES, migrate
+
+PRODUCT_COLUMNS = "cdb, nombre, precio, cantidad, margen, umbral, perecedero"
+# Consultas usadas por los frames. lib_migraciones.check_query_plans verifica
+# que todas se resuelvan con índices (python lib_migraciones.py data/data.db).
+# Las consultas del historial de Reportes se arman en lib_historial.
+QUERIES = {
+    "alertas_bajo_stock": ("SELECT cdb, nombre, cantidad, umbral FROM producto WHERE cantidad <= umbral", ()),
+    "alertas_vencimientos": ("""SELECT v.id, v.cdb, p.nombre, v.cantidad, v.fecha_vencimiento
+                                FROM vencimientos v JOIN producto p ON v.cdb=p.cdb
+                                WHERE v.fecha_vencimiento <= date('now', ?)""", ("+7 days",)),
+    "vencimientos_lista": ("""SELECT v.id, v.cdb, p.nombre, v.cantidad, v.fecha_vencimiento
+                              FROM vencimientos v LEFT JOIN producto p ON p.cdb = v.cdb
+                              WHERE v.fecha_vencimiento IS NOT NULL ORDER BY v.fecha_vencimiento""", ()),
+    "producto": (f"SELECT {PRODUCT_COLUMNS} FROM producto WHERE cdb=?", (1,)),
+}
+
+# largo máximo de un código de barras (EAN-14/GTIN-14)
+MAX_CDB_DIGITS = 14
+MIN_RANKED_QUERY = 3
+
+# Pragmas que se aplican una sola vez, al abrir cada conexión del pool.
+# journal_mode=WAL queda persistido en el archivo; el resto es por conexión.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+# cantidad de sentencias preparadas que sqlite3 mantiene por conexión
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+# todas las conexiones del pool, de todos los hilos, para cerrarlas al salir
+_pool_all: List[sqlite3.Connection] = []
+# sube con cada close_all_connections: los pools de hilos con otra generación
+# tienen conexiones cerradas y se descartan
+_pool_gen = 0
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Abre una conexión nueva (fuera del pool) con los pragmas aplicados.
+
+    Si el diagnóstico está activo (lib_diagnostico.ACTIVO) las sentencias de
+    la conexión se miden.
+    """
+    factory = lib_diagnostico.ConexionMedida if lib_diagnostico.ACTIVO else sqlite3.Connection
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES,
+                           isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE, factory=factory,
+                           check_same_thread=check_same_thread)
+    lib_diagnostico.preparar_conexion(conn)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    _funciones_matematicas(conn)
+    return conn
+
+def _funciones_matematicas(conn: sqlite3.Connection):
+    # SQLite compilado sin SQLITE_ENABLE_MATH_FUNCTIONS: las que usan las
+    # consultas de lib_reposicion se registran en Python (los triggers no las usan)
+    try:
+        conn.execute("SELECT pow(1, 1), sqrt(1)")
+    except sqlite3.OperationalError:
+        conn.create_function("pow", 2, math.pow, deterministic=True)
+        conn.create_function("sqrt", 1, math.sqrt, deterministic=True)
+
+def _pool_key(path: str) -> str:
+    return path if path == ":memory:" else os.path.abspath(path)
 
 def get_connection(path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
+    """Devuelve la conexión persistente de este hilo para `path`.
+
+    La conexión es compartida por todo el hilo: no debe cerrarse después de
+    usarla. Para escribir usar `transaction()`.
+    """
+    pool = getattr(_local, "pool", None)
+    if pool is None or _local.gen != _pool_gen:
+        pool = _local.pool = {}
+        _local.gen = _pool_gen
+    key = _pool_key(path)
+    conn = pool.get(key)
+    if conn is None:
+        # la usa solo este hilo; sin check_same_thread para que
+        # close_all_connections pueda cerrarla desde otro al salir
+        conn = pool[key] = connect(path, check_same_thread=False)
+        with _pool_lock:
+            _pool_all.append(conn)
     return conn
 
-def init_db(path: str):
+def close_connections():
+    """Cierra las conexiones del pool abiertas por el hilo actual."""
+    pool = getattr(_local, "pool", None)
+    if not pool:
+        return
+    for conn in pool.values():
+        with _pool_lock:
+            if conn in _pool_all:
+                _pool_all.remove(conn)
+        conn.close()
+    pool.clear()
+
+def close_all_connections():
+    """Cierra las conexiones del pool de todos los hilos (executor, servidor).
+
+    Para la salida del programa, con los hilos de trabajo ya detenidos: un
+    hilo que siga usando la base abre una conexión nueva.
+    """
+    global _pool_gen
+    with _pool_lock:
+        conexiones = list(_pool_all)
+        _pool_all.clear()
+        _pool_gen += 1
+    for conn in conexiones:
+        conn.close()
+
+# intentos de tomar el lock de escritura; cada uno espera hasta busy_timeout
+BEGIN_RETRIES = 3
+BEGIN_BACKOFF = 0.05
+
+def begin_immediate(cur: sqlite3.Cursor):
+    """Abre una transacción de escritura tomando el lock de entrada.
+
+    Con BEGIN a secas la transacción empieza leyendo y, si otra terminal
+    escribió entretanto, el primer UPDATE falla con "database is locked" sin
+    esperar. BEGIN IMMEDIATE espera el lock (busy_timeout) antes de leer nada;
+    si aun así no lo consigue se reintenta unas pocas veces con espera
+    creciente y al final se propaga el error.
+    """
+    for intento in range(BEGIN_RETRIES):
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if intento == BEGIN_RETRIES - 1 or "locked" not in str(e) and "busy" not in str(e):
+                raise
+            time.sleep(BEGIN_BACKOFF * (2 ** intento) * (1 + random.random()))
+
+@contextmanager
+def transaction(path: str) -> Iterator[sqlite3.Cursor]:
+    """Ejecuta el bloque dentro de una transacción: commit al salir, rollback si hay excepción.
+
+    Si ya hay una transacción abierta en la conexión del hilo, el bloque se une a ella.
+    """
     conn = get_connection(path)
     cur = conn.cursor()
-    cur.executescript(DB_INIT_SQL)
-    # ensure dinero row exists
-    cur.execute("INSERT OR IGNORE INTO dinero (id, total) VALUES (1, 0)")
-    cur.execute("INSERT OR IGNORE INTO configuracion (id, passwd) VALUES (1, '')")
-    conn.commit()
-    conn.close()
+    if conn.in_transaction:
+        yield cur
+        return
+    begin_immediate(cur)
+    try:
+        yield cur
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+def init_db(path: str):
+    # aplica las migraciones pendientes; si el esquema está al día no hace nada
+    migrate(get_connection(path))
+
+class ProductCatalog:
+    """Copia en memoria de la tabla producto, indexada por cdb.
+
+    Antes de cada lectura compara la versión guardada con MAX(version) de
+    producto_version (una búsqueda en índice): si no cambió la lectura es
+    gratuita; si cambió, solo se releen los productos modificados desde entonces.
+    """
+
+    # si cambió más de esta fracción del catálogo conviene recargarlo entero
+    FULL_RELOAD_RATIO = 0.25
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._products = {}
+        self._list: List[Tuple] = []
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.patched_rows = 0
+
+    def _sync(self, conn: sqlite3.Connection):
+        version = conn.execute("SELECT IFNULL(MAX(version), 0) FROM producto_version").fetchone()[0]
+        if version == self._version:
+            self.hits += 1
+            return
+        if self._version is not None and version > self._version:
+            changed = conn.execute("""SELECT v.cdb, p.cdb, p.nombre, p.precio, p.cantidad, p.margen, p.umbral, p.perecedero
+                                      FROM producto_version v LEFT JOIN producto p ON p.cdb = v.cdb
+                                      WHERE v.version > ?""", (self._version,)).fetchall()
+            if len(changed) <= max(1, len(self._products)) * self.FULL_RELOAD_RATIO:
+                self._patch(changed)
+                self._version = version
+                self.patches += 1
+                self.patched_rows += len(changed)
+                return
+        rows = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM producto ORDER BY cdb").fetchall()
+        self._products = {r[0]: r for r in rows}
+        self._list = rows
+        self._version = version
+        self.misses += 1
+
+    def _patch(self, changed):
+        estructural = False
+        for row in changed:
+            cdb, product = row[0], (row[1:] if row[1] is not None else None)
+            if product is None:
+                estructural |= self._products.pop(cdb, None) is not None
+            else:
+                estructural |= cdb not in self._products
+                self._products[cdb] = product
+        if estructural:
+            # altas o bajas: se reconstruye el orden por cdb
+            self._products = {k: self._products[k] for k in sorted(self._products)}
+        self._list = list(self._products.values())
+
+    def _conn_or_none(self) -> Optional[sqlite3.Connection]:
+        conn = get_connection(self.path)
+        # dentro de una transacción abierta los datos pueden deshacerse: no se cachean
+        return None if conn.in_transaction else conn
+
+    def all(self) -> List[Tuple]:
+        """Lista de productos ordenada por cdb. No debe modificarse."""
+        conn = self._conn_or_none()
+        if conn is None:
+            return get_connection(self.path).execute(f"SELECT {PRODUCT_COLUMNS} FROM producto ORDER BY cdb").fetchall()
+        with self._lock:
+            self._sync(conn)
+            return self._list
+
+    def get(self, cdb: int) -> Optional[Tuple]:
+        conn = self._conn_or_none()
+        if conn is None:
+            return get_connection(self.path).execute(f"SELECT {PRODUCT_COLUMNS} FROM producto WHERE cdb=?", (cdb,)).fetchone()
+        with self._lock:
+            self._sync(conn)
+            return self._products.get(cdb)
+
+    def get_many(self, cdbs: List[int]) -> List[Optional[Tuple]]:
+        """Varios productos (None si no existe) con una sola verificación de versión."""
+        conn = self._conn_or_none()
+        if conn is None:
+            return [self.get(cdb) for cdb in cdbs]
+        with self._lock:
+            self._sync(conn)
+            return [self._products.get(cdb) for cdb in cdbs]
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"productos": len(self._products), "version": self._version, "hits": self.hits,
+                    "misses": self.misses, "patches": self.patches, "patched_rows": self.patched_rows}
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def catalog(path: str) -> ProductCatalog:
+    """Catálogo compartido por todo el proceso para la base `path`."""
+    key = _pool_key(path)
+    with _catalogs_lock:
+        cat = _catalogs.get(key)
+        if cat is None:
+            cat = _catalogs[key] = ProductCatalog(path)
+        return cat
 
 # Small convenience helpers used across modules
 def fetch_all_products(path: str) -> List[Tuple]:
-    conn = get_connection(path)
-    cur = conn.cursor()
-    cur.execute("SELECT cdb, nombre, precio, cantidad, margen, umbral, perecedero FROM producto")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return catalog(path).all()
 
 def get_product(path: str, cdb: int) -> Optional[Tuple]:
+    return catalog(path).get(cdb)
+
+def _fts_query(q: str) -> str:
+    # cada palabra se busca como prefijo; todas deben aparecer
+    tokens = re.findall(r"\w+", q)
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in tokens)
+
+def search_products(path: str, q: str, limit: int = 50) -> List[Tuple]:
+    """Busca productos por código o nombre usando índices, con resultados ordenados y limitados.
+
+    Un texto numérico se resuelve primero como código exacto y luego como prefijo
+    de código (rangos sobre la clave primaria); el nombre se busca en producto_fts
+    ordenado por relevancia (bm25).
+    """
     conn = get_connection(path)
-    cur = conn.cursor()
-    cur.execute("SELECT cdb, nombre, precio, cantidad, margen, umbral, perecedero FROM producto WHERE cdb=?", (cdb,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    q = q.strip()
+    if not q:
+        return conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM producto ORDER BY cdb LIMIT ?", (limit,)).fetchall()
+    rows = []
+    vistos = set()
+    if q.isdigit() and len(q) <= MAX_CDB_DIGITS:
+        base = int(q)
+        # un prefijo de k dígitos corresponde a un rango contiguo de cdb por cada largo posible
+        for extra in range(MAX_CDB_DIGITS - len(q) + 1):
+            if len(rows) >= limit:
+                break
+            desde = base * 10 ** extra
+            hasta = (base + 1) * 10 ** extra - 1
+            cur = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM producto WHERE cdb BETWEEN ? AND ? ORDER BY cdb LIMIT ?",
+                               (desde, hasta, limit - len(rows)))
+            for r in cur:
+                rows.append(r)
+                vistos.add(r[0])
+    match = _fts_query(q)
+    if match and len(rows) < limit:
+        # con menos de 3 letras hay demasiadas coincidencias para ordenarlas por
+        # relevancia dentro del presupuesto; se devuelven en orden de código
+        orden = "ORDER BY f.rank" if len(q) >= MIN_RANKED_QUERY else ""
+        cur = conn.execute(f"""SELECT p.cdb, p.nombre, p.precio, p.cantidad, p.margen, p.umbral, p.perecedero
+                               FROM producto_fts f JOIN producto p ON p.cdb = f.rowid
+                               WHERE producto_fts MATCH ? {orden} LIMIT ?""",
+                           (match, limit))
+        for r in cur:
+            if r[0] not in vistos:
+                rows.append(r)
+                if len(rows) >= limit:
+                    break
+    return rows
@@ -0,0 +1,257 @@
+# lib_diagnostico.py
+import datetime
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# STOCK_DIAGNOSTICO=0 desactiva la medición de sentencias (las conexiones son sqlite3.Connection comunes)
+ACTIVO = os.environ.get("STOCK_DIAGNOSTICO", "1") != "0"
+# sentencias que tardan más que esto van al registro de lentas y al log (nivel INFO)
+LENTA_MS = float(os.environ.get("STOCK_SQL_LENTA_MS", "50"))
+_lenta_s = LENTA_MS / 1000
+_reloj = time.perf_counter
+# sentencias distintas que se siguen por separado; el resto se suma en "(otras)"
+MAX_SENTENCIAS = 300
+MAX_LENTAS = 200
+# instrucciones de la VM de SQLite entre llamadas del progress handler
+PASOS_VM = 10000
+# buckets de potencias de 2 en microsegundos: el último junta todo lo que supera ~9 minutos
+N_BUCKETS = 30
+
+log = logging.getLogger("stock.sql")
+
+class Histograma:
+    """Tiempos agrupados en buckets logarítmicos (potencias de 2 en µs).
+
+    Agregar un valor es O(1) y ocupa memoria fija; los percentiles son
+    aproximados al límite superior del bucket.
+    """
+
+    __slots__ = ("n", "total", "maximo", "buckets")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def agregar(self, segundos: float):
+        i = int(segundos * 1e6).bit_length()
+        if i >= N_BUCKETS:
+            i = N_BUCKETS - 1
+        # sin lock: bajo el GIL una carrera entre hilos puede perder alguna
+        # muestra, que para diagnóstico da igual y ahorra la mitad del costo
+        self.n += 1
+        self.total += segundos
+        self.buckets[i] += 1
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, q: float) -> float:
+        """Límite superior (en segundos) del bucket que contiene el percentil q."""
+        objetivo = q * self.n
+        acumulado = 0
+        for i, c in enumerate(self.buckets):
+            acumulado += c
+            if c and acumulado >= objetivo:
+                return min((1 << i) / 1e6, self.maximo)
+        return self.maximo
+
+    def resumen(self) -> dict:
+        if not self.n:
+            return {"n": 0}
+        return {"n": self.n, "total_ms": round(self.total * 1000, 3), "media_ms": round(self.total / self.n * 1000, 3),
+                "p50_ms": round(self.percentil(0.5) * 1000, 3), "p95_ms": round(self.percentil(0.95) * 1000, 3),
+                "p99_ms": round(self.percentil(0.99) * 1000, 3), "max_ms": round(self.maximo * 1000, 3),
+                "buckets_us": {1 << i: c for i, c in enumerate(self.buckets) if c}}
+
+class _Sentencia:
+    __slots__ = ("clave", "ejecucion", "lectura", "pasos_vm")
+
+    def __init__(self, clave: str):
+        self.clave = clave
+        self.ejecucion = Histograma()
+        self.lectura = Histograma()
+        self.pasos_vm = 0
+
+_lock = threading.Lock()
+_histogramas: Dict[str, Histograma] = {}
+_sentencias: Dict[str, _Sentencia] = {}
+_lentas: deque = deque(maxlen=MAX_LENTAS)
+_local = threading.local()
+# texto SQL tal como llega -> estadística; evita normalizar el texto en cada ejecución
+_por_texto: Dict[str, "_Sentencia"] = {}
+_espacios = re.compile(r"\s+")
+
+def histograma(nombre: str) -> Histograma:
+    h = _histogramas.get(nombre)
+    if h is None:
+        with _lock:
+            h = _histogramas.setdefault(nombre, Histograma())
+    return h
+
+def registrar(nombre: str, segundos: float):
+    histograma(nombre).agregar(segundos)
+
+@contextmanager
+def medir(nombre: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - t0)
+
+def _clave(sql: str) -> str:
+    return _espacios.sub(" ", sql).strip()[:200]
+
+def _sentencia(clave: str) -> _Sentencia:
+    s = _sentencias.get(clave)
+    if s is None:
+        with _lock:
+            if clave not in _sentencias and len(_sentencias) >= MAX_SENTENCIAS:
+                clave = "(otras)"
+            s = _sentencias.get(clave)
+            if s is None:
+                s = _sentencias[clave] = _Sentencia(clave)
+    return s
+
+def _de_texto(sql: str) -> _Sentencia:
+    s = _por_texto.get(sql)
+    if s is None:
+        s = _sentencia(_clave(sql))
+        if len(_por_texto) < 4 * MAX_SENTENCIAS:
+            _por_texto[sql] = s
+    return s
+
+def _lenta(clave: str, segundos: float, etapa: str):
+    _lentas.append((datetime.datetime.now().isoformat(timespec="milliseconds"), round(segundos * 1000, 3),
+                    etapa, threading.current_thread().name, clave))
+    log.info("sentencia lenta (%s, %.1f ms): %s", etapa, segundos * 1000, clave)
+
+def sentencia(sql: str, segundos: float, etapa: str = "ejecucion"):
+    """Registra una ejecución (o lectura de filas) de `sql` medida por fuera."""
+    s = _de_texto(sql)
+    (_ejecutada if etapa == "ejecucion" else _leida)(s, segundos)
+
+def _ejecutada(s: "_Sentencia", segundos: float):
+    s.ejecucion.agregar(segundos)
+    if segundos >= _lenta_s:
+        _lenta(s.clave, segundos, "ejecucion")
+
+def _leida(s: Optional["_Sentencia"], segundos: float):
+    if s is not None:
+        s.lectura.agregar(segundos)
+        if segundos >= _lenta_s:
+            _lenta(s.clave, segundos, "lectura")
+
+def _progreso() -> int:
+    # progress handler: cada PASOS_VM instrucciones de la sentencia en curso de este hilo
+    s = getattr(_local, "actual", None)
+    if s is not None:
+        s.pasos_vm += 1
+    return 0
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que mide execute/executemany y las lecturas con fetch*.
+
+    Las filas leídas iterando el cursor no se miden (un wrapper por fila
+    costaría más que la lectura). Los métodos evitan llamadas intermedias:
+    la medición se paga en cada sentencia.
+    """
+
+    _sentencia = None
+
+    def execute(self, sql, *args):
+        s = _por_texto.get(sql) or _de_texto(sql)
+        self._sentencia = _local.actual = s
+        t0 = _reloj()
+        try:
+            return sqlite3.Cursor.execute(self, sql, *args)
+        finally:
+            _ejecutada(s, _reloj() - t0)
+
+    def executemany(self, sql, *args):
+        s = _por_texto.get(sql) or _de_texto(sql)
+        self._sentencia = _local.actual = s
+        t0 = _reloj()
+        try:
+            return sqlite3.Cursor.executemany(self, sql, *args)
+        finally:
+            _ejecutada(s, _reloj() - t0)
+
+    def fetchone(self):
+        t0 = _reloj()
+        try:
+            return sqlite3.Cursor.fetchone(self)
+        finally:
+            _leida(self._sentencia, _reloj() - t0)
+
+    def fetchmany(self, *args):
+        t0 = _reloj()
+        try:
+            return sqlite3.Cursor.fetchmany(self, *args)
+        finally:
+            _leida(self._sentencia, _reloj() - t0)
+
+    def fetchall(self):
+        t0 = _reloj()
+        try:
+            return sqlite3.Cursor.fetchall(self)
+        finally:
+            _leida(self._sentencia, _reloj() - t0)
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyos cursores son CursorMedido; mide también los commits."""
+
+    def cursor(self, factory=None):
+        return sqlite3.Connection.cursor(self, factory or CursorMedido)
+
+    def execute(self, sql, *args):
+        return sqlite3.Connection.cursor(self, CursorMedido).execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return sqlite3.Connection.cursor(self, CursorMedido).executemany(sql, *args)
+
+    def commit(self):
+        with medir("sql.commit"):
+            super().commit()
+
+def preparar_conexion(conn: sqlite3.Connection):
+    """Instala el progress handler que cuenta trabajo de la VM por sentencia."""
+    if ACTIVO:
+        conn.set_progress_handler(_progreso, PASOS_VM)
+
+def snapshot() -> dict:
+    with _lock:
+        histos = dict(_histogramas)
+        sentencias = dict(_sentencias)
+    filas = []
+    for clave, s in sentencias.items():
+        total = s.ejecucion.total + s.lectura.total
+        filas.append({"sql": clave, "total_ms": round(total * 1000, 3), "pasos_vm": s.pasos_vm * PASOS_VM,
+                      "ejecucion": s.ejecucion.resumen(), "lectura": s.lectura.resumen()})
+    filas.sort(key=lambda f: f["total_ms"], reverse=True)
+    return {"fecha": datetime.datetime.now().isoformat(timespec="seconds"), "lenta_ms": LENTA_MS,
+            "histogramas": {k: histos[k].resumen() for k in sorted(histos)},
+            "sentencias": filas,
+            "lentas": [dict(zip(("fecha", "ms", "etapa", "hilo", "sql"), l)) for l in list(_lentas)]}
+
+def exportar(ruta: str) -> dict:
+    datos = snapshot()
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    return datos
+
+def reiniciar():
+    with _lock:
+        _histogramas.clear()
+        _sentencias.clear()
+        _por_texto.clear()
+        _lentas.clear()
@@ -0,0 +1,105 @@
+# lib_eventos.py
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from lib_db import get_connection, transaction, TRACKED_TABLES
+
+class ChangeBus:
+    """Bus publicar/suscribir de cambios por tabla y clave.
+
+    Los que escriben publican qué tablas y claves tocaron (claves=None: no se
+    sabe, tratar como "todo"). `poll()` lee el registro `cambios` y publica lo
+    que escribieron otras conexiones o procesos. Una misma modificación puede
+    notificarse dos veces (localmente y por el registro); los suscriptores
+    deben tolerarlo.
+    """
+
+    # cambios leídos por vuelta; si hay más se notifica "todo"
+    POLL_LIMIT = 5000
+    # filas del registro que se conservan al podar
+    KEEP = 20000
+
+    def __init__(self, db_path: str):
+        self.db = db_path
+        self._subs: Dict[str, List[Callable]] = {}
+        conn = get_connection(db_path)
+        self._last_seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM cambios").fetchone()[0]
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def subscribe(self, tabla: str, callback: Callable[[str, Optional[Set[int]]], None]):
+        """Registra callback(tabla, claves). tabla="*" recibe todos los cambios."""
+        self._subs.setdefault(tabla, []).append(callback)
+
+    def unsubscribe(self, tabla: str, callback: Callable):
+        subs = self._subs.get(tabla, [])
+        if callback in subs:
+            subs.remove(callback)
+
+    def publish(self, tabla: str, claves: Optional[Iterable[int]] = None):
+        claves = None if claves is None else set(claves)
+        for cb in self._subs.get(tabla, []) + self._subs.get("*", []):
+            cb(tabla, claves)
+
+    def publish_cambios(self, cambios: Dict[str, Optional[Iterable[int]]]):
+        """Publica el dict "cambios" que devuelven las escrituras de lib_servicio."""
+        for tabla, claves in cambios.items():
+            self.publish(tabla, claves)
+
+    def poll(self):
+        """Publica los cambios registrados desde la última lectura."""
+        conn = get_connection(self.db)
+        # data_version solo cambia cuando otra conexión hizo commit
+        dv = conn.execute("PRAGMA data_version").fetchone()[0]
+        if dv == self._data_version:
+            return
+        self._data_version = dv
+        rows = conn.execute("SELECT seq, tabla, clave FROM cambios WHERE seq > ? ORDER BY seq LIMIT ?",
+                            (self._last_seq, self.POLL_LIMIT + 1)).fetchall()
+        if not rows:
+            return
+        if len(rows) > self.POLL_LIMIT or rows[0][0] > self._last_seq + 1 and self._pruned():
+            # demasiados cambios o el registro fue podado: refrescar todo
+            self._last_seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM cambios").fetchone()[0]
+            for tabla in TRACKED_TABLES:
+                self.publish(tabla, None)
+            return
+        por_tabla: Dict[str, Set[int]] = {}
+        for seq, tabla, clave in rows:
+            por_tabla.setdefault(tabla, set()).add(clave)
+        self._last_seq = rows[-1][0]
+        for tabla, claves in por_tabla.items():
+            self.publish(tabla, claves)
+
+    def _pruned(self) -> bool:
+        # un hueco en seq puede venir de un rollback; solo importa si se podó
+        minimo = get_connection(self.db).execute("SELECT IFNULL(MIN(seq), 0) FROM cambios").fetchone()[0]
+        return minimo > self._last_seq + 1
+
+    @classmethod
+    def prune(cls, db_path: str, keep: Optional[int] = None):
+        """Borra las entradas viejas del registro (para correr en segundo plano)."""
+        keep = cls.KEEP if keep is None else keep
+        with transaction(db_path) as cur:
+            cur.execute("DELETE FROM cambios WHERE seq <= (SELECT MAX(seq) FROM cambios) - ?", (keep,))
+
+class StaleTracker:
+    """Acumula los cambios recibidos por un frame mientras no se refresca."""
+
+    def __init__(self):
+        self.stale = True
+        self.all = True
+        self.keys: Set[int] = set()
+
+    def mark(self, tabla: str, claves: Optional[Set[int]]):
+        self.stale = True
+        if claves is None:
+            self.all = True
+        else:
+            self.keys |= claves
+
+    def invalidate(self):
+        self.mark("", None)
+
+    def take(self) -> Tuple[bool, Set[int]]:
+        """Devuelve (refrescar_todo, claves) y limpia lo acumulado."""
+        res = (self.all, self.keys)
+        self.stale, self.all, self.keys = False, False, set()
+        return res
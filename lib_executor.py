@@ -0,0 +1,150 @@
+# lib_executor.py
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from lib_db import get_connection
+import lib_diagnostico
+
+class DbExecutor:
+    """Ejecuta consultas en hilos de trabajo y entrega los resultados al hilo de Tk.
+
+    Cada hilo usa su propia conexión del pool de lib_db. Los callbacks
+    `on_done`/`on_error` se llaman siempre desde el loop de Tk (vía `after`).
+    Las tareas se agrupan por `tag` (normalmente el frame que las pidió) para
+    poder cancelarlas juntas: las pendientes no se ejecutan, las que están
+    corriendo se interrumpen si son de solo lectura y sus resultados se descartan.
+    Se miden la duración de cada tarea ("tarea.<fn>") y de su callback en el
+    hilo de Tk ("entrega.<fn>").
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, root, db_path: str, workers: int = 2):
+        self.root = root
+        self.db = db_path
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._results = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._generation = {}
+        self._running = {}
+        self._outstanding = {}
+        self._pending = 0
+        self._poll_id = None
+        self._closed = False
+
+    def submit(self, fn: Callable, *args, on_done: Optional[Callable] = None, on_error: Optional[Callable] = None,
+               tag=None, interruptible: bool = False) -> Future:
+        """Programa `fn(*args)` en un hilo de trabajo. Debe llamarse desde el hilo de Tk.
+
+        `interruptible` solo debe usarse con lecturas: al cancelar el tag se
+        interrumpe la sentencia en curso con `Connection.interrupt()`.
+        """
+        gen = self._generation.get(tag, 0)
+        nombre = getattr(fn, "__name__", type(fn).__name__)
+
+        def run():
+            conn = get_connection(self.db) if interruptible else None
+            with self._lock:
+                if self._generation.get(tag, 0) != gen:
+                    raise _Stale()
+                if conn is not None:
+                    self._running.setdefault(tag, set()).add(conn)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                lib_diagnostico.registrar("tarea." + nombre, time.perf_counter() - t0)
+                if conn is not None:
+                    with self._lock:
+                        self._running.get(tag, set()).discard(conn)
+
+        fut = self._pool.submit(run)
+        self._pending += 1
+        self._outstanding[tag] = self._outstanding.get(tag, 0) + 1
+        fut.add_done_callback(lambda f: self._results.put((f, tag, gen, nombre, on_done, on_error)))
+        self._schedule_poll()
+        return fut
+
+    def cancel(self, tag) -> bool:
+        """Descarta las tareas de `tag` todavía no entregadas. Devuelve True si había alguna."""
+        if not self._outstanding.get(tag):
+            return False
+        with self._lock:
+            self._generation[tag] = self._generation.get(tag, 0) + 1
+            for conn in self._running.pop(tag, ()):
+                conn.interrupt()
+        return True
+
+    def busy(self) -> bool:
+        return self._pending > 0
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                fut, tag, gen, nombre, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._outstanding[tag] -= 1
+            if not self._outstanding[tag]:
+                del self._outstanding[tag]
+            if fut.cancelled() or self._generation.get(tag, 0) != gen:
+                continue
+            exc = fut.exception()
+            if isinstance(exc, _Stale) or (isinstance(exc, sqlite3.OperationalError) and "interrupt" in str(exc)):
+                continue
+            if exc is not None:
+                if on_error:
+                    on_error(exc)
+                else:
+                    self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+            elif on_done:
+                with lib_diagnostico.medir("entrega." + nombre):
+                    on_done(fut.result())
+        if self._pending > 0:
+            self._schedule_poll()
+
+    def shutdown(self, wait: bool = False):
+        """Descarta lo que está en cola; con `wait` espera a que terminen las tareas en curso."""
+        self._closed = True
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+class SyncExecutor:
+    """Misma interfaz que DbExecutor pero ejecuta en el acto (sin hilos)."""
+
+    def submit(self, fn, *args, on_done=None, on_error=None, tag=None, interruptible=False):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+            if on_error is None:
+                raise
+            on_error(e)
+            return fut
+        if on_done:
+            on_done(fut.result())
+        return fut
+
+    def cancel(self, tag) -> bool:
+        return False
+
+    def busy(self) -> bool:
+        return False
+
+    def shutdown(self, wait: bool = False):
+        pass
+
+class _Stale(Exception):
+    pass
@@ -0,0 +1,273 @@
+# lib_exportar.py
+import csv
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import zlib
+from typing import Callable, Iterator, List, Optional, Tuple
+from lib_db import get_connection, init_db
+from lib_archivo import particiones
+from lib_caja import formato, saldo_al
+from lib_historial import TIPOS
+
+# filas por lectura del cursor: la memoria no depende del tamaño del reporte
+CHUNK = 5000
+
+class Cancelado(Exception):
+    pass
+
+# --- consultas ---
+# Cada reporte es un generador de tandas de filas ya formateadas. Todas las
+# consultas recorren un índice en el orden pedido (sin ORDER BY en memoria)
+# y se leen con fetchmany.
+
+def _tandas(cur: sqlite3.Cursor) -> Iterator[list]:
+    while True:
+        filas = cur.fetchmany(CHUNK)
+        if not filas:
+            return
+        yield filas
+
+def _fin(hasta: Optional[str]) -> Optional[str]:
+    # `hasta` es inclusivo: se compara con el día siguiente
+    return (datetime.date.fromisoformat(hasta) + datetime.timedelta(days=1)).isoformat() if hasta else None
+
+def _detalle(tipo: str):
+    tabla, cabecera, precio = TIPOS[tipo]
+
+    def filas(path: str, desde: Optional[str], hasta: Optional[str]) -> Iterator[list]:
+        conn = get_connection(path)
+        fin = _fin(hasta)
+        filtros = [f for f, valor in (("d.fecha >= :desde", desde), ("d.fecha < :fin", fin)) if valor]
+        where = "WHERE " + " AND ".join(filtros) if filtros else ""
+        unidades = importe = 0
+        # particiones en orden de fecha: los archivos del más viejo al más nuevo y la base principal al final
+        partes = particiones(conn, path)
+        for esquema, inicio, limite in partes[1:][::-1] + partes[:1]:
+            if inicio is not None and (desde and limite <= desde or fin and inicio >= fin):
+                continue
+            cur = conn.execute(f"""SELECT d.fecha, d.{cabecera}, d.cdb, p.nombre, d.cantidad, d.{precio},
+                                          round(d.cantidad * IFNULL(d.{precio}, 0), 2)
+                                   FROM {esquema}.{tabla} d LEFT JOIN main.producto p ON p.cdb = d.cdb
+                                   {where} ORDER BY d.fecha, d.id""", {"desde": desde, "fin": fin})
+            for tanda in _tandas(cur):
+                for f in tanda:
+                    unidades += f[4]
+                    importe += f[6]
+                yield tanda
+        yield [("Total", None, None, None, unidades, None, round(importe, 2))]
+    return filas
+
+def _stock(path: str, desde: Optional[str], hasta: Optional[str]) -> Iterator[list]:
+    # valuación al momento de exportar: el rango de fechas no aplica
+    cur = get_connection(path).execute("""
+        SELECT cdb, nombre, cantidad, precio, margen, round(cantidad * precio, 2),
+               round(cantidad * precio * (1 + margen), 2)
+        FROM producto ORDER BY cdb""")
+    unidades = costo = venta = 0
+    for tanda in _tandas(cur):
+        for f in tanda:
+            unidades += f[2]
+            costo += f[5]
+            venta += f[6]
+        yield tanda
+    yield [("Total", None, unidades, None, None, round(costo, 2), round(venta, 2))]
+
+def _caja(path: str, desde: Optional[str], hasta: Optional[str]) -> Iterator[list]:
+    # saldo acumulado desde el saldo anterior al rango (lib_caja usa las fotos)
+    saldo = saldo_al(path, desde) if desde else 0
+    fin = _fin(hasta)
+    cur = get_connection(path).execute("""
+        SELECT fecha, tipo, importe, referencia, nota FROM caja_movimiento
+        WHERE fecha >= :desde AND (:fin IS NULL OR fecha < :fin) ORDER BY fecha, id""",
+                                       {"desde": desde or "", "fin": fin})
+    for tanda in _tandas(cur):
+        filas = []
+        for fecha, tipo, importe, referencia, nota in tanda:
+            saldo += importe
+            filas.append((fecha, tipo, formato(importe), referencia, nota, formato(saldo)))
+        yield filas
+
+# nombre: (título, columnas [(encabezado, ancho en caracteres en el PDF)], filas)
+REPORTES = {
+    "ventas": ("Detalle de ventas",
+               [("Fecha", 19), ("Venta", 8), ("CDB", 14), ("Producto", 40), ("Cant", 8), ("Precio", 11), ("Importe", 13)],
+               _detalle("ventas")),
+    "compras": ("Detalle de compras",
+                [("Fecha", 19), ("Compra", 8), ("CDB", 14), ("Producto", 40), ("Cant", 8), ("Precio", 11), ("Importe", 13)],
+                _detalle("compras")),
+    "stock": ("Valuación de stock",
+              [("CDB", 14), ("Producto", 40), ("Cant", 8), ("Costo", 11), ("Margen", 7), ("Valor costo", 14), ("Valor venta", 14)],
+              _stock),
+    "caja": ("Movimientos de caja",
+             [("Fecha", 23), ("Tipo", 10), ("Importe", 13), ("Ref.", 8), ("Nota", 40), ("Saldo", 14)],
+             _caja),
+}
+
+# --- formatos ---
+
+class _CSV:
+    def __init__(self, archivo, titulo: str, columnas: List[Tuple[str, int]]):
+        self._writer = csv.writer(archivo)
+        self._writer.writerow([c for c, _ in columnas])
+
+    def filas(self, filas: list):
+        self._writer.writerows(filas)
+
+    def cerrar(self):
+        pass
+
+class PDF:
+    """PDF mínimo (texto en Courier, A4 apaisado) escrito a medida que llegan las filas.
+
+    Cada página se escribe y se olvida: la tabla de referencias (xref) se va
+    volcando a un archivo temporal y la lista de páginas se genera al final a
+    partir de la numeración de los objetos, así la memoria no crece con la
+    cantidad de filas.
+    """
+
+    ANCHO, ALTO = 842, 595
+    MARGEN = 36
+    LETRA = 7.5
+    INTERLINEA = 9.5
+    # objetos fijos: 1 y 2 fuentes, 3 árbol de páginas; después, página y contenido alternados
+    _PRIMERA = 4
+
+    def __init__(self, archivo, titulo: str, columnas: List[Tuple[str, int]]):
+        self.f = archivo
+        self.titulo = titulo
+        self.columnas = columnas
+        self._anchos = [a for _, a in columnas]
+        self.fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.filas_por_pagina = int((self.ALTO - 2 * self.MARGEN) / self.INTERLINEA) - 3
+        self._xref = tempfile.TemporaryFile()
+        self._siguiente = 1
+        self._pendientes: List[str] = []
+        self.paginas = 0
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for nombre in ("Courier", "Courier-Bold"):
+            self._objeto(f"<< /Type /Font /Subtype /Type1 /BaseFont /{nombre} /Encoding /WinAnsiEncoding >>".encode())
+        # el árbol de páginas se escribe al final: su entrada en la xref se completa entonces
+        self._siguiente += 1
+        self._xref.write(b"0000000000 00000 n \n")
+
+    def _objeto(self, cuerpo: bytes) -> int:
+        num = self._siguiente
+        self._siguiente += 1
+        self._xref.write(b"%010d 00000 n \n" % self.f.tell())
+        self.f.write(b"%d 0 obj\n" % num + cuerpo + b"\nendobj\n")
+        return num
+
+    @staticmethod
+    def _texto(s: str) -> bytes:
+        b = s.encode("cp1252", errors="replace")
+        return b"(" + b.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def _linea(self, valores) -> str:
+        # números alineados a la derecha, texto recortado al ancho de la columna
+        celdas = []
+        for ancho, v in zip(self._anchos, valores):
+            t = type(v)
+            if v is None:
+                celdas.append(" " * ancho)
+            elif t is float:
+                celdas.append(f"{v:>{ancho}.2f}")
+            elif t is int:
+                celdas.append(f"{v:>{ancho}}")
+            else:
+                celdas.append(f"{str(v):<{ancho}.{ancho}}")
+        return " ".join(celdas)
+
+    def _pagina(self):
+        self.paginas += 1
+        y = self.ALTO - self.MARGEN
+        partes = [b"BT /F2 %g Tf %g TL %d %g Td " % (self.LETRA, self.INTERLINEA, self.MARGEN, y),
+                  self._texto(f"{self.titulo} - {self.fecha} - página {self.paginas}"), b" Tj T* T* ",
+                  self._texto(self._linea([c for c, _ in self.columnas])), b" Tj /F1 %g Tf" % self.LETRA]
+        for linea in self._pendientes:
+            partes += [b" T* ", self._texto(linea), b" Tj"]
+        partes.append(b" ET")
+        contenido = zlib.compress(b"".join(partes))
+        self._pendientes.clear()
+        num = self._siguiente
+        self._objeto(b"<< /Type /Page /Parent 3 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                     b"/Resources << /Font << /F1 1 0 R /F2 2 0 R >> >> >>" % (self.ANCHO, self.ALTO, num + 1))
+        self._objeto(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(contenido) + contenido + b"\nendstream")
+
+    def filas(self, filas: list):
+        for fila in filas:
+            self._pendientes.append(self._linea(fila))
+            if len(self._pendientes) >= self.filas_por_pagina:
+                self._pagina()
+
+    def cerrar(self):
+        if self._pendientes or not self.paginas:
+            self._pagina()
+        arbol = self.f.tell()
+        self.f.write(b"3 0 obj\n<< /Type /Pages /Count %d /Kids [" % self.paginas)
+        for i in range(self.paginas):
+            self.f.write(b"%d 0 R " % (self._PRIMERA + 2 * i))
+        self.f.write(b"] >>\nendobj\n")
+        catalogo = self.f.tell()
+        self.f.write(b"%d 0 obj\n<< /Type /Catalog /Pages 3 0 R >>\nendobj\n" % self._siguiente)
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (self._siguiente + 1))
+        # entradas 1 y 2 (fuentes), 3 (árbol) y desde 4 las páginas, en el orden del temporal
+        self._xref.seek(0)
+        fuentes = self._xref.read(40)
+        self._xref.read(20)
+        self.f.write(fuentes + b"%010d 00000 n \n" % arbol)
+        while True:
+            bloque = self._xref.read(1 << 16)
+            if not bloque:
+                break
+            self.f.write(bloque)
+        self.f.write(b"%010d 00000 n \n" % catalogo)
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (self._siguiente + 1, self._siguiente, xref))
+        self._xref.close()
+
+def exportar_reporte(path: str, reporte: str, ruta: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     on_progress: Optional[Callable[[int], None]] = None,
+                     cancelar: Optional[threading.Event] = None) -> int:
+    """Escribe el reporte en `ruta` (PDF si termina en .pdf, si no CSV) y devuelve la cantidad de filas.
+
+    Las filas se leen del cursor de a CHUNK y se escriben en el acto; la
+    memoria usada no depende del tamaño del reporte. Se escribe en un
+    archivo temporal junto a `ruta` que se renombra al terminar: si falla o
+    se cancela (con `cancelar.set()`, revisado entre tandas) no queda un
+    archivo a medias. `desde` y `hasta` son fechas YYYY-MM-DD inclusivas.
+    """
+    titulo, columnas, generador = REPORTES[reporte]
+    if desde or hasta:
+        titulo += f" ({desde or '…'} a {hasta or '…'})"
+    pdf = ruta.lower().endswith(".pdf")
+    parcial = ruta + ".parcial"
+    total = 0
+    try:
+        with open(parcial, "wb") if pdf else open(parcial, "w", newline="", encoding="utf-8") as archivo:
+            salida = (PDF if pdf else _CSV)(archivo, titulo, columnas)
+            for filas in generador(path, desde, hasta):
+                if cancelar is not None and cancelar.is_set():
+                    raise Cancelado("Exportación cancelada")
+                salida.filas(filas)
+                total += len(filas)
+                if on_progress:
+                    on_progress(total)
+            salida.cerrar()
+        os.replace(parcial, ruta)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    return total
+
+if __name__ == "__main__":
+    # python lib_exportar.py ruta.db ventas|compras|stock|caja archivo.csv|archivo.pdf [desde [hasta]]
+    db, reporte, archivo = sys.argv[1:4]
+    init_db(db)
+    filas = exportar_reporte(db, reporte, archivo, *sys.argv[4:6])
+    print(f"{filas} filas exportadas a {archivo}")
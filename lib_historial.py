@@ -0,0 +1,91 @@
+# lib_historial.py
+import datetime
+from typing import List, Optional, Tuple
+from lib_db import get_connection
+from lib_archivo import particiones
+
+PAGE_SIZE = 200
+
+# tipo: (tabla de detalle, columna de cabecera, columna de precio)
+TIPOS = {
+    "ventas": ("venta_detalle", "venta", "precio_venta"),
+    "compras": ("compra_detalle", "compra", "precio_compra"),
+}
+
+def historial_sql(tipo: str, desde: bool = False, hasta: bool = False, cdb: bool = False,
+                  despues: bool = False, esquema: str = "main") -> str:
+    """Arma la consulta de una página con solo los filtros pedidos.
+
+    Filas: (id de línea, id de venta/compra, fecha, cdb, cantidad, precio). El
+    orden (fecha DESC, id DESC) coincide con los índices (fecha) y (cdb, fecha),
+    que incluyen el rowid, así que cada página es un recorrido de índice que
+    corta en el LIMIT sin importar el tamaño de la tabla. `esquema` elige la
+    base principal o un archivo anual adjunto (lib_archivo).
+    """
+    tabla, cabecera, precio = TIPOS[tipo]
+    filtros = []
+    if cdb:
+        filtros.append("cdb = :cdb")
+    if desde:
+        filtros.append("fecha >= :desde")
+    if hasta:
+        filtros.append("fecha < :hasta")
+    if despues:
+        filtros.append("(fecha, id) < (:fecha, :id)")
+    where = "WHERE " + " AND ".join(filtros) if filtros else ""
+    return f"""SELECT id, {cabecera}, fecha, cdb, cantidad, {precio} FROM {esquema}.{tabla} {where}
+               ORDER BY fecha DESC, id DESC LIMIT :limite"""
+
+def pagina(path: str, tipo: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+           cdb: Optional[int] = None, despues: Optional[Tuple[str, int]] = None,
+           limite: int = PAGE_SIZE) -> List[Tuple]:
+    """Devuelve la página siguiente a `despues` = (fecha, id) de la última fila vista.
+
+    `desde` y `hasta` son fechas YYYY-MM-DD inclusivas. Con años archivados
+    se pide la página a cada partición que puede tener filas (la base
+    principal y los años dentro del rango y anteriores al cursor, del más
+    nuevo al más viejo) y se mezclan; se deja de bajar de año cuando la
+    página ya está completa con filas más nuevas que el año siguiente.
+    """
+    params = {"limite": limite}
+    if desde:
+        params["desde"] = desde
+    if hasta:
+        params["hasta"] = (datetime.date.fromisoformat(hasta) + datetime.timedelta(days=1)).isoformat()
+    if cdb is not None:
+        params["cdb"] = cdb
+    if despues is not None:
+        params["fecha"], params["id"] = despues
+    flags = (bool(desde), bool(hasta), cdb is not None, despues is not None)
+    conn = get_connection(path)
+    filas = []
+    for esquema, inicio, fin in particiones(conn, path):
+        if inicio is not None:
+            if desde and fin <= desde or hasta and inicio >= params["hasta"] or despues and inicio > despues[0]:
+                continue
+            if len(filas) >= limite and (filas[limite - 1][2] or "") >= fin:
+                break
+        filas += conn.execute(historial_sql(tipo, *flags, esquema=esquema), params).fetchall()
+        filas.sort(key=_orden, reverse=True)
+    return filas[:limite]
+
+def _orden(fila: Tuple):
+    # mismo orden que ORDER BY fecha DESC, id DESC (las fechas NULL al final)
+    return fila[2] is not None, fila[2] or "", fila[0]
+
+def cursor_de(filas: List[Tuple]) -> Optional[Tuple[str, int]]:
+    """Clave (fecha, id) para pedir la página siguiente a `filas`."""
+    if not filas:
+        return None
+    ultima = filas[-1]
+    return ultima[2], ultima[0]
+
+def plan_queries():
+    """Todas las combinaciones de filtros, para lib_migraciones.check_query_plans."""
+    consultas = {}
+    params = {"limite": PAGE_SIZE, "cdb": 1, "desde": "2000-01-01", "hasta": "2000-01-02", "fecha": "2000-01-01", "id": 1}
+    for tipo in TIPOS:
+        for n in range(16):
+            flags = [bool(n & (1 << i)) for i in range(4)]
+            consultas[f"historial_{tipo}_{n}"] = (historial_sql(tipo, *flags), params)
+    return consultas
@@ -0,0 +1,271 @@
+# lib_importar.py
+import csv
+import math
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from lib_db import get_connection, transaction, MAX_CDB_DIGITS, PRODUCT_COLUMNS
+
+# filas por transacción al importar y por lectura al exportar
+CHUNK = 5000
+# errores de fila que se guardan con detalle (el resto solo se cuenta)
+MAX_ERRORES = 1000
+
+COLUMNAS = [c.strip() for c in PRODUCT_COLUMNS.split(",")]
+# conversión de cada columna numérica opcional
+_TIPOS = {"precio": float, "cantidad": int, "margen": float, "umbral": int, "perecedero": int}
+
+class ResultadoImportacion:
+    """Resumen de una importación (o de su simulación con dry_run)."""
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.leidas = 0
+        self.nuevos = 0
+        self.actualizados = 0
+        self.total_errores = 0
+        self.errores: List[Tuple[int, str]] = []
+
+    def error(self, linea: int, mensaje: str):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((linea, mensaje))
+
+    def __str__(self):
+        modo = "Simulación: " if self.dry_run else ""
+        return (f"{modo}{self.leidas} filas, {self.nuevos} nuevos, {self.actualizados} actualizados, "
+                f"{self.total_errores} con errores")
+
+def _es_xlsx(ruta: str) -> bool:
+    return os.path.splitext(ruta)[1].lower() in (".xlsx", ".xlsm")
+
+def _openpyxl():
+    # dependencia opcional: solo hace falta para planillas de Excel
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("Para leer o escribir .xlsx hace falta instalar openpyxl") from None
+    return openpyxl
+
+def _filas_csv(ruta: str) -> Iterator[list]:
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(f, dialecto)
+
+def _filas_xlsx(ruta: str) -> Iterator[list]:
+    libro = _openpyxl().load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield ["" if v is None else v for v in fila]
+    finally:
+        libro.close()
+
+def _numero(valor, tipo):
+    if isinstance(valor, (int, float)):
+        numero = float(valor)
+    else:
+        texto = str(valor).strip()
+        # admite coma decimal ("12,50") y separador de miles con punto ("1.234,50")
+        if "," in texto:
+            texto = texto.replace(".", "").replace(",", ".")
+        numero = float(texto)
+    # float() acepta "nan" e "inf": un precio NaN se guardaría como NULL
+    if not math.isfinite(numero):
+        raise ValueError(f"no es un número finito: {valor!r}")
+    if tipo is int:
+        # "12.7" en una columna entera es un error de la planilla, no 12
+        if not numero.is_integer():
+            raise ValueError(f"no es entero: {valor!r}")
+        return int(numero)
+    return tipo(numero)
+
+def _parsear(fila: list, indices: Dict[str, int]) -> tuple:
+    valores = []
+    for col, i in indices.items():
+        valor = fila[i] if i < len(fila) else ""
+        if col == "cdb":
+            texto = str(valor).strip()
+            if isinstance(valor, float) and valor.is_integer():
+                texto = str(int(valor))
+            if not texto.isdigit() or len(texto) > MAX_CDB_DIGITS:
+                raise ValueError(f"cdb inválido: {valor!r}")
+            valores.append(int(texto))
+        elif col == "nombre":
+            texto = str(valor).strip()
+            if not texto:
+                raise ValueError("nombre vacío")
+            valores.append(texto)
+        else:
+            if valor == "" or valor is None:
+                raise ValueError(f"{col} vacío")
+            try:
+                numero = _numero(valor, _TIPOS[col])
+            except ValueError:
+                raise ValueError(f"{col} inválido: {valor!r}") from None
+            if numero < 0:
+                raise ValueError(f"{col} negativo: {valor!r}")
+            valores.append(numero)
+    return tuple(valores)
+
+def _sentencias(columnas: List[str]) -> Tuple[str, str]:
+    """INSERT para los cdb nuevos y UPDATE para los existentes.
+
+    No se usa INSERT ... ON CONFLICT: la cláusula de conflicto de la sentencia
+    externa reemplaza a los INSERT OR REPLACE de los triggers de producto.
+    """
+    resto = [c for c in columnas if c != "cdb"]
+    insert = f"INSERT INTO producto ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+    # las filas que no cambian no se escriben: no disparan triggers ni el registro de cambios
+    update = f"""UPDATE producto SET {', '.join(f'{c} = ?' for c in resto)}
+                 WHERE cdb = ? AND ({', '.join(resto)}) IS NOT ({', '.join('?' * len(resto))})"""
+    return insert, update
+
+def importar_catalogo(path: str, ruta: str, dry_run: bool = False,
+                      on_progress: Optional[Callable[[ResultadoImportacion], None]] = None) -> ResultadoImportacion:
+    """Importa productos desde un CSV o XLSX con encabezado.
+
+    El archivo se lee fila por fila y se escribe de a CHUNK filas por
+    transacción con un upsert por cdb: las columnas presentes en el archivo
+    pisan a las de la base y las ausentes no se tocan. Se requieren cdb y
+    nombre; precio, cantidad, margen, umbral y perecedero son opcionales.
+    Las filas inválidas se saltean y se informan en el resultado. Con
+    dry_run se valida y se cuentan nuevos/actualizados con lecturas, sin abrir
+    transacciones de escritura: la simulación no frena a la caja.
+    """
+    res = ResultadoImportacion(dry_run)
+    filas = _filas_xlsx(ruta) if _es_xlsx(ruta) else _filas_csv(ruta)
+    encabezado = [str(c).strip().lower() for c in next(filas, [])]
+    indices = {c: encabezado.index(c) for c in COLUMNAS if c in encabezado}
+    faltan = [c for c in ("cdb", "nombre") if c not in indices]
+    if faltan:
+        raise ValueError("Faltan columnas en el encabezado: " + ", ".join(faltan))
+    sql_insert, sql_update = _sentencias(list(indices))
+    lote: List[tuple] = []
+    conn = get_connection(path)
+    if dry_run:
+        # cdb nuevos de tandas anteriores: en la importación real la primera los
+        # inserta y las siguientes los actualizan. Es una tabla temporal, que no
+        # toma el lock de escritura de la base.
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS importacion_vistos (cdb INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.importacion_vistos")
+    else:
+        # cdb de la tanda con el nombre que tenían antes (NULL si son nuevos)
+        conn.execute("""CREATE TEMP TABLE IF NOT EXISTS importacion_tanda (
+                        cdb INTEGER PRIMARY KEY, nombre_viejo TEXT, nuevo INTEGER DEFAULT 1 )""")
+
+    def contar():
+        # simulación: lecturas en autocommit, sin el lock de escritura
+        cdbs = list({f[0] for f in lote})
+        marcas = ",".join("?" * len(cdbs))
+        existentes = {r[0] for r in conn.execute(f"SELECT cdb FROM producto WHERE cdb IN ({marcas})", cdbs)}
+        cur = conn.executemany("INSERT OR IGNORE INTO temp.importacion_vistos (cdb) VALUES (?)",
+                               [(c,) for c in cdbs if c not in existentes])
+        res.nuevos += cur.rowcount
+        res.actualizados += len(cdbs) - cur.rowcount
+
+    def escribir():
+        if dry_run:
+            contar()
+        else:
+            guardar()
+        lote.clear()
+        if on_progress:
+            on_progress(res)
+
+    def guardar():
+        with transaction(path) as cur:
+            cur.execute("DELETE FROM temp.importacion_tanda")
+            cur.executemany("INSERT OR IGNORE INTO temp.importacion_tanda (cdb) VALUES (?)", [(f[0],) for f in lote])
+            cur.execute("""UPDATE temp.importacion_tanda SET nombre_viejo = p.nombre, nuevo = 0
+                           FROM producto p WHERE p.cdb = importacion_tanda.cdb""")
+            nuevos = {r[0] for r in cur.execute("SELECT cdb FROM temp.importacion_tanda WHERE nuevo")}
+            existentes = len({f[0] for f in lote}) - len(nuevos)
+            res.nuevos += len(nuevos)
+            res.actualizados += existentes
+            # cada cdb nuevo se inserta con su primera fila; las repeticiones lo actualizan
+            inserts, updates = [], []
+            for fila in lote:
+                if fila[0] in nuevos:
+                    nuevos.discard(fila[0])
+                    inserts.append(fila)
+                else:
+                    updates.append(fila[1:] + fila[:1] + fila[1:])
+            # los triggers por fila de búsqueda y lotes quedan en pausa durante la tanda
+            cur.execute("INSERT INTO importacion_en_curso (id) VALUES (1)")
+            cur.executemany(sql_insert, inserts)
+            # el stock inicial va al lote sin fecha antes de las actualizaciones,
+            # que ajustan los lotes con sus propios triggers
+            cur.execute("""INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento)
+                           SELECT p.cdb, p.cantidad, NULL FROM temp.importacion_tanda t
+                           JOIN producto p ON p.cdb = t.cdb WHERE t.nuevo AND p.cantidad > 0""")
+            cur.executemany(sql_update, updates)
+            cur.execute("""INSERT INTO producto_fts (producto_fts, rowid, nombre)
+                           SELECT 'delete', t.cdb, t.nombre_viejo FROM temp.importacion_tanda t
+                           JOIN producto p ON p.cdb = t.cdb WHERE NOT t.nuevo AND p.nombre IS NOT t.nombre_viejo""")
+            cur.execute("""INSERT INTO producto_fts (rowid, nombre)
+                           SELECT p.cdb, p.nombre FROM temp.importacion_tanda t
+                           JOIN producto p ON p.cdb = t.cdb WHERE t.nuevo OR p.nombre IS NOT t.nombre_viejo""")
+            cur.execute("DELETE FROM importacion_en_curso")
+
+    for linea, fila in enumerate(filas, start=2):
+        if not any(str(v).strip() for v in fila):
+            continue
+        res.leidas += 1
+        try:
+            lote.append(_parsear(fila, indices))
+        except ValueError as e:
+            res.error(linea, str(e))
+        if len(lote) >= CHUNK:
+            escribir()
+    if lote:
+        escribir()
+    return res
+
+def exportar_catalogo(path: str, ruta: str, on_progress: Optional[Callable[[int], None]] = None) -> int:
+    """Escribe todo el catálogo en un CSV o XLSX y devuelve la cantidad de filas.
+
+    Se lee por el orden de la clave primaria de a CHUNK filas, así la memoria
+    no depende del tamaño del catálogo.
+    """
+    cur = get_connection(path).execute(f"SELECT {PRODUCT_COLUMNS} FROM producto ORDER BY cdb")
+    total = 0
+    if _es_xlsx(ruta):
+        libro = _openpyxl().Workbook(write_only=True)
+        hoja = libro.create_sheet("productos")
+        escribir = hoja.append
+    else:
+        archivo = open(ruta, "w", newline="", encoding="utf-8")
+        escribir = csv.writer(archivo).writerow
+    try:
+        escribir(COLUMNAS)
+        while True:
+            filas = cur.fetchmany(CHUNK)
+            if not filas:
+                break
+            for fila in filas:
+                escribir(fila)
+            total += len(filas)
+            if on_progress:
+                on_progress(total)
+        if _es_xlsx(ruta):
+            libro.save(ruta)
+    finally:
+        if not _es_xlsx(ruta):
+            archivo.close()
+    return total
+
+if __name__ == "__main__":
+    # python lib_importar.py ruta.db importar|simular|exportar archivo.csv
+    db, accion, archivo = sys.argv[1:4]
+    if accion == "exportar":
+        print(f"{exportar_catalogo(db, archivo)} productos exportados")
+    else:
+        resultado = importar_catalogo(db, archivo, dry_run=accion == "simular")
+        print(resultado)
+        for linea, mensaje in resultado.errores[:20]:
+            print(f"  línea {linea}: {mensaje}")
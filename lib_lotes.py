@@ -0,0 +1,70 @@
+# lib_lotes.py
+import datetime
+import sqlite3
+import sys
+from typing import Callable, List, Optional, Tuple
+from lib_db import get_connection, transaction
+
+# lotes vencidos que se eliminan por transacción
+PURGE_BATCH = 500
+
+def asignar_vencimiento(cur: sqlite3.Cursor, cdb: int, cantidad: int, fecha: str):
+    """Pasa `cantidad` unidades del lote sin fecha de `cdb` al lote que vence en `fecha`.
+
+    No cambia el stock del producto: solo reparte las unidades entre lotes.
+    Debe llamarse dentro de una transacción.
+    """
+    cur.execute("""UPDATE vencimientos SET cantidad = cantidad - ?
+                   WHERE cdb = ? AND fecha_vencimiento IS NULL AND cantidad >= ?""", (cantidad, cdb, cantidad))
+    if cur.rowcount == 0:
+        raise ValueError(f"No hay {cantidad} unidades sin vencimiento asignado para {cdb}")
+    cur.execute("DELETE FROM vencimientos WHERE cdb = ? AND fecha_vencimiento IS NULL AND cantidad <= 0", (cdb,))
+    cur.execute("UPDATE vencimientos SET cantidad = cantidad + ? WHERE cdb = ? AND fecha_vencimiento = ?",
+                (cantidad, cdb, fecha))
+    if cur.rowcount == 0:
+        cur.execute("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, ?)", (cdb, cantidad, fecha))
+
+def purgar_vencidos(path: str, hoy: Optional[str] = None, lote: int = PURGE_BATCH,
+                    on_progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, int]:
+    """Da de baja los lotes vencidos antes de `hoy` y descuenta su stock.
+
+    Trabaja de a `lote` lotes por transacción, tomados por el índice de fecha,
+    para no bloquear la base con miles de lotes. Como los vencidos son los
+    primeros en orden FEFO, bajar el stock del producto en la suma de sus lotes
+    vencidos hace que el trigger consuma exactamente esos lotes. Devuelve
+    (lotes, unidades) eliminados; on_progress(lotes, unidades) se llama tras
+    cada tanda.
+    """
+    hoy = hoy or datetime.date.today().isoformat()
+    total_lotes = total_unidades = 0
+    while True:
+        with transaction(path) as cur:
+            filas = cur.execute("""SELECT id, cdb, cantidad FROM vencimientos WHERE fecha_vencimiento < ?
+                                   ORDER BY fecha_vencimiento, id LIMIT ?""", (hoy, lote)).fetchall()
+            por_cdb = {}
+            for _, cdb, cant in filas:
+                por_cdb[cdb] = por_cdb.get(cdb, 0) + cant
+            cur.executemany("UPDATE producto SET cantidad = cantidad - ? WHERE cdb = ?",
+                            [(cant, cdb) for cdb, cant in por_cdb.items()])
+        total_lotes += len(filas)
+        total_unidades += sum(por_cdb.values())
+        if on_progress and filas:
+            on_progress(total_lotes, total_unidades)
+        if len(filas) < lote:
+            return total_lotes, total_unidades
+
+def verificar_lotes(path: str) -> List[Tuple[int, int, int]]:
+    """(cdb, stock, suma de lotes) de los productos cuyos lotes no suman su stock."""
+    return get_connection(path).execute("""
+        SELECT p.cdb, p.cantidad, IFNULL(SUM(v.cantidad), 0) FROM producto p
+        LEFT JOIN vencimientos v ON v.cdb = p.cdb
+        GROUP BY p.cdb HAVING MAX(p.cantidad, 0) <> IFNULL(SUM(v.cantidad), 0)""").fetchall()
+
+if __name__ == "__main__":
+    # python lib_lotes.py ruta.db : purga los lotes vencidos y verifica los lotes
+    lotes, unidades = purgar_vencidos(sys.argv[1])
+    print(f"{lotes} lotes vencidos eliminados ({unidades} unidades)")
+    errores = verificar_lotes(sys.argv[1])
+    for cdb, stock, suma in errores:
+        print(f"{cdb}: stock {stock}, lotes {suma}")
+    sys.exit(1 if errores else 0)
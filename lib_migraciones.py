@@ -0,0 +1,626 @@
+# lib_migraciones.py
+import sqlite3
+import sys
+from typing import Callable, Dict, List, Tuple
+
+# Esquema original (versión 1). Las tablas se crean tal cual las dejaba la
+# primera versión de la app; la migración 3 las lleva al esquema canónico.
+DB_INIT_SQL = """
+CREATE TABLE IF NOT EXISTS producto (
+    cdb INTEGER PRIMARY KEY,
+    nombre TEXT,
+    precio REAL DEFAULT 0,
+    cantidad INTEGER DEFAULT 0,
+    umbral INTEGER DEFAULT 0,
+    margen REAL DEFAULT 0.2,
+    perecedero INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dinero (
+    id INTEGER PRIMARY KEY,
+    total REAL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS compra ( id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT );
+CREATE TABLE IF NOT EXISTS compra_detalle ( compra INTEGER, cdb INTEGER, cantidad INTEGER, precio_compra REAL );
+CREATE TABLE IF NOT EXISTS venta ( id INTEGER PRIMARY KEY AUTOINCREMENT, fecha TEXT );
+CREATE TABLE IF NOT EXISTS venta_detalle ( venta INTEGER, cdb INTEGER, cantidad INTEGER, precio_venta REAL );
+CREATE TABLE IF NOT EXISTS vencimientos ( cdb INTEGER, cantidad INTEGER, fecha_vencimiento TEXT );
+CREATE TABLE IF NOT EXISTS configuracion ( id INTEGER PRIMARY KEY, passwd TEXT );
+"""
+
+# Índice de texto completo sobre producto.nombre (contenido externo: no duplica
+# los datos). Los triggers lo mantienen sincronizado; las actualizaciones de
+# stock no lo tocan porque solo se dispara con cambios de cdb o nombre.
+FTS_INIT_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5(
+    nombre, content='producto', content_rowid='cdb',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS producto_fts_ai AFTER INSERT ON producto BEGIN
+    INSERT INTO producto_fts (rowid, nombre) VALUES (new.cdb, new.nombre);
+END;
+CREATE TRIGGER IF NOT EXISTS producto_fts_ad AFTER DELETE ON producto BEGIN
+    INSERT INTO producto_fts (producto_fts, rowid, nombre) VALUES ('delete', old.cdb, old.nombre);
+END;
+CREATE TRIGGER IF NOT EXISTS producto_fts_au AFTER UPDATE OF cdb, nombre ON producto BEGIN
+    INSERT INTO producto_fts (producto_fts, rowid, nombre) VALUES ('delete', old.cdb, old.nombre);
+    INSERT INTO producto_fts (rowid, nombre) VALUES (new.cdb, new.nombre);
+END;
+"""
+
+# Contador de cambios del catálogo: cada alta, modificación o baja de un
+# producto le asigna el siguiente número de versión a su cdb. Al estar en la
+# base, también registra las escrituras de otros procesos.
+CATALOG_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS producto_version ( cdb INTEGER PRIMARY KEY, version INTEGER NOT NULL );
+CREATE INDEX IF NOT EXISTS producto_version_version ON producto_version (version);
+CREATE TRIGGER IF NOT EXISTS producto_version_ai AFTER INSERT ON producto BEGIN
+    INSERT OR REPLACE INTO producto_version (cdb, version)
+        VALUES (new.cdb, (SELECT IFNULL(MAX(version), 0) + 1 FROM producto_version));
+END;
+CREATE TRIGGER IF NOT EXISTS producto_version_au AFTER UPDATE ON producto BEGIN
+    INSERT OR REPLACE INTO producto_version (cdb, version)
+        VALUES (old.cdb, (SELECT IFNULL(MAX(version), 0) + 1 FROM producto_version));
+    INSERT OR REPLACE INTO producto_version (cdb, version)
+        SELECT new.cdb, (SELECT MAX(version) + 1 FROM producto_version) WHERE new.cdb <> old.cdb;
+END;
+CREATE TRIGGER IF NOT EXISTS producto_version_ad AFTER DELETE ON producto BEGIN
+    INSERT OR REPLACE INTO producto_version (cdb, version)
+        VALUES (old.cdb, (SELECT IFNULL(MAX(version), 0) + 1 FROM producto_version));
+END;
+"""
+
+# tabla: columna que identifica la fila afectada en el registro de cambios,
+# tal como las registran las migraciones 2 y 3
+_TRACKED_V2 = {
+    "producto": "cdb",
+    "venta": "id",
+    "venta_detalle": "cdb",
+    "compra": "id",
+    "compra_detalle": "cdb",
+    "vencimientos": "cdb",
+    "dinero": "id",
+}
+# tablas registradas en el esquema actual (la migración 8 cambia dinero por caja_movimiento)
+TRACKED_TABLES = {**{t: c for t, c in _TRACKED_V2.items() if t != "dinero"}, "caja_movimiento": "id"}
+
+def _change_log_sql(tablas: Dict[str, str]) -> str:
+    sql = ["CREATE TABLE IF NOT EXISTS cambios ( seq INTEGER PRIMARY KEY AUTOINCREMENT, tabla TEXT NOT NULL, clave INTEGER );"]
+    for tabla, col in tablas.items():
+        for op, fila in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            sql.append(f"""CREATE TRIGGER IF NOT EXISTS cambios_{tabla}_{op.lower()} AFTER {op} ON {tabla} BEGIN
+    INSERT INTO cambios (tabla, clave) VALUES ('{tabla}', {fila}.{col});
+END;""")
+    return "\n".join(sql)
+
+# Registro de cambios escrito por triggers (lo consume lib_eventos.ChangeBus):
+# captura también las escrituras hechas por otros procesos sobre la misma base.
+CHANGE_LOG_SQL = _change_log_sql(_TRACKED_V2)
+
+
+
+# Esquema canónico de las tablas de movimientos: con id propio, claves
+# foráneas declaradas e índices para los joins y filtros de Reportes/Alertas.
+CANONICAL_TABLES = {
+    "venta_detalle": """CREATE TABLE venta_detalle (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    venta INTEGER REFERENCES venta(id),
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
+    cantidad INTEGER NOT NULL,
+    precio_venta REAL
+)""",
+    "compra_detalle": """CREATE TABLE compra_detalle (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    compra INTEGER REFERENCES compra(id),
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
+    cantidad INTEGER NOT NULL,
+    precio_compra REAL
+)""",
+    "vencimientos": """CREATE TABLE vencimientos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
+    cantidad INTEGER NOT NULL,
+    fecha_vencimiento TEXT
+)""",
+}
+
+CONFIG_COLUMNS = (("fg", "TEXT"), ("bg", "TEXT"), ("passwd", "TEXT"), ("font_name", "TEXT"), ("font_size", "INTEGER"))
+
+INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS venta_fecha ON venta (fecha);
+CREATE INDEX IF NOT EXISTS compra_fecha ON compra (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_venta ON venta_detalle (venta);
+CREATE INDEX IF NOT EXISTS venta_detalle_cdb ON venta_detalle (cdb);
+CREATE INDEX IF NOT EXISTS compra_detalle_compra ON compra_detalle (compra);
+CREATE INDEX IF NOT EXISTS compra_detalle_cdb ON compra_detalle (cdb);
+CREATE INDEX IF NOT EXISTS vencimientos_fecha ON vencimientos (fecha_vencimiento);
+CREATE INDEX IF NOT EXISTS vencimientos_cdb ON vencimientos (cdb, fecha_vencimiento);
+CREATE INDEX IF NOT EXISTS producto_bajo_stock ON producto (cdb) WHERE cantidad <= umbral;
+"""
+
+# Resúmenes por día y producto, mantenidos por triggers en la misma
+# transacción que cada venta o compra. resumen_dia guarda los totales del día
+# para las series diarias/semanales/mensuales sin agrupar por producto.
+ROLLUP_SQL = """
+CREATE TABLE IF NOT EXISTS resumen_venta_dia (
+    dia TEXT NOT NULL,
+    cdb INTEGER NOT NULL,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    importe REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, cdb)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_compra_dia (
+    dia TEXT NOT NULL,
+    cdb INTEGER NOT NULL,
+    unidades INTEGER NOT NULL DEFAULT 0,
+    importe REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, cdb)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_dia (
+    dia TEXT PRIMARY KEY,
+    ventas INTEGER NOT NULL DEFAULT 0,
+    venta_unidades INTEGER NOT NULL DEFAULT 0,
+    venta_importe REAL NOT NULL DEFAULT 0,
+    compra_unidades INTEGER NOT NULL DEFAULT 0,
+    compra_importe REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS resumen_venta_ai AFTER INSERT ON venta BEGIN
+    INSERT INTO resumen_dia (dia, ventas) VALUES (IFNULL(substr(new.fecha, 1, 10), date('now')), 1)
+        ON CONFLICT (dia) DO UPDATE SET ventas = ventas + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS resumen_venta_detalle_ai AFTER INSERT ON venta_detalle BEGIN
+    INSERT INTO resumen_venta_dia (dia, cdb, unidades, importe)
+        VALUES (IFNULL((SELECT substr(fecha, 1, 10) FROM venta WHERE id = new.venta), date('now')),
+                new.cdb, new.cantidad, new.cantidad * IFNULL(new.precio_venta, 0))
+        ON CONFLICT (dia, cdb) DO UPDATE SET unidades = unidades + excluded.unidades, importe = importe + excluded.importe;
+    INSERT INTO resumen_dia (dia, venta_unidades, venta_importe)
+        VALUES (IFNULL((SELECT substr(fecha, 1, 10) FROM venta WHERE id = new.venta), date('now')),
+                new.cantidad, new.cantidad * IFNULL(new.precio_venta, 0))
+        ON CONFLICT (dia) DO UPDATE SET venta_unidades = venta_unidades + excluded.venta_unidades,
+                                        venta_importe = venta_importe + excluded.venta_importe;
+END;
+CREATE TRIGGER IF NOT EXISTS resumen_compra_detalle_ai AFTER INSERT ON compra_detalle BEGIN
+    INSERT INTO resumen_compra_dia (dia, cdb, unidades, importe)
+        VALUES (IFNULL((SELECT substr(fecha, 1, 10) FROM compra WHERE id = new.compra), date('now')),
+                new.cdb, new.cantidad, new.cantidad * IFNULL(new.precio_compra, 0))
+        ON CONFLICT (dia, cdb) DO UPDATE SET unidades = unidades + excluded.unidades, importe = importe + excluded.importe;
+    INSERT INTO resumen_dia (dia, compra_unidades, compra_importe)
+        VALUES (IFNULL((SELECT substr(fecha, 1, 10) FROM compra WHERE id = new.compra), date('now')),
+                new.cantidad, new.cantidad * IFNULL(new.precio_compra, 0))
+        ON CONFLICT (dia) DO UPDATE SET compra_unidades = compra_unidades + excluded.compra_unidades,
+                                        compra_importe = compra_importe + excluded.compra_importe;
+END;
+"""
+
+def rebuild_rollups_sql(sufijo: str = "") -> str:
+    """Recalcula los resúmenes desde el historial completo.
+
+    Con sufijo "_todo" lee las vistas de lib_archivo, que incluyen los
+    períodos archivados.
+    """
+    return f"""
+DELETE FROM resumen_venta_dia;
+DELETE FROM resumen_compra_dia;
+DELETE FROM resumen_dia;
+INSERT INTO resumen_venta_dia (dia, cdb, unidades, importe)
+    SELECT IFNULL(substr(v.fecha, 1, 10), date('now')), vd.cdb, SUM(vd.cantidad), SUM(vd.cantidad * IFNULL(vd.precio_venta, 0))
+    FROM venta_detalle{sufijo} vd JOIN venta{sufijo} v ON v.id = vd.venta GROUP BY 1, 2;
+INSERT INTO resumen_compra_dia (dia, cdb, unidades, importe)
+    SELECT IFNULL(substr(c.fecha, 1, 10), date('now')), cd.cdb, SUM(cd.cantidad), SUM(cd.cantidad * IFNULL(cd.precio_compra, 0))
+    FROM compra_detalle{sufijo} cd JOIN compra{sufijo} c ON c.id = cd.compra GROUP BY 1, 2;
+INSERT INTO resumen_dia (dia, ventas)
+    SELECT IFNULL(substr(fecha, 1, 10), date('now')), COUNT(*) FROM venta{sufijo} GROUP BY 1;
+INSERT INTO resumen_dia (dia, venta_unidades, venta_importe)
+    SELECT dia, SUM(unidades), SUM(importe) FROM resumen_venta_dia GROUP BY dia
+    ON CONFLICT (dia) DO UPDATE SET venta_unidades = excluded.venta_unidades, venta_importe = excluded.venta_importe;
+INSERT INTO resumen_dia (dia, compra_unidades, compra_importe)
+    SELECT dia, SUM(unidades), SUM(importe) FROM resumen_compra_dia GROUP BY dia
+    ON CONFLICT (dia) DO UPDATE SET compra_unidades = excluded.compra_unidades, compra_importe = excluded.compra_importe;
+"""
+
+REBUILD_ROLLUPS_SQL = rebuild_rollups_sql()
+
+# Historial (migración 5): cada línea de detalle guarda la fecha de su
+# cabecera, así el paginado por (fecha, id) y los filtros por producto y rango
+# de fechas se resuelven recorriendo un solo índice, sin ordenar ni hacer join.
+HISTORY_SQL = """
+CREATE INDEX IF NOT EXISTS venta_detalle_fecha ON venta_detalle (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_cdb_fecha ON venta_detalle (cdb, fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_fecha ON compra_detalle (fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_cdb_fecha ON compra_detalle (cdb, fecha);
+DROP INDEX IF EXISTS venta_detalle_cdb;
+DROP INDEX IF EXISTS compra_detalle_cdb;
+CREATE TRIGGER IF NOT EXISTS venta_detalle_fecha_ai AFTER INSERT ON venta_detalle WHEN new.fecha IS NULL BEGIN
+    UPDATE venta_detalle SET fecha = (SELECT fecha FROM venta WHERE id = new.venta) WHERE id = new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS compra_detalle_fecha_ai AFTER INSERT ON compra_detalle WHEN new.fecha IS NULL BEGIN
+    UPDATE compra_detalle SET fecha = (SELECT fecha FROM compra WHERE id = new.compra) WHERE id = new.id;
+END;
+"""
+
+# Lotes (migración 6): las filas de vencimientos son lotes y su suma por
+# producto es siempre igual a producto.cantidad. El stock sin fecha vive en un
+# lote con fecha_vencimiento NULL. Los triggers mantienen la igualdad para
+# cualquier escritura de producto.cantidad: un aumento va al lote sin fecha y
+# una baja consume los lotes en orden FEFO (primero el que vence antes, el
+# lote sin fecha al final), leyendo solo los lotes del producto por el índice
+# (cdb, fecha_vencimiento).
+LOTS_SQL = """
+CREATE TRIGGER IF NOT EXISTS lotes_producto_ai AFTER INSERT ON producto WHEN new.cantidad > 0 BEGIN
+    INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (new.cdb, new.cantidad, NULL);
+END;
+CREATE TRIGGER IF NOT EXISTS lotes_producto_ad AFTER DELETE ON producto BEGIN
+    DELETE FROM vencimientos WHERE cdb = old.cdb;
+END;
+CREATE TRIGGER IF NOT EXISTS lotes_producto_cdb AFTER UPDATE OF cdb ON producto WHEN new.cdb <> old.cdb BEGIN
+    UPDATE vencimientos SET cdb = new.cdb WHERE cdb = old.cdb;
+END;
+CREATE TRIGGER IF NOT EXISTS lotes_producto_alta AFTER UPDATE OF cantidad ON producto
+WHEN new.cantidad > old.cantidad BEGIN
+    UPDATE vencimientos SET cantidad = cantidad + (new.cantidad - old.cantidad)
+        WHERE cdb = new.cdb AND fecha_vencimiento IS NULL;
+    INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento)
+        SELECT new.cdb, new.cantidad - old.cantidad, NULL
+        WHERE NOT EXISTS (SELECT 1 FROM vencimientos WHERE cdb = new.cdb AND fecha_vencimiento IS NULL);
+END;
+CREATE TRIGGER IF NOT EXISTS lotes_producto_baja AFTER UPDATE OF cantidad ON producto
+WHEN new.cantidad < old.cantidad BEGIN
+    -- previo: unidades de los lotes que se consumen antes que este
+    UPDATE vencimientos SET cantidad = vencimientos.cantidad - MIN(vencimientos.cantidad, (old.cantidad - new.cantidad) - f.previo)
+        FROM (SELECT id, SUM(cantidad) OVER (ORDER BY fecha_vencimiento IS NULL, fecha_vencimiento, id) - cantidad AS previo
+              FROM vencimientos WHERE cdb IN (old.cdb, new.cdb)) AS f
+        WHERE vencimientos.id = f.id AND f.previo < old.cantidad - new.cantidad;
+    DELETE FROM vencimientos WHERE cdb IN (old.cdb, new.cdb) AND cantidad <= 0;
+END;
+"""
+
+# Carga masiva (migración 7): mientras importacion_en_curso tiene una fila
+# (solo dentro de la transacción de lib_importar) los triggers por fila del
+# índice de búsqueda y del lote inicial no corren; el importador hace ese
+# mantenimiento con una sentencia por tanda, varias veces más rápido.
+BULK_LOAD_SQL = """
+CREATE TABLE IF NOT EXISTS importacion_en_curso ( id INTEGER PRIMARY KEY );
+DROP TRIGGER IF EXISTS producto_fts_ai;
+CREATE TRIGGER producto_fts_ai AFTER INSERT ON producto
+WHEN NOT EXISTS (SELECT 1 FROM importacion_en_curso) BEGIN
+    INSERT INTO producto_fts (rowid, nombre) VALUES (new.cdb, new.nombre);
+END;
+DROP TRIGGER IF EXISTS producto_fts_au;
+CREATE TRIGGER producto_fts_au AFTER UPDATE OF cdb, nombre ON producto
+WHEN NOT EXISTS (SELECT 1 FROM importacion_en_curso) BEGIN
+    INSERT INTO producto_fts (producto_fts, rowid, nombre) VALUES ('delete', old.cdb, old.nombre);
+    INSERT INTO producto_fts (rowid, nombre) VALUES (new.cdb, new.nombre);
+END;
+DROP TRIGGER IF EXISTS lotes_producto_ai;
+CREATE TRIGGER lotes_producto_ai AFTER INSERT ON producto
+WHEN new.cantidad > 0 AND NOT EXISTS (SELECT 1 FROM importacion_en_curso) BEGIN
+    INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (new.cdb, new.cantidad, NULL);
+END;
+"""
+
+# movimientos entre dos fotos consecutivas del saldo de caja
+CASH_SNAPSHOT_EVERY = 500
+
+# Caja (migración 8): cada entrada o salida de dinero es una fila nueva de
+# caja_movimiento, en centavos; las filas no se modifican ni se borran. Cada
+# CASH_SNAPSHOT_EVERY movimientos un trigger guarda en caja_saldo el saldo
+# acumulado, así el saldo a cualquier altura se calcula con la última foto
+# anterior más a lo sumo esa cantidad de movimientos.
+CASH_LEDGER_SQL = f"""
+CREATE TABLE IF NOT EXISTS caja_movimiento (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL,
+    tipo TEXT NOT NULL CHECK (tipo IN ('apertura', 'venta', 'compra', 'ingreso', 'egreso', 'correccion')),
+    importe INTEGER NOT NULL,
+    referencia INTEGER,
+    nota TEXT
+);
+CREATE INDEX IF NOT EXISTS caja_movimiento_fecha ON caja_movimiento (fecha);
+CREATE TABLE IF NOT EXISTS caja_saldo (
+    movimiento INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    saldo INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS caja_movimiento_bu BEFORE UPDATE ON caja_movimiento BEGIN
+    SELECT RAISE(ABORT, 'los movimientos de caja no se modifican: registrar una corrección');
+END;
+CREATE TRIGGER IF NOT EXISTS caja_movimiento_bd BEFORE DELETE ON caja_movimiento BEGIN
+    SELECT RAISE(ABORT, 'los movimientos de caja no se borran: registrar una corrección');
+END;
+CREATE TRIGGER IF NOT EXISTS caja_saldo_ai AFTER INSERT ON caja_movimiento
+WHEN new.id >= (SELECT MAX(movimiento) FROM caja_saldo) + {CASH_SNAPSHOT_EVERY} BEGIN
+    INSERT INTO caja_saldo (movimiento, fecha, saldo)
+        SELECT new.id, new.fecha, s.saldo + (SELECT SUM(importe) FROM caja_movimiento WHERE id > s.movimiento)
+        FROM (SELECT movimiento, saldo FROM caja_saldo ORDER BY movimiento DESC LIMIT 1) AS s;
+END;
+"""
+
+# Archivo (migración 9): los años cerrados de venta, venta_detalle, compra y
+# compra_detalle se mudan a un archivo por año (lib_archivo). Esta tabla lista
+# los archivos; los resúmenes diarios quedan en la base principal.
+ARCHIVE_SQL = """
+CREATE TABLE IF NOT EXISTS archivo_periodo (
+    anio INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    ventas INTEGER NOT NULL DEFAULT 0,
+    compras INTEGER NOT NULL DEFAULT 0,
+    actualizado TEXT
+);
+"""
+
+# Análisis (migración 10): foto por producto de las ventas y compras de los
+# días cerrados de la ventana de lib_analisis, armada desde los resúmenes
+# diarios. Se rehace una vez por día; lo del día en curso se suma al leerla.
+ANALYSIS_SQL = """
+CREATE TABLE IF NOT EXISTS resumen_producto (
+    cdb INTEGER PRIMARY KEY,
+    vendidas INTEGER NOT NULL DEFAULT 0,
+    facturado REAL NOT NULL DEFAULT 0,
+    vendidas_recientes INTEGER NOT NULL DEFAULT 0,
+    compradas INTEGER NOT NULL DEFAULT 0,
+    comprado REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_producto_periodo (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    desde TEXT NOT NULL,
+    hasta TEXT NOT NULL,
+    reciente TEXT NOT NULL,
+    actualizado TEXT
+);
+"""
+
+# peso del último día en el promedio exponencial de la demanda: 2 / (28 + 1),
+# unas cuatro semanas. Cambiarlo pide rehacer velocidad_factor y velocidad_venta.
+VELOCITY_ALPHA = 0.07
+# días con factor (1-α)^días en velocidad_factor; más allá el factor es 0
+# ((1-α)^1000 ~ 1e-32, no mueve ningún promedio)
+VELOCITY_FACTOR_DAYS = 1000
+
+# (1-α)^días sin pow(): las funciones matemáticas de SQLite son opcionales en
+# la compilación y el trigger tiene que andar en cualquier conexión (la
+# consola sqlite3, scripts de respaldo), no solo en las de lib_db.
+def _factor(hasta: str, desde: str) -> str:
+    return (f"IFNULL((SELECT factor FROM velocidad_factor "
+            f"WHERE dias = CAST(julianday({hasta}) - julianday({desde}) AS INTEGER)), 0)")
+
+# Velocidad de venta (migración 11): demanda diaria de cada producto como
+# promedio exponencial (EWMA), actualizada por trigger en la misma transacción
+# que cada venta. Con x_k las unidades vendidas el día k:
+#   demanda  = α Σ (1-α)^(dia-k) x_k    demanda2 = α Σ (1-α)^(dia-k) x_k²
+# Los días sin ventas no tocan la fila: se descuentan con (1-α)^días en la
+# venta siguiente (factor tomado de velocidad_factor) o al leer. unidades_dia (lo vendido en `dia`) permite sumar
+# otra venta del mismo día a demanda2; desde (primer día con ventas) corrige
+# el arranque de los productos nuevos. Una venta con fecha anterior a `dia`
+# se suma descontada, como si fuera de otro día.
+VELOCITY_SQL = f"""
+CREATE TABLE IF NOT EXISTS velocidad_venta (
+    cdb INTEGER PRIMARY KEY,
+    dia TEXT NOT NULL,
+    unidades_dia INTEGER NOT NULL,
+    demanda REAL NOT NULL,
+    demanda2 REAL NOT NULL,
+    desde TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS velocidad_factor (
+    dias INTEGER PRIMARY KEY,
+    factor REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS velocidad_venta_ai AFTER INSERT ON venta_detalle BEGIN
+    INSERT INTO velocidad_venta (cdb, dia, unidades_dia, demanda, demanda2, desde)
+        SELECT new.cdb, d.dia, new.cantidad, {VELOCITY_ALPHA:g} * new.cantidad, {VELOCITY_ALPHA:g} * new.cantidad * new.cantidad, d.dia
+        FROM (SELECT IFNULL((SELECT substr(fecha, 1, 10) FROM venta WHERE id = new.venta), date('now')) AS dia) AS d
+        WHERE true
+        ON CONFLICT (cdb) DO UPDATE SET
+            demanda = CASE WHEN excluded.dia > dia
+                           THEN demanda * {_factor('excluded.dia', 'dia')} + excluded.demanda
+                           WHEN excluded.dia = dia THEN demanda + excluded.demanda
+                           ELSE demanda + excluded.demanda * {_factor('dia', 'excluded.dia')} END,
+            demanda2 = CASE WHEN excluded.dia > dia
+                            THEN demanda2 * {_factor('excluded.dia', 'dia')} + excluded.demanda2
+                            -- (u + q)² - u² = 2uq + q²
+                            WHEN excluded.dia = dia THEN demanda2 + {2 * VELOCITY_ALPHA:g} * unidades_dia * excluded.unidades_dia + excluded.demanda2
+                            ELSE demanda2 + excluded.demanda2 * {_factor('dia', 'excluded.dia')} END,
+            unidades_dia = CASE WHEN excluded.dia > dia THEN excluded.unidades_dia
+                                WHEN excluded.dia = dia THEN unidades_dia + excluded.unidades_dia
+                                ELSE unidades_dia END,
+            dia = MAX(dia, excluded.dia),
+            desde = MIN(desde, excluded.desde);
+END;
+"""
+
+# La velocidad desde los resúmenes diarios (que incluyen los años archivados).
+# Todas las filas quedan al último día de los resúmenes: la fila de un
+# producto puede llevarse a cualquier día posterior a su última venta
+# descontando (1-α)^días, y así alcanza con una sola agrupación.
+REBUILD_VELOCITY_SQL = f"""
+DELETE FROM velocidad_venta;
+INSERT INTO velocidad_venta (cdb, dia, unidades_dia, demanda, demanda2, desde)
+    SELECT r.cdb, u.dia, TOTAL(CASE WHEN r.dia = u.dia THEN r.unidades END),
+           {VELOCITY_ALPHA:g} * TOTAL(r.unidades * f.factor),
+           {VELOCITY_ALPHA:g} * TOTAL(r.unidades * r.unidades * f.factor),
+           MIN(r.dia)
+    FROM resumen_venta_dia r CROSS JOIN (SELECT MAX(dia) AS dia FROM resumen_venta_dia) AS u
+    LEFT JOIN velocidad_factor f ON f.dias = CAST(julianday(u.dia) - julianday(r.dia) AS INTEGER)
+    GROUP BY r.cdb;
+"""
+
+def run_script(cur: sqlite3.Cursor, sql: str):
+    """Ejecuta varias sentencias dentro de la transacción en curso.
+
+    A diferencia de executescript, no hace COMMIT antes de empezar.
+    """
+    buf = ""
+    for parte in sql.split(";"):
+        buf += parte + ";"
+        if sqlite3.complete_statement(buf):
+            if buf.strip(" \n;"):
+                cur.execute(buf)
+            buf = ""
+
+def _columns(cur: sqlite3.Cursor, tabla: str) -> List[str]:
+    return [r[1] for r in cur.execute(f"PRAGMA table_info({tabla})")]
+
+def _m1_base(cur):
+    run_script(cur, DB_INIT_SQL)
+    cur.execute("INSERT OR IGNORE INTO dinero (id, total) VALUES (1, 0)")
+    cur.execute("INSERT OR IGNORE INTO configuracion (id, passwd) VALUES (1, '')")
+
+def _m2_indices_auxiliares(cur):
+    fts_nuevo = not cur.execute("SELECT 1 FROM sqlite_master WHERE name='producto_fts'").fetchone()
+    run_script(cur, FTS_INIT_SQL)
+    if fts_nuevo:
+        # base existente: indexar los productos cargados antes de crear el índice
+        cur.execute("INSERT INTO producto_fts (producto_fts) VALUES ('rebuild')")
+    run_script(cur, CATALOG_VERSION_SQL)
+    run_script(cur, CHANGE_LOG_SQL)
+
+def _m3_esquema_canonico(cur):
+    for tabla, create in CANONICAL_TABLES.items():
+        if "id" in _columns(cur, tabla):
+            continue
+        # reconstrucción: tabla nueva, copia de datos y reemplazo
+        viejas = _columns(cur, tabla)
+        cur.execute(create.replace(f"CREATE TABLE {tabla}", f"CREATE TABLE {tabla}_nueva", 1))
+        # las filas sin cdb no se pueden conservar con las restricciones nuevas
+        valores = ", ".join("IFNULL(cantidad, 0)" if c == "cantidad" else c for c in viejas)
+        cur.execute(f"""INSERT INTO {tabla}_nueva ({', '.join(viejas)})
+                        SELECT {valores} FROM {tabla} WHERE cdb IS NOT NULL ORDER BY rowid""")
+        cur.execute(f"DROP TABLE {tabla}")
+        cur.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+    existentes = _columns(cur, "configuracion")
+    for col, tipo in CONFIG_COLUMNS:
+        if col not in existentes:
+            cur.execute(f"ALTER TABLE configuracion ADD COLUMN {col} {tipo}")
+    # los triggers de las tablas reconstruidas se borraron con ellas
+    run_script(cur, CHANGE_LOG_SQL)
+    run_script(cur, INDEXES_SQL)
+
+def _m4_resumenes(cur):
+    run_script(cur, ROLLUP_SQL)
+    run_script(cur, REBUILD_ROLLUPS_SQL)
+
+def _m5_historial(cur):
+    for tabla, cabecera in (("venta_detalle", "venta"), ("compra_detalle", "compra")):
+        if "fecha" not in _columns(cur, tabla):
+            cur.execute(f"ALTER TABLE {tabla} ADD COLUMN fecha TEXT")
+        cur.execute(f"""UPDATE {tabla} SET fecha = (SELECT fecha FROM {cabecera} WHERE id = {tabla}.{cabecera})
+                        WHERE fecha IS NULL""")
+    run_script(cur, HISTORY_SQL)
+
+def _m6_lotes(cur):
+    cur.execute("DELETE FROM vencimientos WHERE cantidad <= 0 OR cdb NOT IN (SELECT cdb FROM producto)")
+    # lotes cargados a mano que no coinciden con el stock: el faltante pasa a un
+    # lote sin fecha y el sobrante se descuenta en orden FEFO
+    diferencias = cur.execute("""SELECT p.cdb, MAX(p.cantidad, 0) - IFNULL(SUM(v.cantidad), 0)
+                                 FROM producto p LEFT JOIN vencimientos v ON v.cdb = p.cdb
+                                 GROUP BY p.cdb HAVING MAX(p.cantidad, 0) <> IFNULL(SUM(v.cantidad), 0)""").fetchall()
+    for cdb, diff in diferencias:
+        if diff > 0:
+            cur.execute("INSERT INTO vencimientos (cdb, cantidad, fecha_vencimiento) VALUES (?, ?, NULL)", (cdb, diff))
+            continue
+        sobra = -diff
+        lotes = cur.execute("""SELECT id, cantidad FROM vencimientos WHERE cdb = ?
+                               ORDER BY fecha_vencimiento IS NULL, fecha_vencimiento, id""", (cdb,)).fetchall()
+        for lid, cant in lotes:
+            if sobra <= 0:
+                break
+            usado = min(cant, sobra)
+            cur.execute("UPDATE vencimientos SET cantidad = cantidad - ? WHERE id = ?", (usado, lid))
+            sobra -= usado
+    cur.execute("DELETE FROM vencimientos WHERE cantidad <= 0")
+    run_script(cur, LOTS_SQL)
+
+def _m7_carga_masiva(cur):
+    run_script(cur, BULK_LOAD_SQL)
+
+def _m8_caja(cur):
+    run_script(cur, CASH_LEDGER_SQL)
+    cur.execute("INSERT OR IGNORE INTO caja_saldo (movimiento, fecha, saldo) VALUES (0, datetime('now', 'localtime'), 0)")
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='dinero'").fetchone():
+        # el total de la fila única pasa a ser el movimiento de apertura
+        cur.execute("""INSERT INTO caja_movimiento (fecha, tipo, importe, nota)
+                       SELECT strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), 'apertura', CAST(round(total * 100) AS INTEGER),
+                              'saldo anterior'
+                       FROM dinero WHERE id = 1 AND round(total * 100) <> 0""")
+        cur.execute("DROP TABLE dinero")
+    run_script(cur, _change_log_sql({"caja_movimiento": TRACKED_TABLES["caja_movimiento"]}))
+
+def _m9_archivo(cur):
+    run_script(cur, ARCHIVE_SQL)
+
+def _m10_analisis(cur):
+    run_script(cur, ANALYSIS_SQL)
+
+def _m11_velocidad(cur):
+    run_script(cur, VELOCITY_SQL)
+    cur.execute("DELETE FROM velocidad_factor")
+    cur.executemany("INSERT INTO velocidad_factor (dias, factor) VALUES (?, ?)",
+                    [(n, (1 - VELOCITY_ALPHA) ** n) for n in range(VELOCITY_FACTOR_DAYS + 1)])
+    run_script(cur, REBUILD_VELOCITY_SQL)
+
+# (versión, descripción, función). Cada migración corre en su propia
+# transacción junto con la actualización de PRAGMA user_version.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "esquema base", _m1_base),
+    (2, "búsqueda, versión de catálogo y registro de cambios", _m2_indices_auxiliares),
+    (3, "esquema canónico con ids e índices", _m3_esquema_canonico),
+    (4, "resúmenes diarios de ventas y compras", _m4_resumenes),
+    (5, "fecha en los detalles para el historial paginado", _m5_historial),
+    (6, "lotes con vencimiento que suman el stock", _m6_lotes),
+    (7, "importación masiva del catálogo", _m7_carga_masiva),
+    (8, "libro de caja con fotos del saldo", _m8_caja),
+    (9, "archivo de años cerrados en bases aparte", _m9_archivo),
+    (10, "foto por producto para el análisis de inventario", _m10_analisis),
+    (11, "velocidad de venta por producto", _m11_velocidad),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Lleva la base a SCHEMA_VERSION. Devuelve la versión anterior."""
+    actual = conn.execute("PRAGMA user_version").fetchone()[0]
+    if actual >= SCHEMA_VERSION:
+        return actual
+    cur = conn.cursor()
+    for version, _, fn in MIGRATIONS:
+        if version <= actual:
+            continue
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            # otra terminal pudo aplicarla mientras esperábamos el lock: se vuelve
+            # a leer la versión dentro de la transacción
+            if cur.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            fn(cur)
+            cur.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    return actual
+
+def check_query_plans(conn: sqlite3.Connection, queries: Dict[str, Tuple[str, tuple]]) -> List[Tuple[str, str]]:
+    """Devuelve (consulta, paso) por cada recorrido completo de tabla sin índice.
+
+    Se considera problema todo paso "SCAN <tabla>" que no use un índice; los
+    recorridos de índices parciales o de cobertura son válidos.
+    """
+    problemas = []
+    for nombre, (sql, params) in queries.items():
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detalle = row[-1]
+            if detalle.startswith("SCAN") and "USING" not in detalle:
+                problemas.append((nombre, detalle))
+    return problemas
+
+if __name__ == "__main__":
+    # python lib_migraciones.py ruta.db : migra la base y verifica los planes
+    from lib_db import get_connection, QUERIES
+    from lib_historial import plan_queries
+    conn = get_connection(sys.argv[1])
+    antes = migrate(conn)
+    print(f"versión {antes} -> {SCHEMA_VERSION}")
+    problemas = check_query_plans(conn, {**QUERIES, **plan_queries()})
+    for nombre, detalle in problemas:
+        print(f"SIN ÍNDICE  {nombre}: {detalle}")
+    sys.exit(1 if problemas else 0)
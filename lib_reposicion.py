@@ -0,0 +1,79 @@
+# lib_reposicion.py
+# Sugerencias de compra a partir de la velocidad de venta (velocidad_venta,
+# que un trigger actualiza en cada venta). Con la demanda diaria d y su
+# desvío s, para cada producto:
+#   punto de pedido = d * DIAS_ENTREGA + Z_SERVICIO * s * raíz(DIAS_ENTREGA)
+#   objetivo        = lo mismo para DIAS_ENTREGA + DIAS_COBERTURA
+# Se sugiere comprar lo que falta para el objetivo cuando el stock llega al
+# punto de pedido. El umbral cargado a mano queda como punto de pedido mínimo.
+import datetime
+import math
+import sys
+from typing import List, Optional, Tuple
+from lib_db import get_connection, init_db
+from lib_migraciones import VELOCITY_ALPHA
+
+# días desde que se pide hasta que llega la mercadería
+DIAS_ENTREGA = 7
+# días que debe cubrir cada compra, hasta la siguiente
+DIAS_COBERTURA = 14
+# desvíos de stock de seguridad: 1.65 ~ 95 % de los pedidos sin faltante
+Z_SERVICIO = 1.65
+# líneas que se proponen como máximo, las más urgentes primero
+MAX_SUGERENCIAS = 200
+
+# Demanda diaria (media y desvío) de cada producto al día :hoy: los días sin
+# ventas desde el último se descuentan y los productos con pocos días de
+# historia se corrigen por el peso que todavía no juntaron. MATERIALIZED evita
+# que SQLite copie esas expresiones en cada uso de punto y objetivo. Los
+# productos sin ventas entran solo por el umbral.
+_SUGERENCIAS_SQL = """
+WITH f AS MATERIALIZED (
+    SELECT cdb, demanda, demanda2,
+           pow(:q, MAX(julianday(:hoy) - julianday(dia), 0))
+               / (1 - pow(:q, MAX(julianday(:hoy) - julianday(desde) + 1, 1))) AS f
+    FROM velocidad_venta
+), e AS MATERIALIZED (
+    SELECT cdb, demanda * f AS media, sqrt(MAX(demanda2 * f - demanda * f * demanda * f, 0)) AS desvio FROM f
+), r AS (
+    SELECT p.cdb, p.nombre, IFNULL(p.cantidad, 0) AS cantidad, IFNULL(p.precio, 0) AS precio, e.media,
+           MAX(IFNULL(p.umbral, 0), e.media * :entrega + :z * e.desvio * sqrt(:entrega)) AS punto,
+           e.media * (:entrega + :cobertura) + :z * e.desvio * sqrt(:entrega + :cobertura) AS objetivo
+    FROM e JOIN producto p ON p.cdb = e.cdb
+)
+SELECT cdb, nombre, cantidad, precio, media, punto, MAX(objetivo, punto + media * :cobertura) FROM r
+WHERE cantidad <= punto
+UNION ALL
+SELECT p.cdb, p.nombre, IFNULL(p.cantidad, 0), IFNULL(p.precio, 0), 0.0, p.umbral, p.umbral FROM producto p
+WHERE p.umbral > 0 AND IFNULL(p.cantidad, 0) <= p.umbral
+  AND NOT EXISTS (SELECT 1 FROM velocidad_venta v WHERE v.cdb = p.cdb)
+"""
+
+def sugerencias(path: str, hoy: Optional[datetime.date] = None, entrega: int = DIAS_ENTREGA,
+                cobertura: int = DIAS_COBERTURA, z: float = Z_SERVICIO,
+                limite: Optional[int] = MAX_SUGERENCIAS) -> List[Tuple]:
+    """(cdb, nombre, stock, costo, demanda diaria, punto de pedido, cantidad a comprar).
+
+    Recorre el catálogo completo en una consulta (una fila de velocidad_venta
+    por producto, sin leer el detalle de ventas). Ordenadas por días de stock
+    que quedan, los que se agotan antes primero; los que no venden van al
+    final.
+    """
+    hoy = hoy or datetime.date.today()
+    filas = get_connection(path).execute(_SUGERENCIAS_SQL, {
+        "q": 1 - VELOCITY_ALPHA, "hoy": hoy.isoformat(), "entrega": entrega, "cobertura": cobertura, "z": z,
+    }).fetchall()
+    resultado = []
+    for cdb, nombre, cantidad, precio, media, punto, objetivo in filas:
+        pedir = math.ceil(objetivo - max(cantidad, 0) - 1e-9)
+        if pedir > 0:
+            resultado.append((cdb, nombre, cantidad, precio, media, punto, pedir))
+    resultado.sort(key=lambda s: (s[4] <= 0, s[2] / s[4] if s[4] > 0 else 0, s[0]))
+    return resultado[:limite] if limite else resultado
+
+if __name__ == "__main__":
+    # python lib_reposicion.py ruta.db [límite]
+    init_db(sys.argv[1])
+    for cdb, nombre, cantidad, precio, media, punto, pedir in sugerencias(
+            sys.argv[1], limite=int(sys.argv[2]) if len(sys.argv) > 2 else MAX_SUGERENCIAS):
+        print(f"{cdb:>14}  {(nombre or '')[:40]:<40} stock {cantidad:>6}  {media:8.2f}/día  punto {punto:8.1f}  pedir {pedir:>6}")
@@ -0,0 +1,75 @@
+# lib_resumenes.py
+import datetime
+import sys
+from typing import List, Optional, Tuple
+from lib_db import get_connection, transaction
+from lib_migraciones import rebuild_rollups_sql, run_script, REBUILD_VELOCITY_SQL
+from lib_archivo import adjuntar
+
+# expresión de agrupamiento sobre la columna `dia` (YYYY-MM-DD)
+PERIODOS = {
+    "dia": "dia",
+    "semana": "strftime('%Y-S%W', dia)",
+    "mes": "substr(dia, 1, 7)",
+}
+# cantidad de períodos que se muestran por defecto
+PERIODOS_DEFAULT = {"dia": 30, "semana": 12, "mes": 12}
+
+def rango_default(periodo: str, hoy: Optional[datetime.date] = None) -> Tuple[str, str]:
+    hoy = hoy or datetime.date.today()
+    n = PERIODOS_DEFAULT[periodo]
+    if periodo == "dia":
+        desde = hoy - datetime.timedelta(days=n - 1)
+    elif periodo == "semana":
+        desde = hoy - datetime.timedelta(days=hoy.weekday() + 7 * (n - 1))
+    else:
+        mes = hoy.year * 12 + hoy.month - 1 - (n - 1)
+        desde = datetime.date(mes // 12, mes % 12 + 1, 1)
+    return desde.isoformat(), hoy.isoformat()
+
+def totales(path: str, periodo: str = "dia", desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Tuple]:
+    """(período, ventas, unidades vendidas, importe vendido, unidades compradas, importe comprado).
+
+    Lee resumen_dia: el costo depende de la cantidad de días del rango, no
+    del tamaño del historial.
+    """
+    if desde is None or hasta is None:
+        desde, hasta = rango_default(periodo)
+    grupo = PERIODOS[periodo]
+    return get_connection(path).execute(f"""
+        SELECT {grupo}, SUM(ventas), SUM(venta_unidades), SUM(venta_importe), SUM(compra_unidades), SUM(compra_importe)
+        FROM resumen_dia WHERE dia BETWEEN ? AND ?
+        GROUP BY 1 ORDER BY 1 DESC""", (desde, hasta)).fetchall()
+
+def top_productos(path: str, desde: str, hasta: str, n: int = 20) -> List[Tuple]:
+    """(cdb, nombre, unidades, importe, margen) de los n productos con más facturación en el rango.
+
+    El margen se estima con el costo promedio de las compras del mismo rango
+    (o el precio de lista si no hubo compras).
+    """
+    return get_connection(path).execute("""
+        WITH v AS (
+            SELECT cdb, SUM(unidades) AS unidades, SUM(importe) AS importe
+            FROM resumen_venta_dia WHERE dia BETWEEN ? AND ? GROUP BY cdb
+            ORDER BY importe DESC LIMIT ?
+        )
+        SELECT v.cdb, p.nombre, v.unidades, v.importe,
+               v.importe - v.unidades * IFNULL(
+                   (SELECT SUM(c.importe) / SUM(c.unidades) FROM resumen_compra_dia c
+                    WHERE c.cdb = v.cdb AND c.dia BETWEEN ? AND ?), p.precio)
+        FROM v LEFT JOIN producto p ON p.cdb = v.cdb
+        ORDER BY v.importe DESC""", (desde, hasta, n, desde, hasta)).fetchall()
+
+def reconstruir_resumenes(path: str):
+    """Recalcula todos los resúmenes (y la velocidad de venta) a partir de las tablas de detalle, archivos incluidos."""
+    adjuntar(get_connection(path), path)
+    with transaction(path) as cur:
+        run_script(cur, rebuild_rollups_sql("_todo"))
+        run_script(cur, REBUILD_VELOCITY_SQL)
+        # la foto del análisis sale de los resúmenes: se rehace la próxima vez
+        cur.execute("DELETE FROM resumen_producto_periodo")
+
+if __name__ == "__main__":
+    # python lib_resumenes.py ruta.db : reconstruye los resúmenes
+    reconstruir_resumenes(sys.argv[1])
+    print("Resúmenes reconstruidos")
@@ -0,0 +1,181 @@
+# lib_servicio.py
+# Operaciones del negocio sin interfaz gráfica, usadas por los frames de Tk y
+# por lib_servidor. Reciben y devuelven tipos simples (dict, list, str, números)
+# que pasan directo a JSON. Las escrituras devuelven además "cambios":
+# {tabla: claves o None}, que los frames publican en el ChangeBus.
+import datetime
+import math
+from typing import Callable, Dict, Iterable, List, Optional
+from lib_db import transaction, get_connection, catalog, search_products, QUERIES, PRODUCT_COLUMNS
+from lib_ventas import registrar_venta, StockInsuficiente
+from lib_compras import registrar_compra
+from lib_lotes import asignar_vencimiento
+from lib_caja import saldo, movimiento_manual, corregir_saldo, cierre, formato
+from lib_alertas import HORIZONTE_DIAS
+from lib_reposicion import sugerencias, MAX_SUGERENCIAS
+from lib_resumenes import totales, top_productos
+from lib_historial import pagina, cursor_de, PAGE_SIZE
+
+CAMPOS_PRODUCTO = [c.strip() for c in PRODUCT_COLUMNS.split(",")]
+# operaciones por pedido en los endpoints por lote
+MAX_LOTE = 500
+
+Cambios = Dict[str, Optional[List[int]]]
+
+def _producto(fila) -> dict:
+    return dict(zip(CAMPOS_PRODUCTO, fila))
+
+def _cdbs(items: Iterable[dict]) -> List[int]:
+    return sorted({int(it['cdb']) for it in items})
+
+# --- productos ---
+
+def productos(path: str, cdbs: Iterable[int]) -> List[Optional[dict]]:
+    """Productos en el mismo orden que `cdbs` (None si no existe), desde el catálogo en memoria."""
+    return [None if fila is None else _producto(fila) for fila in catalog(path).get_many([int(c) for c in cdbs])]
+
+def buscar(path: str, texto: str, limite: int = 50) -> List[dict]:
+    return [_producto(fila) for fila in search_products(path, texto, limite)]
+
+def guardar_producto(path: str, datos: dict, cantidad_original: Optional[int] = None) -> dict:
+    """Alta (cantidad_original None) o modificación de un producto.
+
+    En la modificación el stock se ajusta por la diferencia con
+    `cantidad_original`, el valor que vio quien editó: las ventas de otras
+    terminales mientras tanto se conservan.
+    """
+    cdb = int(datos["cdb"])
+    valores = (str(datos["nombre"]).strip(), float(datos.get("precio") or 0), int(datos.get("umbral") or 0),
+               float(datos.get("margen") if datos.get("margen") not in (None, "") else 0.2),
+               1 if datos.get("perecedero") else 0)
+    cantidad = int(datos.get("cantidad") or 0)
+    with transaction(path) as cur:
+        if cantidad_original is None:
+            cur.execute("""INSERT INTO producto (cdb, nombre, precio, umbral, margen, perecedero, cantidad)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""", (cdb, *valores, cantidad))
+        else:
+            cur.execute("""UPDATE producto SET nombre=?, precio=?, umbral=?, margen=?, perecedero=?,
+                           cantidad = MAX(cantidad + ?, 0) WHERE cdb=?""",
+                        (*valores, cantidad - cantidad_original, cdb))
+            if cur.rowcount != 1:
+                raise ValueError(f"Producto inexistente: {cdb}")
+    return {"cdb": cdb, "cambios": {"producto": [cdb], "vencimientos": [cdb]}}
+
+def borrar_producto(path: str, cdb: int) -> dict:
+    with transaction(path) as cur:
+        cur.execute("DELETE FROM producto WHERE cdb=?", (int(cdb),))
+    return {"cdb": int(cdb), "cambios": {"producto": [int(cdb)], "vencimientos": [int(cdb)]}}
+
+def asignar_lote(path: str, cdb: int, cantidad: int, fecha: str) -> dict:
+    """Pasa `cantidad` unidades del stock sin fecha a un lote que vence en `fecha` (YYYY-MM-DD)."""
+    fecha = datetime.date.fromisoformat(str(fecha).strip()).isoformat()
+    with transaction(path) as cur:
+        asignar_vencimiento(cur, int(cdb), int(cantidad), fecha)
+    return {"cdb": int(cdb), "cambios": {"producto": [int(cdb)], "vencimientos": [int(cdb)]}}
+
+# --- ventas y compras ---
+
+def validar_items(items) -> List[dict]:
+    """Verifica un carrito antes de escribir: lista no vacía de líneas con
+    "cantidad" entera y positiva y "precio" no negativo. ValueError si no."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("Se espera una lista de productos no vacía")
+    for n, it in enumerate(items, 1):
+        if not isinstance(it, dict):
+            raise ValueError(f"Línea {n}: se espera un objeto")
+        cant, precio = it.get('cantidad'), it.get('precio')
+        if isinstance(cant, bool) or not isinstance(cant, int) or cant <= 0:
+            raise ValueError(f"Línea {n}: cantidad inválida {cant!r}")
+        if isinstance(precio, bool) or not isinstance(precio, (int, float)) or not 0 <= precio < math.inf:
+            raise ValueError(f"Línea {n}: precio inválido {precio!r}")
+    return items
+
+def vender(path: str, items: List[dict]) -> dict:
+    vid = registrar_venta(path, validar_items(items))
+    cdbs = _cdbs(items)
+    # la venta consume lotes en orden FEFO
+    return {"id": vid, "cambios": {"producto": cdbs, "venta": [vid], "venta_detalle": cdbs,
+                                   "vencimientos": cdbs, "caja_movimiento": None}}
+
+def comprar(path: str, items: List[dict]) -> dict:
+    cid = registrar_compra(path, validar_items(items))
+    cdbs = _cdbs(items)
+    # el stock comprado entra a los lotes del producto
+    return {"id": cid, "cambios": {"producto": cdbs, "compra": [cid], "compra_detalle": cdbs,
+                                   "vencimientos": cdbs, "caja_movimiento": None}}
+
+def en_lote(fn: Callable[[str, List[dict]], dict], path: str, pedidos: List[List[dict]]) -> List[dict]:
+    """Aplica `fn` a cada carrito dentro de una sola transacción.
+
+    Cada carrito corre en su propio SAVEPOINT: uno rechazado se deshace sin
+    afectar a los demás y su resultado es {"error": ...} (con "nombres" si
+    faltó stock). Todo el lote se confirma con un único commit.
+    """
+    if len(pedidos) > MAX_LOTE:
+        raise ValueError(f"Como máximo {MAX_LOTE} operaciones por lote")
+    resultados = []
+    with transaction(path) as cur:
+        for items in pedidos:
+            cur.execute("SAVEPOINT pedido")
+            try:
+                resultados.append(fn(path, items))
+            except StockInsuficiente as e:
+                cur.execute("ROLLBACK TO pedido")
+                resultados.append({"error": str(e), "nombres": e.nombres})
+            except (ValueError, KeyError, TypeError) as e:
+                cur.execute("ROLLBACK TO pedido")
+                resultados.append({"error": str(e)})
+            cur.execute("RELEASE pedido")
+    return resultados
+
+# --- caja ---
+
+def estado_caja(path: str) -> dict:
+    centavos = saldo(path)
+    return {"saldo": centavos, "texto": formato(centavos)}
+
+def movimiento_caja(path: str, tipo: str, monto, nota: Optional[str] = None) -> dict:
+    mid = movimiento_manual(path, tipo, monto, nota)
+    return {"id": mid, "cambios": {"caja_movimiento": [mid]}}
+
+def corregir_caja(path: str, contado, nota: Optional[str] = None) -> dict:
+    diferencia = corregir_saldo(path, contado, nota)
+    return {"diferencia": diferencia, "cambios": {"caja_movimiento": None}}
+
+def cierre_caja(path: str, desde: str, hasta: str) -> dict:
+    c = cierre(path, desde, hasta)
+    return {"desde": c.desde, "hasta": c.hasta, "saldo_inicial": c.saldo_inicial, "saldo_final": c.saldo_final,
+            "neto": c.neto, "por_tipo": {t: {"movimientos": n, "importe": i} for t, (n, i) in c.por_tipo.items()},
+            "texto": str(c)}
+
+# --- alertas y reportes ---
+
+def alertas(path: str, horizonte: int = HORIZONTE_DIAS) -> dict:
+    conn = get_connection(path)
+    bajo = conn.execute(QUERIES["alertas_bajo_stock"][0]).fetchall()
+    venc = conn.execute(QUERIES["alertas_vencimientos"][0], (f"+{int(horizonte)} days",)).fetchall()
+    return {"bajo_stock": [dict(zip(("cdb", "nombre", "cantidad", "umbral"), f)) for f in bajo],
+            "vencimientos": [dict(zip(("id", "cdb", "nombre", "cantidad", "fecha_vencimiento"), f)) for f in venc]}
+
+def sugerir_compra(path: str, limite: int = MAX_SUGERENCIAS) -> List[dict]:
+    """Líneas de compra sugeridas por lib_reposicion, con "precio" y "cantidad" como las de comprar()."""
+    campos = ("cdb", "nombre", "stock", "precio", "demanda", "punto", "cantidad")
+    return [dict(zip(campos, f)) for f in sugerencias(path, limite=limite)]
+
+def reporte_totales(path: str, periodo: str = "dia", desde: Optional[str] = None,
+                    hasta: Optional[str] = None) -> List[dict]:
+    campos = ("periodo", "ventas", "venta_unidades", "venta_importe", "compra_unidades", "compra_importe")
+    return [dict(zip(campos, f)) for f in totales(path, periodo, desde, hasta)]
+
+def reporte_top(path: str, desde: str, hasta: str, n: int = 20) -> List[dict]:
+    campos = ("cdb", "nombre", "unidades", "importe", "margen")
+    return [dict(zip(campos, f)) for f in top_productos(path, desde, hasta, int(n))]
+
+def historial(path: str, tipo: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+              cdb: Optional[int] = None, despues: Optional[List] = None, limite: int = PAGE_SIZE) -> dict:
+    """Una página del historial; "siguiente" es el `despues` de la página que sigue (None si no hay más)."""
+    filas = pagina(path, tipo, desde, hasta, None if cdb is None else int(cdb),
+                   None if despues is None else tuple(despues), min(int(limite), PAGE_SIZE))
+    campos = ("id", "comprobante", "fecha", "cdb", "cantidad", "precio")
+    return {"filas": [dict(zip(campos, f)) for f in filas],
+            "siguiente": list(cursor_de(filas)) if len(filas) == min(int(limite), PAGE_SIZE) else None}
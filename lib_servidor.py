@@ -0,0 +1,229 @@
+# lib_servidor.py
+# Servidor HTTP/JSON local sobre lib_servicio, para lectores de mano y otras
+# cajas que comparten la misma base. Solo biblioteca estándar: asyncio para
+# las conexiones (HTTP/1.1 con keep-alive) y un pool de hilos para SQLite,
+# cada hilo con su conexión del pool de lib_db.
+import asyncio
+import json
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+import lib_servicio as servicio
+from lib_db import init_db, close_all_connections
+from lib_ventas import StockInsuficiente
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+WORKERS = 4
+MAX_CUERPO = 8 * 1024 * 1024
+MAX_ENCABEZADOS = 100
+
+RAZONES = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class ErrorHttp(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+def _entero(q: dict, nombre: str, defecto=None):
+    valor = q.get(nombre)
+    return defecto if valor in (None, "") else int(valor)
+
+def _cdbs(texto: str):
+    return [int(c) for c in texto.split(",") if c.strip()]
+
+# (método, ruta) -> handler(db, query, cuerpo). Corren en los hilos de trabajo.
+RUTAS: Dict[Tuple[str, str], Callable[[str, dict, dict], object]] = {
+    ("GET", "/productos"): lambda db, q, c: servicio.productos(db, _cdbs(q.get("cdb", ""))),
+    ("POST", "/productos/lote"): lambda db, q, c: servicio.productos(db, c["cdbs"][:servicio.MAX_LOTE]),
+    ("GET", "/productos/buscar"): lambda db, q, c: servicio.buscar(db, q.get("q", ""), min(_entero(q, "limite", 50), 500)),
+    ("POST", "/productos"): lambda db, q, c: servicio.guardar_producto(db, c["producto"], c.get("cantidad_original")),
+    ("POST", "/ventas"): lambda db, q, c: servicio.vender(db, c["items"]),
+    ("POST", "/ventas/lote"): lambda db, q, c: servicio.en_lote(servicio.vender, db, c["ventas"]),
+    ("POST", "/compras"): lambda db, q, c: servicio.comprar(db, c["items"]),
+    ("POST", "/compras/lote"): lambda db, q, c: servicio.en_lote(servicio.comprar, db, c["compras"]),
+    ("GET", "/compras/sugerencia"): lambda db, q, c: servicio.sugerir_compra(
+        db, min(_entero(q, "limite", servicio.MAX_SUGERENCIAS), 1000)),
+    ("GET", "/alertas"): lambda db, q, c: servicio.alertas(db, _entero(q, "horizonte", servicio.HORIZONTE_DIAS)),
+    ("GET", "/reportes/totales"): lambda db, q, c: servicio.reporte_totales(db, q.get("periodo", "dia"),
+                                                                             q.get("desde"), q.get("hasta")),
+    ("GET", "/reportes/top"): lambda db, q, c: servicio.reporte_top(db, q["desde"], q["hasta"], _entero(q, "n", 20)),
+    ("GET", "/reportes/historial"): lambda db, q, c: servicio.historial(
+        db, q.get("tipo", "ventas"), q.get("desde"), q.get("hasta"), _entero(q, "cdb"),
+        [q["fecha"], int(q["id"])] if "fecha" in q and "id" in q else None, _entero(q, "limite", servicio.PAGE_SIZE)),
+    ("GET", "/caja"): lambda db, q, c: servicio.estado_caja(db),
+    ("GET", "/caja/cierre"): lambda db, q, c: servicio.cierre_caja(db, q["desde"], q["hasta"]),
+    ("POST", "/caja/movimientos"): lambda db, q, c: servicio.movimiento_caja(db, c["tipo"], c["monto"], c.get("nota")),
+    ("POST", "/caja/correccion"): lambda db, q, c: servicio.corregir_caja(db, c["contado"], c.get("nota")),
+}
+
+# rutas que escriben: van a un único hilo escritor. SQLite admite un solo
+# escritor a la vez, así las escrituras esperan en la cola del hilo y no
+# ocupan a los lectores esperando el lock.
+ESCRITURAS = {("POST", "/productos"), ("POST", "/ventas"), ("POST", "/ventas/lote"), ("POST", "/compras"),
+              ("POST", "/compras/lote"), ("POST", "/caja/movimientos"), ("POST", "/caja/correccion")}
+
+# validación previa de las escrituras con carritos: corre en el hilo del
+# pedido, así un cuerpo inválido se contesta con 400 sin pasar por el escritor
+VALIDACIONES: Dict[Tuple[str, str], Callable[[dict], object]] = {
+    ("POST", "/ventas"): lambda c: servicio.validar_items(c["items"]),
+    ("POST", "/compras"): lambda c: servicio.validar_items(c["items"]),
+    ("POST", "/ventas/lote"): lambda c: _validar_lote(c["ventas"]),
+    ("POST", "/compras/lote"): lambda c: _validar_lote(c["compras"]),
+}
+
+def _validar_lote(pedidos) -> None:
+    if not isinstance(pedidos, list):
+        raise ValueError("Se espera una lista de pedidos")
+    for n, items in enumerate(pedidos, 1):
+        try:
+            servicio.validar_items(items)
+        except ValueError as e:
+            raise ValueError(f"Pedido {n}: {e}") from None
+
+class Servidor:
+    """Atiende pedidos HTTP/JSON en `host:puerto` sobre la base `db`.
+
+    Las respuestas son {"ok": true, "datos": ...} o {"ok": false, "error": ...}
+    con el estado HTTP correspondiente (400 datos inválidos, 409 falta de
+    stock o conflicto con la base).
+    """
+
+    def __init__(self, db: str, host: str = HOST, puerto: int = PUERTO, workers: int = WORKERS):
+        self.db = db
+        self.host = host
+        self.puerto = puerto
+        self._lectores = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-escritor")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.pedidos = 0
+
+    async def start(self):
+        init_db(self.db)
+        self._server = await asyncio.start_server(self._atender, self.host, self.puerto)
+        # con puerto 0 el sistema elige uno libre
+        self.puerto = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self, wait: bool = False):
+        if self._server is not None:
+            self._server.close()
+        self._lectores.shutdown(wait=wait, cancel_futures=True)
+        self._escritor.shutdown(wait=wait, cancel_futures=True)
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                pedido = await self._leer(reader)
+                if pedido is None:
+                    break
+                metodo, destino, headers, cuerpo, seguir = pedido
+                estado, datos = await self._despachar(metodo, destino, cuerpo)
+                self._responder(writer, estado, datos, seguir)
+                await writer.drain()
+                if not seguir:
+                    break
+        except ErrorHttp as e:
+            self._responder(writer, e.estado, {"ok": False, "error": str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _leer(self, reader: asyncio.StreamReader):
+        linea = await reader.readline()
+        if not linea:
+            return None
+        try:
+            metodo, destino, version = linea.decode("latin-1").split()
+        except ValueError:
+            raise ErrorHttp(400, "línea de pedido inválida") from None
+        headers = {}
+        for _ in range(MAX_ENCABEZADOS):
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = h.decode("latin-1").partition(":")
+            headers[nombre.strip().lower()] = valor.strip()
+        else:
+            raise ErrorHttp(400, "demasiados encabezados")
+        try:
+            largo = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise ErrorHttp(400, "Content-Length inválido") from None
+        if largo < 0:
+            raise ErrorHttp(400, "Content-Length inválido")
+        if largo > MAX_CUERPO:
+            raise ErrorHttp(413, "cuerpo demasiado grande")
+        cuerpo = await reader.readexactly(largo) if largo else b""
+        conexion = headers.get("connection", "").lower()
+        seguir = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+        return metodo.upper(), destino, headers, cuerpo, seguir
+
+    async def _despachar(self, metodo: str, destino: str, cuerpo: bytes) -> Tuple[int, dict]:
+        self.pedidos += 1
+        url = urlsplit(destino)
+        ruta = url.path.rstrip("/") or "/"
+        handler = RUTAS.get((metodo, ruta))
+        if handler is None:
+            existe = any(r == ruta for _, r in RUTAS)
+            return (405 if existe else 404), {"ok": False, "error": f"{metodo} {ruta} no existe"}
+        try:
+            query = dict(parse_qsl(url.query))
+            datos = json.loads(cuerpo) if cuerpo else {}
+            validar = VALIDACIONES.get((metodo, ruta))
+            if validar:
+                validar(datos)
+            pool = self._escritor if (metodo, ruta) in ESCRITURAS else self._lectores
+            res = await asyncio.get_running_loop().run_in_executor(pool, handler, self.db, query, datos)
+            return 200, {"ok": True, "datos": res}
+        except StockInsuficiente as e:
+            return 409, {"ok": False, "error": str(e), "nombres": e.nombres}
+        except sqlite3.IntegrityError as e:
+            return 409, {"ok": False, "error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            # json.JSONDecodeError es un ValueError
+            return 400, {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+        except Exception as e:
+            return 500, {"ok": False, "error": str(e)}
+
+    @staticmethod
+    def _responder(writer: asyncio.StreamWriter, estado: int, datos: dict, seguir: bool):
+        cuerpo = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        writer.write((f"HTTP/1.1 {estado} {RAZONES.get(estado, '')}\r\n"
+                      "Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(cuerpo)}\r\n"
+                      f"Connection: {'keep-alive' if seguir else 'close'}\r\n\r\n").encode("latin-1") + cuerpo)
+
+def servir(db: str, host: str = HOST, puerto: int = PUERTO, workers: int = WORKERS):
+    servidor = Servidor(db, host, puerto, workers)
+
+    async def correr():
+        await servidor.start()
+        print(f"Escuchando en http://{servidor.host}:{servidor.puerto} ({db})", flush=True)
+        await servidor.serve_forever()
+
+    try:
+        asyncio.run(correr())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # los hilos terminan lo que están haciendo antes de cerrar sus conexiones
+        servidor.close(wait=True)
+        close_all_connections()
+
+if __name__ == "__main__":
+    # python lib_servidor.py ruta.db [puerto] [host]
+    servir(sys.argv[1], sys.argv[3] if len(sys.argv) > 3 else HOST, int(sys.argv[2]) if len(sys.argv) > 2 else PUERTO)
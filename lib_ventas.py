@@ -0,0 +1,95 @@
+# lib_ventas.py
+import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from lib_db import transaction, get_product, MAX_CDB_DIGITS
+from lib_caja import a_centavos, registrar_movimiento
+
+class StockInsuficiente(ValueError):
+    def __init__(self, nombres: List[str]):
+        super().__init__("Stock insuficiente para " + ", ".join(nombres))
+        self.nombres = nombres
+
+def item_de_producto(producto: Tuple, cantidad: int) -> dict:
+    """Línea de carrito para un producto del catálogo, con el precio de venta (costo + margen)."""
+    cdb, nombre, precio, stock, margen, _, _ = producto
+    return {'cdb': cdb, 'nombre': nombre, 'precio': precio * (1 + margen), 'cantidad': cantidad, 'stock': stock}
+
+def parse_scan(texto: str) -> Tuple[int, int]:
+    """Interpreta una lectura del escáner: "cdb" o "cantidad*cdb". Devuelve (cdb, cantidad)."""
+    texto = texto.strip()
+    cantidad = 1
+    if "*" in texto:
+        mult, texto = texto.split("*", 1)
+        if not mult.strip().isdigit() or int(mult) < 1:
+            raise ValueError(f"Cantidad inválida: {mult}")
+        cantidad = int(mult)
+        texto = texto.strip()
+    if not texto.isdigit() or len(texto) > MAX_CDB_DIGITS:
+        raise ValueError(f"Código inválido: {texto}")
+    return int(texto), cantidad
+
+def resolver_escaneo(path: str, texto: str) -> dict:
+    """Línea de carrito para una lectura del escáner.
+
+    El producto se busca por cdb en el catálogo en memoria (un acceso a dict
+    más la verificación de versión), sin recorrer la tabla.
+    """
+    cdb, cantidad = parse_scan(texto)
+    producto = get_product(path, cdb)
+    if producto is None:
+        raise ValueError(f"Código desconocido: {cdb}")
+    return item_de_producto(producto, cantidad)
+
+def merge_lines(items: Iterable[dict]) -> List[Tuple[int, int, float, str]]:
+    """Agrupa las líneas del carrito por cdb: (cdb, cantidad, precio, nombre).
+
+    Si un mismo cdb aparece con precios distintos se usa el precio promedio
+    ponderado, de modo que el importe total no cambia. Una cantidad que no
+    sea positiva levanta ValueError.
+    """
+    lineas: Dict[int, list] = {}
+    for it in items:
+        cdb = int(it['cdb'])
+        cant = int(it['cantidad'])
+        precio = float(it['precio'])
+        # con una cantidad negativa la guarda `cantidad >= ?` pasa siempre y el descuento suma stock
+        if cant <= 0:
+            raise ValueError(f"Cantidad inválida para {it.get('nombre', cdb)}: {cant}")
+        if cdb in lineas:
+            linea = lineas[cdb]
+            linea[1] += cant
+            linea[2] += cant * precio
+        else:
+            lineas[cdb] = [cdb, cant, cant * precio, it.get('nombre', str(cdb))]
+    return [(cdb, cant, importe / cant if cant else 0.0, nombre) for cdb, cant, importe, nombre in lineas.values()]
+
+def registrar_venta(path: str, items: Iterable[dict], fecha: Optional[str] = None) -> int:
+    """Registra una venta completa en una sola transacción y devuelve su id.
+
+    El stock se valida y descuenta para todo el carrito con sentencias guardadas
+    (`cantidad >= ?`), los detalles se insertan con executemany y la venta entra
+    a la caja como un solo movimiento. Si falta stock de algún producto no se
+    registra nada.
+    """
+    lineas = merge_lines(items)
+    if not lineas:
+        raise ValueError("No hay productos en la venta")
+    fecha = fecha or datetime.datetime.now().isoformat()
+    with transaction(path) as cur:
+        marcas = ",".join("?" * len(lineas))
+        stock = dict(cur.execute(f"SELECT cdb, cantidad FROM producto WHERE cdb IN ({marcas})",
+                                 [l[0] for l in lineas]).fetchall())
+        faltantes = [nombre for cdb, cant, _, nombre in lineas if stock.get(cdb) is None or stock[cdb] < cant]
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+        cur.executemany("UPDATE producto SET cantidad = cantidad - ? WHERE cdb=? AND cantidad >= ?",
+                        [(cant, cdb, cant) for cdb, cant, _, _ in lineas])
+        # la guarda protege contra cambios entre la validación y el descuento
+        if cur.rowcount != len(lineas):
+            raise StockInsuficiente([nombre for _, _, _, nombre in lineas])
+        cur.execute("INSERT INTO venta (fecha) VALUES (?)", (fecha,))
+        vid = cur.lastrowid
+        cur.executemany("INSERT INTO venta_detalle (venta, cdb, cantidad, precio_venta, fecha) VALUES (?, ?, ?, ?, ?)",
+                        [(vid, cdb, cant, precio, fecha) for cdb, cant, precio, _ in lineas])
+        registrar_movimiento(cur, "venta", sum(a_centavos(cant * precio) for _, cant, precio, _ in lineas), vid)
+    return vid
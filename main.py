@@ -1,38 +1,90 @@
 # main.py
+import time
+_T0 = time.perf_counter()
+
 import customtkinter as ctk
 import tkinter.messagebox as mb
-from lib_db import init_db
+from lib_db import init_db, close_all_connections
+from lib_executor import DbExecutor
+from lib_eventos import ChangeBus
+import datetime
+import importlib
 import os
-
-# Import módulos del dashboard
-from funcs.dashboard_stock import StockFrame
-from funcs.dashboard_venta import VentaFrame
-from funcs.dashboard_compra import CompraFrame
-from funcs.dashboard_caja import CajaFrame
-from funcs.dashboard_vencimientos import VencimientosFrame
-from funcs.dashboard_reportes import ReportesFrame
-from funcs.dashboard_alertas import AlertasFrame
+import sys
 
 APP_TITLE = "TecnoDashboard"
 
+# Los módulos del dashboard se importan y construyen recién la primera vez que
+# se muestran. Lo mismo las tareas de fondo (lib_alertas, lib_lotes,
+# lib_archivo, lib_analisis): se importan donde se usan, no al arrancar. clave: (módulo, clase, argumentos extra a partir de la App)
+FRAME_REGISTRY = {
+    "stock": ("funcs.dashboard_stock", "StockFrame", lambda app: (app.bus, app.executor)),
+    "venta": ("funcs.dashboard_venta", "VentaFrame", lambda app: (app.bus, app.executor)),
+    "compra": ("funcs.dashboard_compra", "CompraFrame", lambda app: (app.bus, app.executor)),
+    "caja": ("funcs.dashboard_caja", "CajaFrame", lambda app: (app.bus,)),
+    "vencimientos": ("funcs.dashboard_vencimientos", "VencimientosFrame", lambda app: (app.bus, app.executor)),
+    "reportes": ("funcs.dashboard_reportes", "ReportesFrame", lambda app: (app.bus, app.executor)),
+    "alertas": ("funcs.dashboard_alertas", "AlertasFrame", lambda app: (app.bus, app.executor, app.alertas)),
+    "analisis": ("funcs.dashboard_analisis", "AnalisisFrame", lambda app: (app.bus, app.executor)),
+    # oculto: se muestra con Ctrl+Shift+D
+    "diagnostico": ("funcs.dashboard_diagnostico", "DiagnosticoFrame", lambda app: ()),
+}
+# cada cuánto se buscan cambios hechos por otros procesos (ms)
+CHANGE_POLL_MS = 1000
+# cada cuántas lecturas se poda el registro de cambios
+CHANGE_PRUNE_EVERY = 300
+# los lotes vencidos se dan de baja una vez por día, en segundo plano
+PURGE_EXPIRED_DAILY = True
+# una vez por día se mudan los años cerrados a sus archivos (lib_archivo)
+ARCHIVE_CLOSED_YEARS = True
+# la foto por producto del análisis se rehace una vez por día, en segundo plano
+REFRESH_ANALYSIS_DAILY = True
+# orden de precarga en segundo plano después del primer pintado
+WARMUP_ORDER = ["venta", "compra", "alertas", "caja", "vencimientos", "reportes"]
+# atajo que muestra la vista de diagnóstico (tiempos de sentencias y de frames)
+DIAGNOSTICO_ATAJO = "<Control-Shift-KeyPress-D>"
+
 class App(ctk.CTk):
-    def __init__(self, db_path="data.db"):
+    def __init__(self, db_path="data.db", warmup=True, on_startup=None):
         super().__init__()
         self.db_path = db_path
+        self.warmup = warmup
+        # on_startup(tiempos) se llama cuando la app queda interactiva
+        self.on_startup = on_startup
+        self.startup_times = {}
         self.title(APP_TITLE)
         self.geometry("1100x700")
         ctk.set_appearance_mode("System")
         ctk.set_default_color_theme("dark-blue")
         init_db(self.db_path)
+        # capa de datos asíncrona compartida por todos los frames
+        self.executor = DbExecutor(self, self.db_path)
+        # los frames se suscriben a los cambios de las tablas que muestran
+        self.bus = ChangeBus(self.db_path)
+        self.bus.subscribe("*", self._on_change)
+        # alertas mantenidas en memoria; el botón de la barra muestra cuántas hay
+        from lib_alertas import AlertEngine
+        self.alertas = AlertEngine(self.db_path, self.bus, self.executor)
+        self.alertas.subscribe(self._on_alertas)
+        self._alertas_nuevas = 0
+        self.current = None
+        self._refresh_pending = False
+        self._polls = 0
+        self._purga_dia = None
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self.grid_columnconfigure(1, weight=1)
         self._create_sidebar()
         self._create_content()
+        self.bind("<Map>", self._on_first_map, add="+")
+        self.bind(DIAGNOSTICO_ATAJO, self._mostrar_diagnostico)
+        self.alertas.start()
+        self._poll_id = self.after(CHANGE_POLL_MS, self._poll_changes)
 
     def _create_sidebar(self):
         self.sidebar = ctk.CTkFrame(self, width=220, corner_radius=0)
         self.sidebar.grid(row=0, column=0, sticky="nswe")
-        self.sidebar.grid_rowconfigure(7, weight=1)
+        self.sidebar.grid_rowconfigure(8, weight=1)
 
         self.logo = ctk.CTkLabel(self.sidebar, text=APP_TITLE, font=ctk.CTkFont(size=20, weight="bold"))
         self.logo.grid(row=0, column=0, padx=12, pady=12)
@@ -44,12 +96,16 @@ class App(ctk.CTk):
         self.btn_reportes = ctk.CTkButton(self.sidebar, text="Reportes", command=lambda: self.show("reportes"))
         self.btn_alertas = ctk.CTkButton(self.sidebar, text="Alertas", command=lambda: self.show("alertas"))
         self.btn_caja = ctk.CTkButton(self.sidebar, text="Caja", command=lambda: self.show("caja"))
+        self.btn_analisis = ctk.CTkButton(self.sidebar, text="Análisis", command=lambda: self.show("analisis"))
+        # no se ubica en la grilla hasta que se usa el atajo
+        self.btn_diagnostico = ctk.CTkButton(self.sidebar, text="Diagnóstico", command=lambda: self.show("diagnostico"))
+        self._btn_fg = self.btn_alertas.cget("fg_color")
 
-        for i, w in enumerate([self.btn_dashboard, self.btn_venta, self.btn_compra, self.btn_venc, self.btn_reportes, self.btn_alertas, self.btn_caja], start=1):
+        for i, w in enumerate([self.btn_dashboard, self.btn_venta, self.btn_compra, self.btn_venc, self.btn_reportes, self.btn_alertas, self.btn_caja, self.btn_analisis], start=1):
             w.grid(row=i, column=0, padx=12, pady=6, sticky="we")
 
         self.appearance = ctk.CTkOptionMenu(self.sidebar, values=["Light", "Dark", "System"], command=self._change_appearance)
-        self.appearance.grid(row=8, column=0, padx=12, pady=12, sticky="we")
+        self.appearance.grid(row=9, column=0, padx=12, pady=12, sticky="we")
 
     def _create_content(self):
         self.container = ctk.CTkFrame(self)
@@ -57,27 +113,162 @@ class App(ctk.CTk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        # crear instancias de frames
-        self.frames = {
-            "stock": StockFrame(self.container, self.db_path),
-            "venta": VentaFrame(self.container, self.db_path, self._on_alert),
-            "compra": CompraFrame(self.container, self.db_path, self._on_alert),
-            "caja": CajaFrame(self.container, self.db_path),
-            "vencimientos": VencimientosFrame(self.container, self.db_path),
-            "reportes": ReportesFrame(self.container, self.db_path),
-            "alertas": AlertasFrame(self.container, self.db_path, self._on_alert)
-        }
-        for f in self.frames.values():
-            f.grid(row=0, column=0, sticky="nswe")
+        # las instancias se crean a demanda en _get_frame
+        self.frames = {}
         self.show("stock")
 
+    def _get_frame(self, key):
+        import lib_diagnostico
+        f = self.frames.get(key)
+        if f is None:
+            t0 = time.perf_counter()
+            module, cls_name, extra = FRAME_REGISTRY[key]
+            cls = getattr(importlib.import_module(module), cls_name)
+            f = self.frames[key] = cls(self.container, self.db_path, *extra(self))
+            f.grid(row=0, column=0, sticky="nswe")
+            f.lower()
+            lib_diagnostico.registrar(f"frame.{key}.construir", time.perf_counter() - t0)
+        return f
+
+    def _refrescar(self, key, f):
+        import lib_diagnostico
+        with lib_diagnostico.medir(f"frame.{key}.refrescar"):
+            f.update_contents()
+
     def show(self, key):
+        import lib_diagnostico
+        t0 = time.perf_counter()
+        target = self._get_frame(key)
+        self.current = key
+        if key == "alertas":
+            self._alertas_nuevas = 0
+            self._update_badge()
         for k, f in self.frames.items():
-            if k == key:
-                f.update_contents()
+            if f is target:
+                # solo se refresca si hubo cambios desde la última vez
+                if self._is_stale(f):
+                    self._refrescar(k, f)
                 f.lift()
             else:
+                # las cargas pendientes de otras pestañas ya no interesan;
+                # si se cortó una carga, el frame queda para recargar entero
+                if self.executor.cancel(f) and hasattr(f, "pendientes"):
+                    f.pendientes.invalidate()
                 f.lower()
+        lib_diagnostico.registrar(f"frame.{key}.mostrar", time.perf_counter() - t0)
+        # hasta que Tk termina de dibujar (sin contar las cargas asíncronas)
+        self.after_idle(lambda: lib_diagnostico.registrar(f"frame.{key}.pintar", time.perf_counter() - t0))
+
+    def _mostrar_diagnostico(self, event=None):
+        self.btn_diagnostico.grid(row=10, column=0, padx=12, pady=6, sticky="we")
+        self.show("diagnostico")
+
+    @staticmethod
+    def _is_stale(f):
+        pendientes = getattr(f, "pendientes", None)
+        return pendientes is None or pendientes.stale
+
+    # --- cambios ---
+    def _on_change(self, tabla, claves):
+        # varias publicaciones seguidas se resuelven en un solo refresco
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh_current)
+
+    def _on_alertas(self, cambios, nuevas):
+        if self.current != "alertas":
+            self._alertas_nuevas += len(nuevas)
+        self._update_badge()
+        self._on_change("alertas", None)
+
+    def _update_badge(self):
+        total = self.alertas.total()
+        texto = f"Alertas ({total})" if total else "Alertas"
+        if self._alertas_nuevas:
+            texto += f" +{self._alertas_nuevas}"
+        self.btn_alertas.configure(text=texto, fg_color="#c0392b" if self._alertas_nuevas else self._btn_fg)
+
+    def _refresh_current(self):
+        self._refresh_pending = False
+        f = self.frames.get(self.current)
+        if f is not None and hasattr(f, "pendientes") and f.pendientes.stale:
+            self._refrescar(self.current, f)
+
+    def _poll_changes(self):
+        try:
+            self.bus.poll()
+        finally:
+            self._polls += 1
+            self.alertas.check_dia()
+            self._tareas_diarias()
+            if self._polls % CHANGE_PRUNE_EVERY == 0:
+                self.executor.submit(ChangeBus.prune, self.db_path)
+            self._poll_id = self.after(CHANGE_POLL_MS, self._poll_changes)
+
+    def _tareas_diarias(self):
+        hoy = datetime.date.today()
+        if self._purga_dia == hoy:
+            return
+        self._purga_dia = hoy
+        if PURGE_EXPIRED_DAILY:
+            from lib_lotes import purgar_vencidos
+            self.executor.submit(purgar_vencidos, self.db_path, on_done=self._purgado)
+        if ARCHIVE_CLOSED_YEARS:
+            # normalmente no hay nada: solo mueve filas la primera vez en el año.
+            # La foto del análisis se arma recién cuando termina, para no incluir
+            # filas que se están archivando (el executor corre tareas en paralelo)
+            from lib_archivo import archivar
+            self.executor.submit(archivar, self.db_path, on_done=lambda _: self._actualizar_foto())
+        else:
+            self._actualizar_foto()
+
+    def _actualizar_foto(self):
+        if REFRESH_ANALYSIS_DAILY:
+            # así la vista de análisis no espera a la agrupación del año
+            from lib_analisis import actualizar_foto
+            self.executor.submit(actualizar_foto, self.db_path)
+
+    def _purgado(self, res):
+        lotes, _ = res
+        if lotes:
+            self.bus.publish("producto", None)
+            self.bus.publish("vencimientos", None)
+
+    # --- arranque ---
+    def _on_first_map(self, event):
+        if event.widget is not self or "first_paint" in self.startup_times:
+            return
+        self.after_idle(self._first_paint)
+
+    def _first_paint(self):
+        if "first_paint" in self.startup_times:
+            return
+        self.startup_times["first_paint"] = time.perf_counter() - _T0
+        self._wait_interactive()
+
+    def _wait_interactive(self):
+        # interactiva: la primera pestaña terminó de cargar sus datos
+        if self.executor.busy():
+            self.after(10, self._wait_interactive)
+            return
+        self.after_idle(self._interactive)
+
+    def _interactive(self):
+        self.startup_times["interactive"] = time.perf_counter() - _T0
+        if os.environ.get("STOCK_STARTUP_TIMING"):
+            print(" ".join(f"{k}={v * 1000:.0f}ms" for k, v in self.startup_times.items()), file=sys.stderr)
+        if self.on_startup:
+            self.on_startup(dict(self.startup_times))
+        if self.warmup:
+            self.after(200, self._warmup_next)
+
+    def _warmup_next(self):
+        # un frame por vuelta del loop para no bloquear la interfaz
+        for key in WARMUP_ORDER:
+            if key not in self.frames:
+                self._get_frame(key)
+                self.after(50, self._warmup_next)
+                return
 
     def _change_appearance(self, val):
         if val == "Light":
@@ -87,15 +278,16 @@ class App(ctk.CTk):
         else:
             ctk.set_appearance_mode("System")
 
-    def _on_alert(self):
-        # método llamado por módulos cuando se necesita refrescar alertas
-        try:
-            self.frames["alertas"].update_contents()
-        except Exception:
-            pass
+    def _on_close(self):
+        self.after_cancel(self._poll_id)
+        self.executor.shutdown()
+        self.destroy()
 
 if __name__ == "__main__":
     os.makedirs("data", exist_ok=True)
     db = os.path.join("data", "data.db")
     app = App(db)
     app.mainloop()
+    # las tareas en curso terminan antes de cerrar las conexiones de sus hilos
+    app.executor.shutdown(wait=True)
+    close_all_connections()
@@ -1,81 +1,103 @@
 --!SQLITE3
-
-PRAGMA foreign_keys = ON;
-
+-- Esquema canónico: las tablas con datos propios, al día con la versión 11
+-- de lib_migraciones (SCHEMA_VERSION). Una base creada con este script queda
+-- en user_version 0: al abrirla, init_db agrega sin tocar estas tablas lo que
+-- se deriva de ellas: el índice de búsqueda, el registro de cambios, los
+-- triggers, los resúmenes diarios (resumen_*_dia), la foto del análisis
+-- (resumen_producto*) y la velocidad de venta (velocidad_*), y marca la
+-- versión. Una migración que cambie estas tablas debe actualizar el script.
 
 CREATE TABLE IF NOT EXISTS producto (
-    cdb INTEGER PRIMARY KEY, 
-    nombre TEXT NOT NULL, 
-    precio REAL NOT NULL, 
-    cantidad INTEGER DEFAULT 0, 
-    umbral INTEGER DEFAULT 0, 
-    margen REAL DEFAULT 0.20, 
-    perecedero BOOLEAN DEFAULT 0 
+    cdb INTEGER PRIMARY KEY,
+    nombre TEXT,
+    precio REAL DEFAULT 0,
+    cantidad INTEGER DEFAULT 0,
+    umbral INTEGER DEFAULT 0,
+    margen REAL DEFAULT 0.2,
+    perecedero INTEGER DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS venta (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    fecha TEXT
 );
 
 CREATE TABLE IF NOT EXISTS venta_detalle (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    cdb INTEGER NOT NULL,
+    venta INTEGER REFERENCES venta(id),
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
     cantidad INTEGER NOT NULL,
     precio_venta REAL,
-    venta INTEGER,
-    FOREIGN KEY (venta) REFERENCES venta(id),
-    FOREIGN KEY (cdb) REFERENCES producto(cdb)
+    fecha TEXT
 );
 
 CREATE TABLE IF NOT EXISTS compra (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    fecha TEXT
 );
 
 CREATE TABLE IF NOT EXISTS compra_detalle (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    cdb INTEGER NOT NULL,
+    compra INTEGER REFERENCES compra(id),
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
     cantidad INTEGER NOT NULL,
     precio_compra REAL,
-    compra INTEGER,
-    FOREIGN KEY (compra) REFERENCES compra(id),
-    FOREIGN KEY (cdb) REFERENCES producto(cdb)
+    fecha TEXT
 );
 
 CREATE TABLE IF NOT EXISTS vencimientos (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    cdb INTEGER NOT NULL,
+    cdb INTEGER NOT NULL REFERENCES producto(cdb),
     cantidad INTEGER NOT NULL,
-    fecha_vencimiento DATE NOT NULL,
-    FOREIGN KEY (cdb) REFERENCES producto(cdb)
+    fecha_vencimiento TEXT
 );
 
-CREATE TABLE IF NOT EXISTS dinero (
-    id INTEGER PRIMARY KEY CHECK (id = 1), 
-    total REAL DEFAULT 0
+CREATE TABLE IF NOT EXISTS caja_movimiento (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha TEXT NOT NULL,
+    tipo TEXT NOT NULL CHECK (tipo IN ('apertura', 'venta', 'compra', 'ingreso', 'egreso', 'correccion')),
+    importe INTEGER NOT NULL,
+    referencia INTEGER,
+    nota TEXT
 );
 
-CREATE TABLE IF NOT EXISTS configuracion (
-    id INTEGER PRIMARY KEY CHECK (id = 1),
-    fg TEXT,
-    bg TEXT,
-    font_name TEXT,
-    font_size INTEGER
+CREATE TABLE IF NOT EXISTS caja_saldo (
+    movimiento INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    saldo INTEGER NOT NULL
 );
 
-INSERT INTO dinero (id, total) VALUES(1, 0);
+CREATE TABLE IF NOT EXISTS archivo_periodo (
+    anio INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    ventas INTEGER NOT NULL DEFAULT 0,
+    compras INTEGER NOT NULL DEFAULT 0,
+    actualizado TEXT
+);
 
 CREATE TABLE IF NOT EXISTS configuracion (
-    id INTEGER PRIMARY KEY CHECK (id = 1),
+    id INTEGER PRIMARY KEY,
+    passwd TEXT,
     fg TEXT,
     bg TEXT,
-    passwd TEXT, 
     font_name TEXT,
     font_size INTEGER
 );
 
-ALTER TABLE configuracion ADD COLUMN passwd TEXT;
+CREATE INDEX IF NOT EXISTS venta_fecha ON venta (fecha);
+CREATE INDEX IF NOT EXISTS compra_fecha ON compra (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_venta ON venta_detalle (venta);
+CREATE INDEX IF NOT EXISTS venta_detalle_fecha ON venta_detalle (fecha);
+CREATE INDEX IF NOT EXISTS venta_detalle_cdb_fecha ON venta_detalle (cdb, fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_compra ON compra_detalle (compra);
+CREATE INDEX IF NOT EXISTS compra_detalle_fecha ON compra_detalle (fecha);
+CREATE INDEX IF NOT EXISTS compra_detalle_cdb_fecha ON compra_detalle (cdb, fecha);
+CREATE INDEX IF NOT EXISTS vencimientos_fecha ON vencimientos (fecha_vencimiento);
+CREATE INDEX IF NOT EXISTS vencimientos_cdb ON vencimientos (cdb, fecha_vencimiento);
+CREATE INDEX IF NOT EXISTS producto_bajo_stock ON producto (cdb) WHERE cantidad <= umbral;
+CREATE INDEX IF NOT EXISTS caja_movimiento_fecha ON caja_movimiento (fecha);
+
+INSERT OR IGNORE INTO caja_saldo (movimiento, fecha, saldo) VALUES (0, datetime('now', 'localtime'), 0);
 
-INSERT INTO configuracion (id, fg, bg, font_name, font_size, passwd) 
-    VALUES (1, '#000000', '#FFFFFF', 'Arial', '12', '12341234')
+INSERT OR IGNORE INTO configuracion (id, fg, bg, font_name, font_size, passwd)
+    VALUES (1, '#000000', '#FFFFFF', 'Arial', 12, '');